@@ -1,9 +1,9 @@
-from django.core.management.base import BaseCommand
+"""Activity management commands."""
+from activity.utils import cleanup_old_logs, CLEANUP_CHUNK_SIZE, RETENTION_DAYS
+from backend.metrics import MeteredCommand
 
-from activity.utils import cleanup_old_logs, RETENTION_DAYS
 
-
-class Command(BaseCommand):
+class Command(MeteredCommand):
     help = "Delete activity logs older than the retention window."
 
     def add_arguments(self, parser):
@@ -13,8 +13,25 @@ class Command(BaseCommand):
             default=RETENTION_DAYS,
             help="Retention window in days (default: 365).",
         )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=CLEANUP_CHUNK_SIZE,
+            help="Rows deleted per statement (default: 5000).",
+        )
+        parser.add_argument(
+            "--archive-dir",
+            help="Write removed rows to a compressed JSONL file in this directory first.",
+        )
 
     def handle(self, *args, **options):
         days = options.get("days") or RETENTION_DAYS
-        deleted = cleanup_old_logs(days=days)
+        chunk_size = options.get("chunk_size") or CLEANUP_CHUNK_SIZE
+        deleted = cleanup_old_logs(
+            days=days,
+            chunk_size=chunk_size,
+            archive_dir=options.get("archive_dir"),
+            progress=self.stdout.write,
+        )
+        self.rows = deleted
         self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} activity logs."))
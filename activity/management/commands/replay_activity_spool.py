@@ -0,0 +1,14 @@
+"""Replay activity log entries spooled after a failed flush."""
+from django.core.management.base import BaseCommand
+
+from activity.utils import replay_spooled_activity
+
+
+class Command(BaseCommand):
+    help = "Write spooled activity logs back to the database."
+
+    def handle(self, *args, **options):
+        replayed = replay_spooled_activity()
+        self.stdout.write(
+            self.style.SUCCESS(f"Replayed {replayed} spooled activity logs.")
+        )
@@ -0,0 +1,17 @@
+from .utils import buffered_activity
+
+
+class ActivityBufferMiddleware:
+    """Buffer activity log entries for the duration of a request.
+
+    Entries recorded via ``log_activity`` while the request is handled are
+    written with a single ``bulk_create`` once the response is ready, so
+    activity logging costs at most one query per request.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with buffered_activity():
+            return self.get_response(request)
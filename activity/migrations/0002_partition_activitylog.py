@@ -0,0 +1,86 @@
+"""Partition the activity log by month on PostgreSQL.
+
+The table is rebuilt as ``PARTITION BY RANGE (created_at)``. PostgreSQL
+requires the partition key in the primary key, so the constraint becomes
+``(id, created_at)``; ids still come from a single sequence and stay unique.
+Other databases keep the plain table and rely on chunked deletes.
+"""
+from django.conf import settings
+from django.db import migrations
+from django.utils import timezone
+
+from activity import partitions
+
+TABLE = partitions.TABLE
+LEGACY = f"{TABLE}_legacy"
+SEQUENCE = f"{TABLE}_id_seq"
+
+INDEXES = [
+    ("activity_lo_user_id_9f6b05_idx", "user_id, created_at"),
+    ("activity_lo_user_id_6b36d9_idx", "user_id, action"),
+    ("activity_lo_entity__6f3d9a_idx", "entity_type, entity_id"),
+    (f"{TABLE}_user_id_idx", "user_id"),
+]
+
+
+def partition_table(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != "postgresql":
+        return
+    user_table = apps.get_model(settings.AUTH_USER_MODEL)._meta.db_table
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {TABLE} RENAME TO {LEGACY}")
+        cursor.execute(
+            f"CREATE TABLE {TABLE} (LIKE {LEGACY}) "
+            "PARTITION BY RANGE (created_at)"
+        )
+        cursor.execute(
+            f"CREATE TABLE {partitions.DEFAULT_PARTITION} "
+            f"PARTITION OF {TABLE} DEFAULT"
+        )
+        cursor.execute(f"SELECT MIN(created_at) FROM {LEGACY}")
+        oldest = cursor.fetchone()[0]
+
+    now = timezone.now()
+    partitions.ensure_partitions(
+        oldest or now, partitions.add_months(partitions.month_start(now), 2),
+        connection,
+    )
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {TABLE} SELECT * FROM {LEGACY}")
+        cursor.execute(f"DROP TABLE {LEGACY}")
+        cursor.execute(
+            f"ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_pkey "
+            "PRIMARY KEY (id, created_at)"
+        )
+        cursor.execute(
+            f"ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_user_id_fk "
+            f"FOREIGN KEY (user_id) REFERENCES {user_table} (id) "
+            "DEFERRABLE INITIALLY DEFERRED"
+        )
+        for name, columns in INDEXES:
+            cursor.execute(f"CREATE INDEX {name} ON {TABLE} ({columns})")
+        cursor.execute(f"CREATE SEQUENCE {SEQUENCE} OWNED BY {TABLE}.id")
+        cursor.execute(
+            f"SELECT setval('{SEQUENCE}', COALESCE(MAX(id), 0) + 1, false) "
+            f"FROM {TABLE}"
+        )
+        cursor.execute(
+            f"ALTER TABLE {TABLE} ALTER COLUMN id "
+            f"SET DEFAULT nextval('{SEQUENCE}')"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("activity", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # Reversing leaves the table partitioned; the model works either way.
+        migrations.RunPython(partition_table, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,133 @@
+"""Monthly range partitions for the activity log on PostgreSQL.
+
+Migration 0002 converts ``activity_activitylog`` into a table partitioned by
+``created_at`` with one partition per calendar month (named
+``activity_activitylog_pYYYYMM``) plus a default partition. Old months can
+then be dropped outright instead of deleted row by row. On other databases
+the table stays a plain table and these helpers report nothing to do.
+"""
+from datetime import date, datetime, timezone as dt_timezone
+from typing import List, Optional, Tuple
+
+from django.db import connection as default_connection
+
+TABLE = "activity_activitylog"
+PARTITION_PREFIX = f"{TABLE}_p"
+DEFAULT_PARTITION = f"{TABLE}_default"
+
+
+def month_start(value) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(value: date, months: int) -> date:
+    month = value.month - 1 + months
+    return date(value.year + month // 12, month % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARTITION_PREFIX}{month:%Y%m}"
+
+
+def partition_bounds(month: date) -> Tuple[datetime, datetime]:
+    start = datetime(month.year, month.month, 1, tzinfo=dt_timezone.utc)
+    nxt = add_months(month, 1)
+    end = datetime(nxt.year, nxt.month, 1, tzinfo=dt_timezone.utc)
+    return start, end
+
+
+def is_partitioned(connection=None) -> bool:
+    connection = connection or default_connection
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT relkind FROM pg_class WHERE relname = %s", [TABLE]
+        )
+        row = cursor.fetchone()
+    return bool(row) and row[0] == "p"
+
+
+def list_partitions(connection=None) -> List[Tuple[str, date]]:
+    """Return ``(name, month)`` for each monthly partition, oldest first."""
+    connection = connection or default_connection
+    if not is_partitioned(connection):
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = %s
+            """,
+            [TABLE],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    partitions = []
+    for name in names:
+        suffix = name[len(PARTITION_PREFIX):]
+        if not name.startswith(PARTITION_PREFIX) or len(suffix) != 6:
+            continue
+        try:
+            month = date(int(suffix[:4]), int(suffix[4:]), 1)
+        except ValueError:
+            continue
+        partitions.append((name, month))
+    return sorted(partitions, key=lambda p: p[1])
+
+
+def create_partition(month: date, connection=None) -> Optional[str]:
+    """Create the partition for ``month`` unless it exists.
+
+    Returns the partition name when one was created. Months that already
+    have rows in the default partition are skipped, since PostgreSQL refuses
+    to carve them out; those rows age out through the chunked delete path.
+    """
+    connection = connection or default_connection
+    name = partition_name(month)
+    start, end = partition_bounds(month)
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s)", [name])
+        if cursor.fetchone()[0] is not None:
+            return None
+        cursor.execute("SELECT to_regclass(%s)", [DEFAULT_PARTITION])
+        if cursor.fetchone()[0] is not None:
+            cursor.execute(
+                f"SELECT 1 FROM {DEFAULT_PARTITION} "
+                "WHERE created_at >= %s AND created_at < %s LIMIT 1",
+                [start, end],
+            )
+            if cursor.fetchone():
+                return None
+        cursor.execute(
+            f"CREATE TABLE {name} PARTITION OF {TABLE} "
+            "FOR VALUES FROM (%s) TO (%s)",
+            [start, end],
+        )
+    return name
+
+
+def ensure_partitions(start: date, end: date, connection=None) -> List[str]:
+    """Create any missing monthly partitions between ``start`` and ``end``."""
+    connection = connection or default_connection
+    if not is_partitioned(connection):
+        return []
+    created = []
+    month = month_start(start)
+    last = month_start(end)
+    while month <= last:
+        name = create_partition(month, connection)
+        if name:
+            created.append(name)
+        month = add_months(month, 1)
+    return created
+
+
+def drop_partition(name: str, connection=None) -> None:
+    connection = connection or default_connection
+    with connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {TABLE} DETACH PARTITION {name}")
+        cursor.execute(f"DROP TABLE {name}")
@@ -0,0 +1,160 @@
+import datetime
+import gzip
+import json
+import tempfile
+import zlib
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from finance.models import Account
+from .models import ActivityLog
+from .utils import (
+    ActivityArchive,
+    buffered_activity,
+    cleanup_old_logs,
+    log_activity,
+    replay_spooled_activity,
+)
+
+User = get_user_model()
+
+
+class ActivityBufferTestCase(TestCase):
+    """Test request-scoped buffering of activity logs."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser', password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.account = Account.objects.create(
+            user=self.user, name="Wallet", opening_balance=0
+        )
+
+    def test_buffered_entries_written_in_one_query(self):
+        """Entries logged inside a buffered scope are flushed together."""
+        with self.assertNumQueries(1):
+            with buffered_activity():
+                for i in range(5):
+                    log_activity(
+                        user=self.user, action="test", summary=f"entry {i}"
+                    )
+        self.assertEqual(ActivityLog.objects.filter(user=self.user).count(), 5)
+
+    def test_transaction_create_logs_activity(self):
+        """The middleware flushes entries before the response returns."""
+        response = self.client.post(
+            '/api/finance/transactions/',
+            {
+                'account': self.account.id,
+                'date': '2024-01-01',
+                'amount': '100.00',
+                'kind': 'EXPENSE',
+            },
+            format='json',
+        )
+        self.assertEqual(response.status_code, 201)
+        log = ActivityLog.objects.get(user=self.user)
+        self.assertEqual(log.entity_id, str(response.json()['id']))
+
+    def test_failed_flush_is_spooled_and_replayed(self):
+        """A failed bulk write lands on disk and can be replayed later."""
+        created_at = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+        with tempfile.TemporaryDirectory() as spool_dir:
+            with override_settings(ACTIVITY_SPOOL_DIR=spool_dir):
+                with mock.patch.object(
+                    ActivityLog.objects, 'bulk_create', side_effect=Exception
+                ), self.assertLogs('activity.utils', level='ERROR'):
+                    with buffered_activity():
+                        entry = log_activity(
+                            user=self.user, action="test", summary="spooled"
+                        )
+                        entry.created_at = created_at
+                self.assertFalse(ActivityLog.objects.exists())
+
+                self.assertEqual(replay_spooled_activity(), 1)
+                log = ActivityLog.objects.get(user=self.user)
+                self.assertEqual(log.summary, "spooled")
+                self.assertEqual(log.created_at, created_at)
+                self.assertEqual(replay_spooled_activity(), 0)
+
+
+class ActivityCleanupTestCase(TestCase):
+    """Test chunked retention cleanup."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser', password='testpass123'
+        )
+        for i in range(7):
+            log_activity(user=self.user, action="old", summary=f"old {i}")
+        ActivityLog.objects.update(
+            created_at=datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+        )
+        log_activity(user=self.user, action="new", summary="recent")
+
+    def test_cleanup_deletes_in_chunks(self):
+        """Old rows are removed in bounded chunks, recent rows are kept."""
+        messages = []
+        deleted = cleanup_old_logs(days=30, chunk_size=3, progress=messages.append)
+        self.assertEqual(deleted, 7)
+        self.assertEqual(messages, [
+            "Deleted 3 rows", "Deleted 6 rows", "Deleted 7 rows",
+        ])
+        self.assertEqual(
+            list(ActivityLog.objects.values_list('action', flat=True)), ['new']
+        )
+
+    def test_cleanup_archives_before_delete(self):
+        """Removed rows are written to a compressed JSONL archive."""
+        with tempfile.TemporaryDirectory() as archive_dir:
+            deleted = cleanup_old_logs(days=30, archive_dir=archive_dir)
+            archives = list(Path(archive_dir).glob('*.jsonl.gz'))
+            self.assertEqual(len(archives), 1)
+            with gzip.open(archives[0], 'rt') as fh:
+                rows = [json.loads(line) for line in fh]
+        self.assertEqual(deleted, 7)
+        self.assertEqual(len(rows), 7)
+        self.assertTrue(all(row['action'] == 'old' for row in rows))
+
+    def test_archives_never_overwrite_each_other(self):
+        """Each archive gets its own file; a clashing name fails instead."""
+        moment = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+        with tempfile.TemporaryDirectory() as archive_dir:
+            first, second = ActivityArchive(archive_dir), ActivityArchive(archive_dir)
+            first.close()
+            second.close()
+            self.assertNotEqual(first.path, second.path)
+
+            with mock.patch('activity.utils.timezone.now', return_value=moment):
+                archive = ActivityArchive(archive_dir)
+                archive.write([{'id': 1}])
+                archive.close()
+                with self.assertRaises(FileExistsError):
+                    ActivityArchive(archive_dir)
+            with gzip.open(archive.path, 'rt') as fh:
+                self.assertEqual(fh.read(), '{"id": 1}\n')
+
+    def test_rows_are_on_disk_before_they_are_deleted(self):
+        """Each chunk is synced to the archive before its rows are deleted."""
+        synced = []
+        original = ActivityArchive.sync
+
+        def sync(archive):
+            original(archive)
+            # What a crash right now would leave: an unfinished gzip stream.
+            data = zlib.decompressobj(wbits=31).decompress(archive.path.read_bytes())
+            synced.append((
+                data.decode().count('\n'),
+                ActivityLog.objects.filter(action='old').count(),
+            ))
+
+        with tempfile.TemporaryDirectory() as archive_dir:
+            with mock.patch.object(ActivityArchive, 'sync', sync):
+                cleanup_old_logs(days=30, chunk_size=3, archive_dir=archive_dir)
+        self.assertEqual(synced, [(3, 7), (6, 4), (7, 1)])
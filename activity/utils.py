@@ -1,11 +1,26 @@
+import gzip
+import io
+import json
+import logging
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import timedelta
-from typing import Any, Dict, Optional
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
 
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 
+from . import partitions
 from .models import ActivityLog
 
+logger = logging.getLogger(__name__)
+
 RETENTION_DAYS = 365
+CLEANUP_CHUNK_SIZE = 5000
 
 ACTION_TRANSACTION_CREATED = "transaction.created"
 ACTION_TRANSACTION_UPDATED = "transaction.updated"
@@ -13,6 +28,11 @@ ACTION_TRANSACTION_DELETED = "transaction.deleted"
 ACTION_IMPORT_CSV = "transaction.import.csv"
 ACTION_IMPORT_PDF = "transaction.import.pdf"
 
+# Entries collected for the current request (None outside a buffered scope).
+_activity_buffer: ContextVar[Optional[List[ActivityLog]]] = ContextVar(
+    "activity_buffer", default=None
+)
+
 
 def log_activity(
     *,
@@ -24,7 +44,13 @@ def log_activity(
     metadata: Optional[Dict[str, Any]] = None,
     actor: str = ActivityLog.Actor.USER,
 ) -> ActivityLog:
-    return ActivityLog.objects.create(
+    """Record an activity entry.
+
+    Inside a buffered scope (see ``buffered_activity``) the entry is queued
+    and written with the rest of the request's entries; the returned
+    instance is unsaved until then. Outside a scope it is written directly.
+    """
+    entry = ActivityLog(
         user=user,
         actor=actor,
         action=action,
@@ -33,10 +59,228 @@ def log_activity(
         entity_id=str(entity_id) if entity_id is not None else "",
         metadata=metadata or {},
     )
+    buffer = _activity_buffer.get()
+    if buffer is not None:
+        entry.created_at = timezone.now()
+        buffer.append(entry)
+        return entry
+    entry.save()
+    return entry
+
+
+@contextmanager
+def buffered_activity():
+    """Collect ``log_activity`` calls and flush them in one ``bulk_create``."""
+    entries: List[ActivityLog] = []
+    token = _activity_buffer.set(entries)
+    try:
+        yield entries
+    finally:
+        _activity_buffer.reset(token)
+        flush_activity(entries)
+
+
+def flush_activity(entries: List[ActivityLog]) -> int:
+    """Write buffered entries, spooling them to disk if the DB write fails."""
+    if not entries:
+        return 0
+    try:
+        ActivityLog.objects.bulk_create(entries)
+    except Exception:
+        logger.exception(
+            "Activity log flush failed; spooling %d entries", len(entries)
+        )
+        _spool_entries(entries)
+        return 0
+    return len(entries)
+
+
+def _spool_dir() -> Path:
+    return Path(settings.ACTIVITY_SPOOL_DIR)
+
+
+def _spool_entries(entries: List[ActivityLog]) -> Optional[Path]:
+    spool_dir = _spool_dir()
+    try:
+        spool_dir.mkdir(parents=True, exist_ok=True)
+        stamp = timezone.now().strftime("%Y%m%d%H%M%S%f")
+        path = spool_dir / f"activity-{stamp}-{os.getpid()}.jsonl"
+        with path.open("w", encoding="utf-8") as fh:
+            for entry in entries:
+                created_at = entry.created_at or timezone.now()
+                fh.write(
+                    json.dumps(
+                        {
+                            "user_id": entry.user_id,
+                            "actor": entry.actor,
+                            "action": entry.action,
+                            "entity_type": entry.entity_type,
+                            "entity_id": entry.entity_id,
+                            "summary": entry.summary,
+                            "metadata": entry.metadata,
+                            "created_at": created_at.isoformat(),
+                        },
+                        default=str,
+                    )
+                )
+                fh.write("\n")
+        return path
+    except OSError:
+        logger.exception("Could not spool %d activity entries", len(entries))
+        return None
+
+
+def replay_spooled_activity() -> int:
+    """Load spooled entries back into the database and remove the files."""
+    spool_dir = _spool_dir()
+    if not spool_dir.exists():
+        return 0
+
+    replayed = 0
+    for path in sorted(spool_dir.glob("activity-*.jsonl")):
+        entries = []
+        created = []
+        with path.open(encoding="utf-8") as fh:
+            for line in fh:
+                if not line.strip():
+                    continue
+                row = json.loads(line)
+                created.append(parse_datetime(row.pop("created_at")))
+                entries.append(ActivityLog(**row))
+
+        ActivityLog.objects.bulk_create(entries)
+        # auto_now_add overrides created_at on insert; restore the
+        # original timestamps so retention and ordering stay correct.
+        for entry, created_at in zip(entries, created):
+            entry.created_at = created_at
+        ActivityLog.objects.bulk_update(entries, ["created_at"])
+        path.unlink()
+        replayed += len(entries)
+    return replayed
+
+
+class ActivityArchive:
+    """Append activity rows to a gzip-compressed JSONL file.
+
+    Each archive gets a new file. ``sync`` makes everything written so far
+    durable; call it before deleting the rows, so a crash afterwards leaves
+    a truncated but readable archive rather than lost rows.
+    """
+
+    FIELDS = [
+        "id",
+        "user_id",
+        "actor",
+        "action",
+        "entity_type",
+        "entity_id",
+        "summary",
+        "metadata",
+        "created_at",
+        "updated_at",
+    ]
+
+    def __init__(self, archive_dir):
+        archive_dir = Path(archive_dir)
+        archive_dir.mkdir(parents=True, exist_ok=True)
+        stamp = timezone.now().strftime("%Y%m%d%H%M%S%f")
+        self.path = archive_dir / f"activity-{stamp}-{os.getpid()}.jsonl.gz"
+        self.rows = 0
+        self._file = self.path.open("xb")
+        self._fh = io.TextIOWrapper(
+            gzip.GzipFile(fileobj=self._file, mode="wb"), encoding="utf-8"
+        )
+
+    def write(self, rows: Iterable[Dict[str, Any]]) -> None:
+        for row in rows:
+            self._fh.write(json.dumps(row, cls=DjangoJSONEncoder))
+            self._fh.write("\n")
+            self.rows += 1
+
+    def sync(self) -> None:
+        # Flushing the text layer flushes the compressor with Z_SYNC_FLUSH,
+        # so every row written so far can be decompressed from the file.
+        self._fh.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        self._fh.close()
+        self._file.close()
+
+
+def _noop_progress(message: str) -> None:
+    pass
+
+
+def _delete_in_chunks(qs, chunk_size, archive, progress) -> int:
+    deleted = 0
+    qs = qs.order_by()
+    while True:
+        if archive:
+            rows = list(qs.values(*ActivityArchive.FIELDS)[:chunk_size])
+            ids = [row["id"] for row in rows]
+        else:
+            ids = list(qs.values_list("id", flat=True)[:chunk_size])
+        if not ids:
+            return deleted
+        if archive:
+            archive.write(rows)
+            archive.sync()
+        # No cascades or signals hang off ActivityLog, so this is a single
+        # DELETE ... WHERE id IN (...) bounded by chunk_size.
+        ActivityLog.objects.filter(id__in=ids).delete()
+        deleted += len(ids)
+        progress(f"Deleted {deleted} rows")
+
+
+def cleanup_old_logs(
+    days: int = RETENTION_DAYS,
+    *,
+    chunk_size: int = CLEANUP_CHUNK_SIZE,
+    archive_dir=None,
+    progress: Callable[[str], None] = _noop_progress,
+) -> int:
+    """Delete activity logs older than ``days`` in bounded steps.
 
+    On a partitioned PostgreSQL table, months entirely before the cutoff are
+    dropped as whole partitions; remaining old rows (the boundary month and
+    the default partition, or the whole table elsewhere) are deleted in
+    chunks of ``chunk_size``. With ``archive_dir`` every removed row is first
+    written to a compressed JSONL archive.
+    """
+    now = timezone.now()
+    cutoff = now - timedelta(days=days)
+    archive = ActivityArchive(archive_dir) if archive_dir else None
+    deleted = 0
+    try:
+        # Keep partitions ahead of time so new rows never land in default.
+        partitions.ensure_partitions(
+            now, partitions.add_months(partitions.month_start(now), 2)
+        )
+        for name, month in partitions.list_partitions():
+            start, end = partitions.partition_bounds(month)
+            if end > cutoff:
+                continue
+            month_qs = ActivityLog.objects.filter(
+                created_at__gte=start, created_at__lt=end
+            )
+            if archive:
+                rows = month_qs.order_by().values(*ActivityArchive.FIELDS)
+                archive.write(rows.iterator(chunk_size=chunk_size))
+                archive.sync()
+            count = month_qs.count()
+            partitions.drop_partition(name)
+            deleted += count
+            progress(f"Dropped partition {name} ({count} rows)")
 
-def cleanup_old_logs(days: int = RETENTION_DAYS) -> int:
-    cutoff = timezone.now() - timedelta(days=days)
-    qs = ActivityLog.objects.filter(created_at__lt=cutoff)
-    deleted, _ = qs.delete()
+        deleted += _delete_in_chunks(
+            ActivityLog.objects.filter(created_at__lt=cutoff),
+            chunk_size,
+            archive,
+            progress,
+        )
+    finally:
+        if archive:
+            archive.close()
+            progress(f"Archived {archive.rows} rows to {archive.path}")
     return deleted
@@ -4,12 +4,14 @@ from django.utils import timezone
 from rest_framework import permissions, viewsets
 from rest_framework.pagination import LimitOffsetPagination
 
+from backend.conditional import ConditionalListMixin
+
 from .models import ActivityLog
 from .serializers import ActivityLogSerializer
 from .utils import RETENTION_DAYS
 
 
-class ActivityLogViewSet(viewsets.ReadOnlyModelViewSet):
+class ActivityLogViewSet(ConditionalListMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = ActivityLogSerializer
     permission_classes = [permissions.IsAuthenticated]
     pagination_class = LimitOffsetPagination
@@ -0,0 +1,206 @@
+"""Per-user caching with write-invalidated, versioned keys.
+
+Each user has a version number per model group (``finance``, ``budgeting``,
+``savings``, ``investments``, ``wealth``). A cached value's key embeds the
+versions of the groups it was built from, so bumping a group's version on
+write makes every dependent value unreachable without having to find and
+delete it; stale entries simply expire.
+
+Versions are bumped by ``post_save``/``post_delete`` receivers on the models
+of each group (connected by ``connect_invalidation``). Code that writes with
+``update()`` or bulk operations, which send no signals, calls ``bump``
+itself.
+
+Works with the local-memory backend (single process) and the file-based
+backend shared by several workers; see ``CACHES`` in settings. Hits and
+misses are counted per cached name in each process, see ``stats``, and
+for all processes in the ``cache_lookups`` metric.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import defaultdict
+
+from django.apps import apps
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from backend import metrics
+
+DEFAULT_TIMEOUT = 300
+VERSION_TIMEOUT = None  # versions must outlive the values keyed on them
+
+MODEL_GROUPS = {
+    "finance.Account": "finance",
+    "finance.Category": "finance",
+    "finance.Transaction": "finance",
+    "budgeting.Budget": "budgeting",
+    "budgeting.BudgetLine": "budgeting",
+    "savings.SavingsGoal": "savings",
+    "savings.GoalContribution": "savings",
+    "investments.Investment": "investments",
+    "investments.InvestmentTransaction": "investments",
+    "investments.InvestmentPrice": "investments",
+    "wealth.Asset": "wealth",
+    "wealth.Liability": "wealth",
+    "wealth.NetWorthSnapshot": "wealth",
+}
+
+# How to reach the owning user from models without a ``user`` field.
+OWNER_PATHS = {
+    "budgeting.BudgetLine": "budget__user_id",
+    "savings.GoalContribution": "goal__user_id",
+    "investments.InvestmentTransaction": "investment__user_id",
+    "investments.InvestmentPrice": "investment__user_id",
+}
+
+
+def _version_key(user_id, group):
+    return f"cachever:{user_id}:{group}"
+
+
+def _initial_version():
+    # Versions start from the clock rather than 0, so a version key that was
+    # culled or lost never comes back with a number used before.
+    return time.time_ns() // 1000
+
+
+def versions(user_id, groups):
+    """Current version of each group for a user, as a tuple."""
+    keys = [_version_key(user_id, group) for group in groups]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, _initial_version(), VERSION_TIMEOUT)
+            found[key] = cache.get(key)
+    return tuple(found[key] for key in keys)
+
+
+def _increment(user_id, groups):
+    for group in groups:
+        key = _version_key(user_id, group)
+        # add() is a no-op when the key exists; incr() is atomic on the
+        # local-memory backend and close enough on the file backend, where
+        # a lost increment is covered by the one made on commit.
+        cache.add(key, _initial_version(), VERSION_TIMEOUT)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _initial_version(), VERSION_TIMEOUT)
+
+
+def bump(user_id, *groups):
+    """Invalidate everything cached for ``user_id`` that depends on ``groups``.
+
+    Inside a transaction the versions are bumped again on commit, so a
+    value rebuilt from the pre-commit data in the meantime is not served.
+    """
+    if user_id is None:
+        return
+    _increment(user_id, groups)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _increment(user_id, groups))
+
+
+def bump_owner(model, pk, *groups, user=None):
+    """Bump ``groups`` for the owner of row ``pk`` after a signal-less write.
+
+    Pass ``user`` when it is already known to skip looking it up.
+    """
+    if user is not None:
+        user_id = user.pk
+    else:
+        user_id = model.objects.filter(pk=pk).values_list("user_id", flat=True).first()
+    bump(user_id, *groups)
+
+
+def cache_key(user_id, name, groups, params=None):
+    digest = ""
+    if params:
+        digest = hashlib.md5(
+            json.dumps(params, sort_keys=True, default=str).encode()
+        ).hexdigest()[:12]
+    stamp = ".".join(str(v) for v in versions(user_id, groups))
+    return f"user:{user_id}:{name}:{digest}:{stamp}"
+
+
+def get_or_build(user_id, name, groups, build, params=None, timeout=DEFAULT_TIMEOUT):
+    """Return the cached value for ``name`` or build, store and return it.
+
+    Returns ``(value, hit)``.
+    """
+    key = cache_key(user_id, name, groups, params)
+    value = cache.get(key)
+    if value is not None:
+        _record(name, hit=True)
+        return value, True
+    _record(name, hit=False)
+    value = build()
+    cache.set(key, value, timeout)
+    return value, False
+
+
+_stats_lock = threading.Lock()
+_stats = defaultdict(lambda: {"hits": 0, "misses": 0})
+
+
+def _record(name, hit):
+    with _stats_lock:
+        _stats[name]["hits" if hit else "misses"] += 1
+    metrics.record_cache_lookup(name, hit)
+
+
+def stats():
+    """Hit and miss counts per cached name in this process, with totals."""
+    with _stats_lock:
+        names = {name: dict(counts) for name, counts in sorted(_stats.items())}
+    hits = sum(c["hits"] for c in names.values())
+    misses = sum(c["misses"] for c in names.values())
+    for counts in names.values():
+        lookups = counts["hits"] + counts["misses"]
+        counts["hit_ratio"] = round(counts["hits"] / lookups, 4) if lookups else 0.0
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+        "names": names,
+    }
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+def owner_id(instance):
+    """The id of the user an instance belongs to, or None if it is gone."""
+    label = instance._meta.label
+    path = OWNER_PATHS.get(label)
+    if path is None:
+        return getattr(instance, "user_id", None)
+    relation, _, field = path.partition("__")
+    related_id = getattr(instance, f"{relation}_id", None)
+    if related_id is None:
+        return None
+    relation_field = instance._meta.get_field(relation)
+    if relation_field.is_cached(instance):
+        return getattr(getattr(instance, relation), field)
+    return (
+        relation_field.related_model.objects.filter(pk=related_id)
+        .values_list(field, flat=True)
+        .first()
+    )
+
+
+def _invalidate(sender, instance, **kwargs):
+    bump(owner_id(instance), MODEL_GROUPS[sender._meta.label])
+
+
+def connect_invalidation():
+    """Bump a group's version whenever one of its models is saved or deleted."""
+    for label in MODEL_GROUPS:
+        model = apps.get_model(label)
+        post_save.connect(_invalidate, sender=model, dispatch_uid=f"cache:{label}:save")
+        post_delete.connect(_invalidate, sender=model, dispatch_uid=f"cache:{label}:delete")
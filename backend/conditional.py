@@ -0,0 +1,69 @@
+"""Conditional GET support for list endpoints.
+
+``ConditionalListMixin`` validates a list with one aggregate query over the
+filtered queryset: the latest ``updated_at`` and the row count. Any create,
+update or delete of a listed row changes one of them. Lists whose rows also
+show data from other models (an account's balance comes from its
+transactions) name those model groups in ``conditional_groups`` and fold
+the per-user cache versions of those groups (see ``backend.cache``) into
+the ETag.
+
+A matching ``If-None-Match`` gets a 304 before the page is fetched or
+serialized. ``Last-Modified`` is not offered: the latest ``updated_at`` of
+the rows still listed cannot tell that one was deleted or filtered out, and
+has only whole-second resolution, so ``If-Modified-Since`` would answer 304
+for a changed list.
+"""
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+
+from backend.cache import versions
+
+
+class ConditionalListMixin:
+    conditional_field = "updated_at"
+    conditional_groups = ()
+
+    def get_conditional_queryset(self):
+        """The rows the list shows; the aggregate runs over this queryset."""
+        return self.filter_queryset(self.get_queryset())
+
+    def get_conditional_extra(self):
+        """Anything else the list depends on, as a list of strings."""
+        return []
+
+    def list_validators(self):
+        """The ETag for the current list request."""
+        state = (
+            self.get_conditional_queryset()
+            .order_by()
+            .aggregate(last=Max(self.conditional_field), count=Count("pk"))
+        )
+        last = state["last"]
+        parts = [
+            str(self.request.user.pk),
+            self.request.get_full_path(),
+            getattr(self.request.accepted_renderer, "format", ""),
+            str(state["count"]),
+            last.isoformat() if last else "",
+            *self.get_conditional_extra(),
+        ]
+        if self.conditional_groups:
+            parts.extend(
+                str(v) for v in versions(self.request.user.pk, self.conditional_groups)
+            )
+        digest = hashlib.md5("|".join(parts).encode()).hexdigest()
+        return f'W/"{digest}"'
+
+    def list(self, request, *args, **kwargs):
+        etag = self.list_validators()
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            not_modified["ETag"] = etag
+            return not_modified
+
+        response = super().list(request, *args, **kwargs)
+        response["ETag"] = etag
+        return response
@@ -0,0 +1,165 @@
+"""Prometheus metrics for the API, the cache, imports and batch commands.
+
+Metrics are kept in ``prometheus_client``'s default registry and served in
+the Prometheus text format at ``/api/metrics/``. With ``METRICS_DIR`` set
+(see settings), every process, gunicorn workers and cron-run management
+commands alike, writes its samples to files in that directory and a scrape
+merges them all, whichever worker answers it. The directory must be
+emptied when the app restarts.
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.multiprocess import MultiProcessCollector
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time to answer a request, by route and status.",
+    ["method", "route", "status"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUEST_QUERIES = Histogram(
+    "http_request_db_queries",
+    "Database queries run per request, by route.",
+    ["method", "route"],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 250),
+)
+REQUEST_DB_TIME = Counter(
+    "http_request_db_seconds",
+    "Time spent in database queries while answering requests, by route.",
+    ["method", "route"],
+)
+CACHE_LOOKUPS = Counter(
+    "cache_lookups",
+    "Per-user cache lookups, by cached name and hit or miss.",
+    ["name", "result"],
+)
+IMPORT_ROWS = Counter(
+    "import_rows",
+    "Statement rows imported, by source and outcome.",
+    ["source", "outcome"],
+)
+IMPORT_DURATION = Histogram(
+    "import_duration_seconds",
+    "Time to import one statement, by source.",
+    ["source"],
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
+COMMAND_DURATION = Histogram(
+    "management_command_duration_seconds",
+    "Run time of management commands, by command and outcome.",
+    ["command", "status"],
+    buckets=(0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 3600),
+)
+COMMAND_ROWS = Counter(
+    "management_command_rows",
+    "Rows created, updated or deleted by management commands.",
+    ["command"],
+)
+COMMAND_LAST_SUCCESS = Gauge(
+    "management_command_last_success_timestamp_seconds",
+    "When each management command last finished without an error.",
+    ["command"],
+    multiprocess_mode="max",
+)
+
+
+def route_label(request):
+    """The URL pattern a request matched, for use as a label value."""
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "<unmatched>"
+    # Router patterns are regexes; their anchors add nothing to the label.
+    return "/" + match.route.replace("^", "").replace("$", "")
+
+
+def observe_request(request, response, seconds):
+    route = route_label(request)
+    REQUEST_LATENCY.labels(request.method, route, response.status_code).observe(seconds)
+    profile = getattr(request, "profile", None)
+    if profile is not None:
+        REQUEST_QUERIES.labels(request.method, route).observe(profile["db_queries"])
+        REQUEST_DB_TIME.labels(request.method, route).inc(profile["db_ms"] / 1000)
+
+
+def record_cache_lookup(name, hit):
+    CACHE_LOOKUPS.labels(name, "hit" if hit else "miss").inc()
+
+
+def record_import(source, started, created=0, skipped=0, failed=0):
+    """Record an import that began at ``started`` (a ``time.perf_counter()``)."""
+    IMPORT_DURATION.labels(source).observe(time.perf_counter() - started)
+    for outcome, rows in (("created", created), ("skipped", skipped), ("failed", failed)):
+        if rows:
+            IMPORT_ROWS.labels(source, outcome).inc(rows)
+
+
+class MeteredCommand(BaseCommand):
+    """A management command whose run time and row count are recorded.
+
+    ``handle`` sets ``self.rows`` to the number of rows it wrote.
+    """
+
+    rows = 0
+
+    def execute(self, *args, **options):
+        name = self.__module__.rsplit(".", 1)[-1]
+        start = time.perf_counter()
+        status = "error"
+        try:
+            result = super().execute(*args, **options)
+            status = "success"
+            return result
+        finally:
+            COMMAND_DURATION.labels(name, status).observe(time.perf_counter() - start)
+            COMMAND_ROWS.labels(name).inc(self.rows)
+            if status == "success":
+                COMMAND_LAST_SUCCESS.labels(name).set(time.time())
+
+
+class CacheHitRatioCollector:
+    """Hit ratio per cached name, from the cache lookup counters of ``source``."""
+
+    def __init__(self, source):
+        self.source = source
+
+    def collect(self):
+        lookups = {}
+        for metric in self.source.collect():
+            if metric.name != "cache_lookups":
+                continue
+            for sample in metric.samples:
+                if sample.name == "cache_lookups_total":
+                    counts = lookups.setdefault(sample.labels["name"], {"hit": 0, "miss": 0})
+                    counts[sample.labels["result"]] += sample.value
+        ratio = GaugeMetricFamily(
+            "cache_hit_ratio", "Share of per-user cache lookups served from cache.",
+            labels=["name"],
+        )
+        for name, counts in sorted(lookups.items()):
+            total = counts["hit"] + counts["miss"]
+            ratio.add_metric([name], counts["hit"] / total if total else 0.0)
+        yield ratio
+
+
+def render():
+    """``(body, content_type)`` of the metrics of every process."""
+    if settings.METRICS_DIR:
+        source = CollectorRegistry()
+        MultiProcessCollector(source, path=settings.METRICS_DIR)
+    else:
+        source = REGISTRY
+    derived = CollectorRegistry()
+    derived.register(CacheHitRatioCollector(source))
+    return generate_latest(source) + generate_latest(derived), CONTENT_TYPE_LATEST
@@ -1,5 +1,22 @@
 from __future__ import annotations
 
+import cProfile
+import io
+import json
+import logging
+import pstats
+import random
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+from backend import metrics
+from backend.profiling import count_queries
+
+profiling_logger = logging.getLogger("backend.profiling")
+
 
 class NormalizeDuplicateOriginMiddleware:
     """Normalize duplicate Origin headers into a single value.
@@ -23,3 +40,128 @@ class NormalizeDuplicateOriginMiddleware:
                 if len(unique) == 1:
                     request.META["HTTP_ORIGIN"] = parts[0]
         return self.get_response(request)
+
+
+class MetricsMiddleware:
+    """Record each request's latency and query count for ``/api/metrics/``.
+
+    Goes just before ``ProfilingMiddleware``, whose query counts it reads.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+        start = time.perf_counter()
+        response = self.get_response(request)
+        metrics.observe_request(request, response, time.perf_counter() - start)
+        return response
+
+
+# Only one cProfile profiler can be active in a process at a time.
+_cprofile_lock = threading.Lock()
+
+
+class ProfilingMiddleware:
+    """Time each request and count its database queries.
+
+    The wall time, query count and query time go to the ``Server-Timing``
+    header of every response. A ``PROFILING_SAMPLE_RATE`` share of
+    requests is logged to the ``backend.profiling`` logger as one JSON
+    object; requests over ``PROFILING_SLOW_MS``, ``PROFILING_QUERY_THRESHOLD``
+    queries or ``PROFILING_DUPLICATE_THRESHOLD`` repeated statements are
+    always logged, as warnings. A ``PROFILING_CPROFILE_RATE`` share of
+    requests also runs under cProfile; the top functions are logged and,
+    with ``PROFILING_CPROFILE_DIR`` set, the full stats are saved there.
+
+    The profile is also left on ``request.profile`` for later middleware.
+    Goes at the top of ``MIDDLEWARE``, after ``MetricsMiddleware``, so the
+    time spent in the rest counts.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.PROFILING_ENABLED:
+            return self.get_response(request)
+
+        profiler = None
+        if (
+            random.random() < settings.PROFILING_CPROFILE_RATE
+            and _cprofile_lock.acquire(blocking=False)
+        ):
+            profiler = cProfile.Profile()
+            profiler.enable()
+
+        start = time.perf_counter()
+        try:
+            with count_queries() as queries:
+                response = self.get_response(request)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                _cprofile_lock.release()
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        db_ms = queries.duration * 1000
+
+        match = getattr(request, "resolver_match", None)
+        user = getattr(request, "user", None)
+        profile = {
+            "event": "request",
+            "method": request.method,
+            "path": request.path,
+            "route": match.route if match else None,
+            "view": match.view_name if match else None,
+            "status": response.status_code,
+            "user": user.pk if user is not None and user.is_authenticated else None,
+            "duration_ms": round(elapsed_ms, 2),
+            "db_queries": queries.count,
+            "db_ms": round(db_ms, 2),
+            "db_duplicates": queries.duplicates,
+        }
+        if queries.duplicates:
+            sql, times = queries.most_repeated()
+            profile["most_repeated"] = {"sql": sql[:300], "times": times}
+        request.profile = profile
+
+        if settings.PROFILING_SERVER_TIMING:
+            response["Server-Timing"] = (
+                f"total;dur={elapsed_ms:.1f}, "
+                f'db;dur={db_ms:.1f};desc="{queries.count} queries"'
+            )
+
+        if (
+            elapsed_ms >= settings.PROFILING_SLOW_MS
+            or queries.count >= settings.PROFILING_QUERY_THRESHOLD
+            or queries.duplicates >= settings.PROFILING_DUPLICATE_THRESHOLD
+        ):
+            profiling_logger.warning(json.dumps(profile), extra={"profile": profile})
+        elif random.random() < settings.PROFILING_SAMPLE_RATE:
+            profiling_logger.info(json.dumps(profile), extra={"profile": profile})
+
+        if profiler is not None:
+            self._report_cprofile(profiler, profile)
+        return response
+
+    def _report_cprofile(self, profiler, profile):
+        out = io.StringIO()
+        stats = pstats.Stats(profiler, stream=out)
+        stats.sort_stats("cumulative").print_stats(settings.PROFILING_CPROFILE_TOP)
+        record = {
+            "event": "cprofile",
+            "method": profile["method"],
+            "path": profile["path"],
+            "route": profile["route"],
+            "stats": out.getvalue(),
+        }
+        if settings.PROFILING_CPROFILE_DIR:
+            directory = Path(settings.PROFILING_CPROFILE_DIR)
+            directory.mkdir(parents=True, exist_ok=True)
+            slug = profile["path"].strip("/").replace("/", "_") or "root"
+            path = directory / f"{time.time_ns()}-{profile['method']}-{slug[:80]}.prof"
+            stats.dump_stats(path)
+            record["file"] = str(path)
+        profiling_logger.info(json.dumps(record), extra={"profile": record})
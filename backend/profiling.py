@@ -0,0 +1,50 @@
+"""Database query accounting for requests, benchmarks and tests.
+
+``count_queries`` installs a ``QueryCounter`` as an execute wrapper on
+every database connection for the duration of a block. The counter keeps
+the number of queries, their total time and how often each statement ran;
+a statement that runs many times with different parameters is the mark of
+an N+1 loop.
+"""
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0  # seconds
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.statements[sql] += 1
+
+    @property
+    def duplicates(self):
+        """Queries that repeated a statement already run in the block."""
+        return self.count - len(self.statements)
+
+    def most_repeated(self):
+        """``(sql, times)`` of the statement run most often, or None."""
+        if not self.statements:
+            return None
+        return self.statements.most_common(1)[0]
+
+
+@contextmanager
+def count_queries():
+    """Count the queries run on any connection inside the block."""
+    counter = QueryCounter()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(counter))
+        yield counter
@@ -93,9 +93,15 @@ INSTALLED_APPS = [
     'activity',
     'savings',
     'investments',
+    'dashboard',
+    'sync',
+    'benchmarks',
 ]
 
 MIDDLEWARE = [
+    # First, so the time spent in every other middleware is counted
+    'backend.middleware.MetricsMiddleware',
+    'backend.middleware.ProfilingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     # Serve static files in production
@@ -107,6 +113,8 @@ MIDDLEWARE = [
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     "allauth.account.middleware.AccountMiddleware",
+    # Flush request-scoped activity logs in one write
+    'activity.middleware.ActivityBufferMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -158,6 +166,64 @@ else:
         }
     }
 
+# Per-user read cache, see backend/cache.py. Every process serving requests
+# must see the same cache versions, so the multi-worker production setup
+# uses the file-based backend; local memory is per process and is meant for
+# development and tests.
+CACHE_BACKEND = 'locmem' if TESTING else os.getenv(
+    'CACHE_BACKEND', 'locmem' if DEBUG else 'file'
+)
+if CACHE_BACKEND == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.getenv('CACHE_DIR', str(BASE_DIR / 'cache')),
+            'TIMEOUT': 300,
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'finance-app',
+            'TIMEOUT': 300,
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+
+# Request profiling, see backend/middleware.py. Every response gets a
+# Server-Timing header; a sample of requests, and every slow or
+# query-heavy one, is logged as JSON to the "backend.profiling" logger.
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'True').lower() in ('1', 'true', 'yes')
+PROFILING_SERVER_TIMING = os.getenv('PROFILING_SERVER_TIMING', 'True').lower() in ('1', 'true', 'yes')
+PROFILING_SAMPLE_RATE = float(os.getenv(
+    'PROFILING_SAMPLE_RATE', '0' if TESTING else '1' if DEBUG else '0.05'
+))
+PROFILING_SLOW_MS = float(os.getenv('PROFILING_SLOW_MS', '500'))
+PROFILING_QUERY_THRESHOLD = int(os.getenv('PROFILING_QUERY_THRESHOLD', '50'))
+PROFILING_DUPLICATE_THRESHOLD = int(os.getenv('PROFILING_DUPLICATE_THRESHOLD', '10'))
+# Share of requests run under cProfile, and where to save their stats
+PROFILING_CPROFILE_RATE = float(os.getenv('PROFILING_CPROFILE_RATE', '0'))
+PROFILING_CPROFILE_DIR = os.getenv('PROFILING_CPROFILE_DIR', '')
+PROFILING_CPROFILE_TOP = 30
+
+# Prometheus metrics at /api/metrics/, see backend/metrics.py. Gunicorn
+# workers and cron-run management commands each write their samples to
+# METRICS_DIR, which a scrape merges; empty it whenever the app restarts
+# (the systemd units do, see DEPLOYMENT.md for cron jobs).
+# Without it (development, tests) only the serving process is reported.
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True').lower() in ('1', 'true', 'yes')
+METRICS_DIR = '' if TESTING else os.getenv(
+    'PROMETHEUS_MULTIPROC_DIR', '' if DEBUG else str(BASE_DIR / 'metrics')
+)
+if METRICS_DIR:
+    Path(METRICS_DIR).mkdir(parents=True, exist_ok=True)
+    # Read by prometheus_client when it is first imported
+    os.environ['PROMETHEUS_MULTIPROC_DIR'] = METRICS_DIR
+# Bearer token for scrapers; staff sessions may read the metrics without it
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -226,6 +292,12 @@ if not DEBUG:
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Activity log entries that could not be written are spooled here and
+# replayed by `manage.py replay_activity_spool`
+ACTIVITY_SPOOL_DIR = Path(
+    os.getenv('ACTIVITY_SPOOL_DIR', str(BASE_DIR / 'activity_spool'))
+)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -267,11 +339,15 @@ CORS_ALLOW_HEADERS = [
     'authorization',
     'content-type',
     'dnt',
+    'if-modified-since',
+    'if-none-match',
     'origin',
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
 ]
+# Let cross-origin clients (the mobile app) read list validators
+CORS_EXPOSE_HEADERS = ['etag', 'last-modified', 'server-timing']
 CORS_PREFLIGHT_MAX_AGE = 86400  # Cache preflight for 24 hours
 
 # Cookie settings - will be overridden for production below
@@ -0,0 +1,185 @@
+import json
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase
+from prometheus_client import REGISTRY
+from rest_framework.test import APIClient
+
+from backend.profiling import count_queries
+from finance.models import Account
+
+User = get_user_model()
+
+
+class ProfilingMiddlewareTestCase(TestCase):
+    """Test request timing, query counting and profile logging."""
+
+    url = '/api/finance/accounts/'
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser', password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        for n in range(3):
+            Account.objects.create(
+                user=self.user, name=f'Account {n}', opening_balance=Decimal('10.00')
+            )
+
+    def test_server_timing_header(self):
+        response = self.client.get(self.url)
+        profile = response.wsgi_request.profile
+        self.assertGreater(profile['db_queries'], 0)
+        self.assertEqual(profile['status'], 200)
+        self.assertEqual(profile['user'], self.user.id)
+        self.assertIn('accounts', profile['route'])
+        self.assertIn(
+            f'db;dur={profile["db_ms"]:.1f};desc="{profile["db_queries"]} queries"',
+            response['Server-Timing'],
+        )
+
+        with self.settings(PROFILING_SERVER_TIMING=False):
+            self.assertNotIn('Server-Timing', self.client.get(self.url))
+        with self.settings(PROFILING_ENABLED=False):
+            response = self.client.get(self.url)
+            self.assertNotIn('Server-Timing', response)
+            self.assertFalse(hasattr(response.wsgi_request, 'profile'))
+
+    def test_sampled_and_heavy_requests_are_logged(self):
+        with self.assertNoLogs('backend.profiling'):
+            self.client.get(self.url)
+
+        with self.settings(PROFILING_SAMPLE_RATE=1):
+            with self.assertLogs('backend.profiling', 'INFO') as logs:
+                self.client.get(self.url)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(logs.records[0].levelname, 'INFO')
+        self.assertEqual(record['path'], self.url)
+        self.assertEqual(logs.records[0].profile, record)
+
+        with self.settings(PROFILING_QUERY_THRESHOLD=1):
+            with self.assertLogs('backend.profiling', 'WARNING') as logs:
+                self.client.get(self.url)
+        self.assertEqual(logs.records[0].levelname, 'WARNING')
+
+    def test_repeated_statements_are_counted(self):
+        with count_queries() as queries:
+            for account in Account.objects.order_by('id'):
+                Account.objects.get(pk=account.pk)
+        self.assertEqual(queries.count, 4)
+        self.assertEqual(queries.duplicates, 2)
+        sql, times = queries.most_repeated()
+        self.assertEqual(times, 3)
+        self.assertIn('WHERE', sql)
+
+    def test_cprofile_sampling(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with self.settings(PROFILING_CPROFILE_RATE=1, PROFILING_CPROFILE_DIR=directory):
+                with self.assertLogs('backend.profiling', 'INFO') as logs:
+                    self.client.get(self.url)
+            record = json.loads(logs.records[-1].getMessage())
+            self.assertEqual(record['event'], 'cprofile')
+            self.assertIn('cumulative', record['stats'])
+            self.assertTrue(Path(record['file']).exists())
+
+
+class MetricsTestCase(TestCase):
+    """Test the Prometheus metrics endpoint."""
+
+    url = '/api/metrics/'
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='testuser', password='testpass123', is_staff=True
+        )
+        self.client = APIClient()
+        self.client.force_login(self.user)
+
+    def sample(self, metric, **labels):
+        return REGISTRY.get_sample_value(metric, labels) or 0
+
+    def test_request_and_cache_metrics(self):
+        route = '/api/savings/goals/summary/'
+        labels = {'method': 'GET', 'route': route}
+        requests = self.sample(
+            'http_request_duration_seconds_count', status='200', **labels
+        )
+        queries = self.sample('http_request_db_queries_sum', **labels)
+        misses = self.sample('cache_lookups_total', name='savings_summary', result='miss')
+        self.client.get(route)
+        self.client.get(route)
+
+        self.assertEqual(self.sample(
+            'http_request_duration_seconds_count', status='200', **labels
+        ), requests + 2)
+        self.assertGreater(self.sample('http_request_db_queries_sum', **labels), queries)
+        self.assertEqual(
+            self.sample('cache_lookups_total', name='savings_summary', result='miss'),
+            misses + 1,
+        )
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        body = response.content.decode()
+        self.assertIn(
+            'http_request_duration_seconds_bucket{le="0.01",method="GET",'
+            f'route="{route}",status="200"}}', body
+        )
+        self.assertIn('cache_hit_ratio{name="savings_summary"}', body)
+
+    def test_commands_and_imports(self):
+        runs = self.sample(
+            'management_command_duration_seconds_count',
+            command='cleanup_activity_logs', status='success',
+        )
+        call_command('cleanup_activity_logs', stdout=StringIO())
+        self.assertEqual(self.sample(
+            'management_command_duration_seconds_count',
+            command='cleanup_activity_logs', status='success',
+        ), runs + 1)
+        self.assertGreater(self.sample(
+            'management_command_last_success_timestamp_seconds',
+            command='cleanup_activity_logs',
+        ), 0)
+
+        account = Account.objects.create(user=self.user, name='Bank')
+        created = self.sample('import_rows_total', source='csv', outcome='created')
+        failed = self.sample('import_rows_total', source='csv', outcome='failed')
+        upload = SimpleUploadedFile('statement.csv', (
+            'account,date,amount,kind\n'
+            f'{account.id},2024-01-01,10.00,EXPENSE\n'
+            f'{account.id},2024-01-02,12.00,EXPENSE\n'
+            '0,2024-01-03,5.00,EXPENSE\n'
+        ).encode())
+        self.client.post('/api/finance/transactions/import-csv/', {'file': upload})
+        self.assertEqual(
+            self.sample('import_rows_total', source='csv', outcome='created'), created + 2
+        )
+        self.assertEqual(
+            self.sample('import_rows_total', source='csv', outcome='failed'), failed + 1
+        )
+
+    def test_access(self):
+        self.user.is_staff = False
+        self.user.save()
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+        self.client.logout()
+        with self.settings(METRICS_TOKEN='secret'):
+            self.assertEqual(self.client.get(self.url).status_code, 403)
+            response = self.client.get(self.url, HTTP_AUTHORIZATION='Bearer wrong')
+            self.assertEqual(response.status_code, 403)
+            response = self.client.get(self.url, HTTP_AUTHORIZATION='Bearer sécret')
+            self.assertEqual(response.status_code, 403)
+            response = self.client.get(self.url, HTTP_AUTHORIZATION='Bearer secret')
+            self.assertEqual(response.status_code, 200)
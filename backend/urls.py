@@ -14,6 +14,11 @@ from backend.auth_views import (
     logout_view,
 )
 from drf_spectacular.views import SpectacularAPIView, SpectacularRedocView, SpectacularSwaggerView
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from backend import cache, metrics
+import hmac
 import os
 
 
@@ -40,6 +45,30 @@ def health_check(request):
     return JsonResponse({'status': 'healthy', 'service': 'finance-app'})
 
 
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def cache_stats(request):
+    """Per-user cache hit/miss counters of the worker serving the request."""
+    return Response(cache.stats())
+
+
+def metrics_view(request):
+    """Prometheus metrics of every worker and command run.
+
+    Pass METRICS_TOKEN as a bearer token, or be signed in as staff.
+    """
+    token = settings.METRICS_TOKEN
+    # compare_digest only accepts ASCII str, so compare bytes.
+    authorization = request.headers.get("Authorization", "").encode()
+    if not (
+        (token and hmac.compare_digest(authorization, f"Bearer {token}".encode()))
+        or request.user.is_staff
+    ):
+        return HttpResponse(status=403)
+    body, content_type = metrics.render()
+    return HttpResponse(body, content_type=content_type)
+
+
 def google_login_check(request):
     """Check if Google OAuth is configured before redirecting."""
     google_client_id = os.getenv('GOOGLE_CLIENT_ID', '')
@@ -61,6 +90,8 @@ urlpatterns = [
     
     # Health check for monitoring
     path("api/health/", health_check, name="health_check"),
+    path("api/cache/stats/", cache_stats, name="cache_stats"),
+    path("api/metrics/", metrics_view, name="metrics"),
     # OpenAPI schema and UI
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
     path('api/schema/swagger/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
@@ -89,6 +120,8 @@ urlpatterns = [
     path("api/investments/", include("investments.urls")),
     path("api/", include("notifications.urls")),
     path("api/activity/", include("activity.urls")),
+    path("api/dashboard/", include("dashboard.urls")),
+    path("api/sync/", include("sync.urls")),
     
     # Static file helpers
     path("favicon.ico", favicon_view),
@@ -0,0 +1,151 @@
+"""Seed a synthetic dataset and time the key endpoints and utilities.
+
+By default everything happens in a throwaway test database, so the command
+is safe to run against a development checkout; ``--current-db`` seeds and
+measures the configured database instead. Results are written as JSON so
+runs can be kept and compared with ``--baseline``.
+
+Run it on a development machine or in CI, never against production.
+"""
+import json
+import logging
+import platform
+import time
+from contextlib import contextmanager
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from benchmarks.seed import seed_users
+from benchmarks.suite import CASES, compare, run_suite
+
+User = get_user_model()
+
+PREFIX = "bench-user"
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed synthetic users and time the key endpoints and utilities, "
+        "printing the results as JSON. Do not run against production."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1,
+                            help="Users to create (default: 1).")
+        parser.add_argument("--transactions", type=int, default=1000,
+                            help="Transactions shared across the users (default: 1000).")
+        parser.add_argument("--months", type=int, default=24,
+                            help="Months of history to generate (default: 24).")
+        parser.add_argument("--repeat", type=int, default=5,
+                            help="Timed runs per case (default: 5).")
+        parser.add_argument("--seed", type=int, default=42,
+                            help="Random seed for the generated data (default: 42).")
+        parser.add_argument("--only", nargs="+", metavar="CASE",
+                            choices=[case.name for case in CASES],
+                            help="Only run these cases.")
+        parser.add_argument("--output", help="Write the JSON results to this file.")
+        parser.add_argument("--baseline",
+                            help="Earlier results to compare the medians against.")
+        parser.add_argument("--keepdb", action="store_true",
+                            help="Keep the benchmark database between runs.")
+        parser.add_argument("--current-db", action="store_true",
+                            help="Use the configured database instead of a throwaway one.")
+
+    def handle(self, *args, **options):
+        if options["users"] < 1 or options["transactions"] < 0 or options["repeat"] < 1:
+            raise CommandError("--users and --repeat must be positive, --transactions at least 0.")
+        baseline = None
+        if options["baseline"]:
+            with open(options["baseline"]) as f:
+                baseline = json.load(f)
+
+        with self.database(options), self.isolated():
+            report = self.run(options)
+        if baseline is not None:
+            compare(report["results"], baseline)
+
+        body = json.dumps(report, indent=2)
+        if not options["output"]:
+            self.stdout.write(body)
+            return
+        with open(options["output"], "w") as f:
+            f.write(body + "\n")
+        for case in report["results"]:
+            line = f'{case["name"]:<26}{case["median_ms"]:>10.1f} ms{case["queries"]:>6} queries'
+            if "change" in case:
+                line += f'{case["change"]:>+9.1%}'
+            self.stdout.write(line)
+        self.stdout.write(self.style.SUCCESS(f'Wrote {options["output"]}.'))
+
+    def run(self, options):
+        if User.objects.filter(username__startswith=PREFIX).exists():
+            if not options["keepdb"]:
+                raise CommandError(
+                    f'Users named "{PREFIX}-*" already exist; '
+                    "use a fresh database or --keepdb to reuse them."
+                )
+            started = time.perf_counter()
+            users = list(User.objects.filter(username__startswith=PREFIX).order_by("id"))
+            rows = {}
+        else:
+            started = time.perf_counter()
+            users, rows = seed_users(
+                options["users"], options["transactions"],
+                months=options["months"], seed=options["seed"], prefix=PREFIX,
+            )
+        seed_seconds = time.perf_counter() - started
+
+        return {
+            "meta": {
+                "started_at": timezone.now().isoformat(),
+                "args": {
+                    key: options[key]
+                    for key in ("users", "transactions", "months", "repeat", "seed", "only")
+                },
+                "database": connection.vendor,
+                "python": platform.python_version(),
+                "django": django.get_version(),
+            },
+            "dataset": {"rows": rows, "seed_seconds": round(seed_seconds, 3)},
+            "results": run_suite(users[0], options["repeat"], options["only"]),
+        }
+
+    @contextmanager
+    def database(self, options):
+        if options["current_db"]:
+            yield
+            return
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, keepdb=options["keepdb"]
+        )
+        try:
+            yield
+        finally:
+            connection.creation.destroy_test_db(
+                old_name, verbosity=0, keepdb=options["keepdb"]
+            )
+
+    @contextmanager
+    def isolated(self):
+        """A private cache, no metrics and no slow-request warnings."""
+        profiling = logging.getLogger("backend.profiling")
+        disabled = profiling.disabled
+        profiling.disabled = True
+        try:
+            with override_settings(
+                ALLOWED_HOSTS=["testserver"],
+                METRICS_ENABLED=False,
+                CACHES={"default": {
+                    "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                    "LOCATION": "benchmark",
+                }},
+            ):
+                yield
+        finally:
+            profiling.disabled = disabled
@@ -0,0 +1,44 @@
+"""Print every endpoint's query count for a small and a large dataset.
+
+The same check ``benchmarks.tests.QueryBudgetTestCase`` runs, as a report:
+each endpoint's count at both sizes, with the ones that grew marked. Runs in
+a throwaway test database unless ``--current-db`` is given, and rolls back
+everything it creates either way.
+"""
+from django.contrib.auth import get_user_model
+from django.core.management.base import CommandError
+from django.db import transaction
+
+from benchmarks.management.commands.benchmark import Command as BenchmarkCommand
+from benchmarks.query_budget import LARGE, SMALL, measure, populate, report
+
+User = get_user_model()
+
+
+class Command(BenchmarkCommand):
+    help = (
+        "Print each endpoint's query count for a small and a large dataset; "
+        "fails if any count grew."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--current-db", action="store_true",
+                            help="Use the configured database instead of a throwaway one.")
+
+    def handle(self, *args, **options):
+        options["keepdb"] = False
+        with self.database(options), self.isolated(), transaction.atomic():
+            counts = []
+            for size in (SMALL, LARGE):
+                user = User.objects.create_user(username=f"query-budget-{size}")
+                counts.append(measure(user, populate(user, size)))
+            transaction.set_rollback(True)
+
+        small, large = counts
+        self.stdout.write(report(small, large))
+        grew = [label for label in small if large[label] > small[label]]
+        if grew:
+            raise CommandError(f"Query counts grew for: {', '.join(grew)}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(small)} endpoints within budget."
+        ))
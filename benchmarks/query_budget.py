@@ -0,0 +1,376 @@
+"""Query budgets: endpoint query counts that must not grow with the data.
+
+``populate`` gives a user ``size`` of everything: accounts with ``size``
+transactions each, budgets with ``size`` lines, goals with ``size``
+contributions, investments with ``size`` trades and prices, and so on.
+``measure`` requests every endpoint in ``ENDPOINTS`` as that user and counts
+the queries each one runs. An endpoint that runs more queries for a bigger
+dataset has a query inside a loop over rows, an N+1.
+
+Every list, detail and action route under ``/api/`` must either appear in
+``ENDPOINTS`` or be listed in ``EXEMPT`` with the reason it is left out;
+``uncovered_routes`` names the ones that do neither.
+"""
+from dataclasses import dataclass, field
+from datetime import timedelta
+from decimal import Decimal
+from typing import Callable, Optional
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import transaction
+from django.urls import URLResolver, get_resolver, reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from activity.models import ActivityLog
+from backend.profiling import count_queries
+from budgeting.models import Budget, BudgetLine
+from debt_planner.models import DebtPlan
+from finance.models import Account, Category, RecurringTransaction, Tag, Transaction
+from investments.models import Investment, InvestmentPrice, InvestmentTransaction
+from notifications.models import Notification
+from savings.models import GoalContribution, SavingsGoal
+from wealth.models import Asset, Liability, NetWorthSnapshot
+
+SMALL = 2
+LARGE = 5
+
+# Routes deliberately left out of the budget, with the reason why.
+EXEMPT = {
+    "health_check": "Public liveness probe; does not read user data.",
+    "cache_stats": "Staff-only cache diagnostics; reads no rows.",
+    "metrics": "Prometheus scrape; reads no rows.",
+    "schema": "OpenAPI schema; reads no rows.",
+    "swagger-ui": "API docs page; reads no rows.",
+    "redoc": "API docs page; reads no rows.",
+    "api-root": "Router index; reads no rows.",
+    "transaction-import-pdf-preview": "Parses an uploaded PDF; reads no rows.",
+}
+
+
+@dataclass
+class Endpoint:
+    """One request to budget.
+
+    ``pk`` names the fixture whose id fills the route's ``pk``; ``data``
+    builds the request body from the fixtures. Requests other than GET are
+    rolled back, so each one sees the same data.
+    """
+
+    route: str
+    method: str = "get"
+    pk: Optional[str] = None
+    query: str = ""
+    data: Optional[Callable] = None
+    format: Optional[str] = "json"
+    label: str = field(default="")
+
+    def __post_init__(self):
+        self.label = self.label or (f"{self.route}{'?' + self.query if self.query else ''}")
+
+    def path(self, fixtures):
+        kwargs = {"pk": fixtures[self.pk].pk} if self.pk else None
+        path = reverse(self.route, kwargs=kwargs)
+        return f"{path}?{self.query}" if self.query else path
+
+
+def _import_rows(fixtures):
+    today = timezone.localdate()
+    return [
+        {"date": (today - timedelta(days=n)).isoformat(), "amount": "25.00",
+         "kind": "EXPENSE", "description": f"Imported {n}"}
+        for n in range(3)
+    ]
+
+
+def _csv(fixtures):
+    body = "account,date,amount,kind,description\n" + "".join(
+        f'{fixtures["account"].id},{row["date"]},{row["amount"]},{row["kind"]},{row["description"]}\n'
+        for row in _import_rows(fixtures)
+    )
+    return {"file": SimpleUploadedFile("statement.csv", body.encode(), content_type="text/csv")}
+
+
+ENDPOINTS = [
+    Endpoint("account-list"),
+    Endpoint("account-detail", pk="account"),
+    Endpoint("category-list"),
+    Endpoint("category-detail", pk="category"),
+    Endpoint("transaction-list"),
+    Endpoint("transaction-list", query="limit=10"),
+    Endpoint("transaction-detail", pk="transaction"),
+    Endpoint("transaction-aggregated", query="group_by=month"),
+    Endpoint("transaction-top-categories"),
+    Endpoint("transaction-export-csv"),
+    Endpoint("transaction-import-csv", "post", data=_csv, format="multipart"),
+    Endpoint(
+        "transaction-import-pdf-confirm", "post",
+        data=lambda f: {"account": f["account"].id, "transactions": _import_rows(f)},
+    ),
+    Endpoint("recurring-list"),
+    Endpoint("recurring-detail", pk="recurring"),
+    Endpoint("recurring-preview", pk="recurring"),
+    Endpoint("recurring-materialize", "post", data=lambda f: {"days": 1}),
+    Endpoint("recurring-notify-due", "post", data=lambda f: {"days": 1}),
+    Endpoint("tag-list"),
+    Endpoint("tag-detail", pk="tag"),
+    Endpoint("tag-analysis"),
+    Endpoint("budget-list"),
+    Endpoint("budget-detail", pk="budget"),
+    Endpoint("budget-summary", pk="budget"),
+    Endpoint("budget-line-list"),
+    Endpoint("budget-line-detail", pk="budget_line"),
+    Endpoint("asset-list"),
+    Endpoint("asset-detail", pk="asset"),
+    Endpoint("asset-sync-from-accounts", "post"),
+    Endpoint("liability-list"),
+    Endpoint("liability-detail", pk="liability"),
+    Endpoint("net-worth-snapshot-list"),
+    Endpoint("net-worth-snapshot-detail", pk="snapshot"),
+    Endpoint("net-worth-snapshot-current"),
+    Endpoint("net-worth-snapshot-snapshot", "post"),
+    Endpoint(
+        "net-worth-snapshot-backfill", "post",
+        data=lambda f: {"start": timezone.localdate().isoformat()},
+    ),
+    Endpoint("debt-plan-list"),
+    Endpoint("debt-plan-detail", pk="plan"),
+    Endpoint("debt-plan-schedule", pk="plan"),
+    Endpoint("debt-plan-compare", "post", pk="plan", data=lambda f: {}),
+    Endpoint("savingsgoal-list"),
+    Endpoint("savingsgoal-detail", pk="goal"),
+    Endpoint("savingsgoal-summary"),
+    Endpoint(
+        "savingsgoal-contribute", "post", pk="goal",
+        data=lambda f: {"amount": "10.00", "date": timezone.localdate().isoformat()},
+    ),
+    Endpoint("goalcontribution-list"),
+    Endpoint("goalcontribution-detail", pk="contribution"),
+    Endpoint("investment-list"),
+    Endpoint("investment-list", query="include=transactions"),
+    Endpoint("investment-detail", pk="investment"),
+    Endpoint("investment-summary"),
+    Endpoint("investment-portfolio-series"),
+    Endpoint("investment-transactions", pk="investment"),
+    Endpoint("investment-cost-basis", pk="investment"),
+    Endpoint("investment-performance", pk="investment"),
+    Endpoint(
+        "investment-add-transaction", "post", pk="investment",
+        data=lambda f: {
+            "transaction_type": "BUY", "date": timezone.localdate().isoformat(),
+            "quantity": "1", "price_per_unit": "10.00", "total_amount": "10.00",
+        },
+    ),
+    Endpoint(
+        "investment-update-price", "post", pk="investment",
+        data=lambda f: {"current_price": "12.00"},
+    ),
+    Endpoint(
+        "investment-prices", "post",
+        data=lambda f: [{"id": f["investment"].id, "price": "11.00"}],
+    ),
+    Endpoint("investment-transaction-list"),
+    Endpoint("investment-transaction-detail", pk="trade"),
+    Endpoint("notification-list"),
+    Endpoint("notification-detail", pk="notification"),
+    Endpoint("notification-unread-count"),
+    Endpoint("notification-mark-read", "post", pk="notification"),
+    Endpoint("notification-mark-all-read", "post"),
+    Endpoint("activity-list"),
+    Endpoint("activity-detail", pk="activity"),
+    Endpoint("dashboard"),
+    Endpoint("sync"),
+    Endpoint("profiles:profile"),
+]
+
+
+def populate(user, size):
+    """Give ``user`` ``size`` of every kind of row; return one of each."""
+    today = timezone.localdate()
+    start = today.replace(day=1)
+    n = range(size)
+
+    expenses = [
+        Category.objects.create(user=user, name=f"Expense {i}", kind=Category.Kind.EXPENSE)
+        for i in n
+    ]
+    income = [
+        Category.objects.create(user=user, name=f"Income {i}", kind=Category.Kind.INCOME)
+        for i in n
+    ]
+    accounts = [
+        Account.objects.create(user=user, name=f"Account {i}", opening_balance=Decimal("1000.00"))
+        for i in n
+    ]
+    tags = [Tag.objects.create(user=user, name=f"tag{i}") for i in n]
+    liabilities = [
+        Liability.objects.create(
+            user=user, name=f"Loan {i}", principal_balance=Decimal("5000.00") * (i + 1),
+            interest_rate=Decimal("12.00"), minimum_payment=Decimal("100.00"),
+        )
+        for i in n
+    ]
+    goals = [
+        SavingsGoal.objects.create(
+            user=user, name=f"Goal {i}", target_amount=Decimal("10000.00"),
+            linked_account=accounts[i],
+        )
+        for i in n
+    ]
+    investments = [
+        Investment.objects.create(
+            user=user, name=f"Holding {i}", symbol=f"SYM{i}", investment_type="STOCK",
+            purchase_date=start - timedelta(days=90), purchase_price=Decimal("10.00"),
+            quantity=Decimal(size), current_price=Decimal("12.00"),
+        )
+        for i in n
+    ]
+
+    transactions = []
+    for i, account in enumerate(accounts):
+        for j in n:
+            transactions.append(Transaction.objects.create(
+                user=user, account=account, date=today - timedelta(days=j),
+                amount=Decimal("10.00") * (j + 1), kind=Transaction.Kind.EXPENSE,
+                category=expenses[j], savings_goal=goals[j], liability=liabilities[j],
+                investment=investments[j], tags=",".join(tag.name for tag in tags),
+                description=f"Spend {i}.{j}",
+            ))
+            Transaction.objects.create(
+                user=user, account=account, date=today - timedelta(days=j),
+                amount=Decimal("500.00"), kind=Transaction.Kind.INCOME,
+                category=income[j], description=f"Pay {i}.{j}",
+            )
+
+    linked = iter(transactions)
+    for goal in goals:
+        for j in n:
+            GoalContribution.objects.create(
+                goal=goal, amount=Decimal("50.00"), date=today - timedelta(days=j),
+                transaction=next(linked),
+            )
+    trades = []
+    for investment in investments:
+        for j in n:
+            trades.append(InvestmentTransaction.objects.create(
+                investment=investment, transaction_type="BUY",
+                date=start - timedelta(days=30 * j), quantity=Decimal("1"),
+                price_per_unit=Decimal("10.00"), total_amount=Decimal("10.00"),
+            ))
+            InvestmentPrice.objects.create(
+                investment=investment, date=today - timedelta(days=j), price=Decimal("11.00")
+            )
+
+    budgets = [
+        Budget.objects.create(
+            user=user, name=f"Budget {i}", start_date=start, end_date=today + timedelta(days=30)
+        )
+        for i in n
+    ]
+    lines = [
+        BudgetLine.objects.create(budget=budget, category=category, planned_amount=Decimal("100.00"))
+        for budget in budgets
+        for category in expenses
+    ]
+    recurring = [
+        RecurringTransaction.objects.create(
+            user=user, account=accounts[i], date=today + timedelta(days=7 + i),
+            amount=Decimal("20.00"), kind=Transaction.Kind.EXPENSE, category=expenses[i],
+        )
+        for i in n
+    ]
+    assets = [
+        Asset.objects.create(user=user, name=f"Asset {i}", current_value=Decimal("3000.00"))
+        for i in n
+    ]
+    snapshots = [
+        NetWorthSnapshot.objects.create(
+            user=user, date=today - timedelta(days=i + 1), total_assets=Decimal("100.00"),
+            total_liabilities=Decimal("50.00"), net_worth=Decimal("50.00"),
+        )
+        for i in n
+    ]
+    notifications = [
+        Notification.objects.create(user=user, title=f"Notice {i}") for i in n
+    ]
+    logs = [
+        ActivityLog.objects.create(user=user, action="test", summary=f"Event {i}") for i in n
+    ]
+    plan = DebtPlan.objects.create(
+        user=user, monthly_amount_available=Decimal("100.00") * size * 2, start_date=start
+    )
+    return {
+        "account": accounts[0],
+        "category": expenses[0],
+        "transaction": transactions[0],
+        "recurring": recurring[0],
+        "tag": tags[0],
+        "budget": budgets[0],
+        "budget_line": lines[0],
+        "asset": assets[0],
+        "liability": liabilities[0],
+        "snapshot": snapshots[0],
+        "plan": plan,
+        "goal": goals[0],
+        "contribution": goals[0].contributions.first(),
+        "investment": investments[0],
+        "trade": trades[0],
+        "notification": notifications[0],
+        "activity": logs[0],
+    }
+
+
+def measure(user, fixtures, endpoints=ENDPOINTS):
+    """Query count of each endpoint, by label, requested as ``user``."""
+    client = APIClient()
+    client.force_authenticate(user=user)
+    counts = {}
+    for endpoint in endpoints:
+        cache.clear()
+        request = getattr(client, endpoint.method)
+        path = endpoint.path(fixtures)
+        with transaction.atomic():
+            if endpoint.method == "get":
+                kwargs = {}
+            else:
+                data = endpoint.data(fixtures) if endpoint.data else {}
+                kwargs = {"data": data, "format": endpoint.format}
+            with count_queries() as queries:
+                response = request(path, **kwargs)
+            transaction.set_rollback(True)
+        if response.status_code >= 400:
+            raise AssertionError(
+                f"{endpoint.method.upper()} {path} answered {response.status_code}: "
+                f"{response.content[:300]!r}"
+            )
+        counts[endpoint.label] = queries.count
+    return counts
+
+
+def report(small, large):
+    """A table of both counts per endpoint, marking the ones that grew."""
+    width = max(len(label) for label in small)
+    lines = [f"{'endpoint':<{width}}  {'small':>5}  {'large':>5}"]
+    for label, count in small.items():
+        mark = "  GREW" if large[label] > count else ""
+        lines.append(f"{label:<{width}}  {count:>5}  {large[label]:>5}{mark}")
+    return "\n".join(lines)
+
+
+def api_routes(patterns=None, prefix="", namespace=""):
+    """Names of the URL patterns under ``/api/``, as ``reverse`` takes them."""
+    if patterns is None:
+        patterns = get_resolver().url_patterns
+    for pattern in patterns:
+        route = prefix + str(pattern.pattern)
+        if isinstance(pattern, URLResolver):
+            inner = f"{namespace}{pattern.namespace}:" if pattern.namespace else namespace
+            yield from api_routes(pattern.url_patterns, route, inner)
+        elif route.startswith("api/") and pattern.name:
+            yield namespace + pattern.name
+
+
+def uncovered_routes():
+    covered = {endpoint.route for endpoint in ENDPOINTS} | set(EXEMPT)
+    return sorted(set(api_routes()) - covered)
@@ -0,0 +1,260 @@
+"""Reproducible synthetic datasets for the benchmark suite.
+
+``seed_users`` creates users shaped like real ones: a few accounts, income
+and expense categories, a monthly salary and everyday spending spread over
+the last ``months`` months, monthly budgets, savings goals with monthly
+contributions, an investment portfolio with trades, manual assets, loans
+with a debt plan and some recurring bills. Every value is drawn from one
+``random.Random(seed)``, so the same arguments give the same rows.
+
+Rows are written with ``bulk_create`` in batches, so seeding millions of
+transactions stays a matter of minutes. ``bulk_create`` sends no signals,
+and fresh users have nothing cached to invalidate.
+"""
+import random
+from datetime import timedelta
+from decimal import Decimal
+from itertools import islice
+
+from dateutil.relativedelta import relativedelta
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from budgeting.models import Budget, BudgetLine
+from debt_planner.models import DebtPlan
+from finance.models import Account, Category, RecurringTransaction, Transaction
+from investments.models import Investment, InvestmentTransaction
+from savings.models import GoalContribution, SavingsGoal
+from wealth.models import Asset, Liability
+
+User = get_user_model()
+
+BATCH_SIZE = 5000
+
+ACCOUNTS = (
+    ("Bank", Account.AccountType.BANK, 150_000_00),
+    ("M-Pesa", Account.AccountType.MOBILE_MONEY, 8_000_00),
+    ("Cash", Account.AccountType.CASH, 2_000_00),
+    ("Credit Card", Account.AccountType.CREDIT_CARD, 0),
+)
+# Expense category -> (share of transactions, typical amount in cents)
+EXPENSES = {
+    "Groceries": (0.28, 2_500_00),
+    "Transport": (0.20, 400_00),
+    "Dining": (0.14, 1_200_00),
+    "Shopping": (0.12, 3_000_00),
+    "Entertainment": (0.08, 1_500_00),
+    "Utilities": (0.06, 2_000_00),
+    "Health": (0.06, 2_500_00),
+    "Airtime": (0.06, 100_00),
+}
+INCOME = ("Salary", "Side Income", "Interest")
+SALARY = 180_000_00
+
+
+def money(cents):
+    return Decimal(cents).scaleb(-2)
+
+
+class Seeder:
+    def __init__(self, seed=42, months=24, today=None):
+        self.rng = random.Random(seed)
+        self.months = months
+        self.today = today or timezone.localdate()
+        self.start = self.today - relativedelta(months=months)
+        self.days = (self.today - self.start).days
+        self.rows = {}
+
+    def _save(self, model, objects):
+        # Consumed a batch at a time, so a generator of millions of rows is
+        # never held in memory. Callers that need the saved rows pass a list.
+        objects = iter(objects)
+        label = model._meta.label
+        while batch := list(islice(objects, BATCH_SIZE)):
+            model.objects.bulk_create(batch)
+            self.rows[label] = self.rows.get(label, 0) + len(batch)
+
+    def _cents(self, typical):
+        # Long-tailed around the typical amount, like real spending.
+        return max(1_00, int(typical * self.rng.lognormvariate(0, 0.6)))
+
+    def _day(self):
+        return self.start + timedelta(days=self.rng.randrange(self.days + 1))
+
+    def seed_user(self, username, transactions):
+        user = User.objects.create_user(username=username, password=username)
+        self.rows[User._meta.label] = self.rows.get(User._meta.label, 0) + 1
+
+        accounts = [
+            Account(
+                user=user, name=name, account_type=kind,
+                opening_balance=money(opening), currency="KES",
+            )
+            for name, kind, opening in ACCOUNTS
+        ]
+        self._save(Account, accounts)
+        bank, mobile = accounts[0], accounts[1]
+        categories = [
+            *(Category(user=user, name=name, kind=Category.Kind.INCOME) for name in INCOME),
+            *(Category(user=user, name=name, kind=Category.Kind.EXPENSE) for name in EXPENSES),
+        ]
+        self._save(Category, categories)
+        income = {c.name: c for c in categories if c.kind == Category.Kind.INCOME}
+        expenses = [c for c in categories if c.kind == Category.Kind.EXPENSE]
+        weights = [EXPENSES[c.name][0] for c in expenses]
+
+        self._save(Transaction, self._transactions(
+            user, accounts, bank, mobile, income, expenses, weights, transactions
+        ))
+        self._budgets(user, expenses)
+        self._goals(user, bank)
+        self._portfolio(user)
+        self._debts(user)
+        self._save(RecurringTransaction, (
+            RecurringTransaction(
+                user=user, account=bank, date=self.start + timedelta(days=day),
+                amount=money(amount), kind=Transaction.Kind.EXPENSE,
+                category=expenses[index], description=name,
+                frequency=RecurringTransaction.Frequency.MONTHLY,
+            )
+            for index, (name, amount, day) in enumerate((
+                ("Internet", 4_000_00, 4), ("Streaming", 1_100_00, 11), ("Gym", 5_000_00, 20),
+            ))
+        ))
+        return user
+
+    def _transactions(self, user, accounts, bank, mobile, income, expenses, weights, count):
+        salaries = min(count, self.months)
+        for n in range(salaries):
+            yield Transaction(
+                user=user, account=bank, kind=Transaction.Kind.INCOME,
+                date=self.start + relativedelta(months=n + 1, day=25),
+                amount=money(SALARY), category=income["Salary"], description="Salary",
+            )
+        for _ in range(count - salaries):
+            if self.rng.random() < 0.04:
+                category = income[self.rng.choice(INCOME[1:])]
+                yield Transaction(
+                    user=user, account=self.rng.choice((bank, mobile)),
+                    kind=Transaction.Kind.INCOME, date=self._day(),
+                    amount=money(self._cents(5_000_00)), category=category,
+                    description=category.name,
+                )
+                continue
+            category = self.rng.choices(expenses, weights)[0]
+            account = self.rng.choice(accounts)
+            fee = self._cents(30_00) if account is mobile and self.rng.random() < 0.5 else 0
+            yield Transaction(
+                user=user, account=account, kind=Transaction.Kind.EXPENSE,
+                date=self._day(), amount=money(self._cents(EXPENSES[category.name][1])),
+                fee=money(fee), category=category, description=category.name,
+            )
+
+    def _budgets(self, user, expenses):
+        budgets = [
+            Budget(
+                user=user, name=f"Budget {month:%Y-%m}",
+                start_date=month, end_date=month + relativedelta(day=31),
+            )
+            for month in (
+                self.today.replace(day=1) - relativedelta(months=n)
+                for n in range(min(self.months, 12))
+            )
+        ]
+        self._save(Budget, budgets)
+        self._save(BudgetLine, (
+            BudgetLine(
+                budget=budget, category=category,
+                planned_amount=money(EXPENSES[category.name][1] * 12),
+            )
+            for budget in budgets
+            for category in expenses
+        ))
+
+    def _goals(self, user, bank):
+        goals = []
+        contributions = []
+        for name, target in (("Emergency Fund", 500_000_00), ("House", 3_000_000_00), ("Holiday", 150_000_00)):
+            amounts = [self._cents(8_000_00) for _ in range(min(self.months, 12))]
+            goal = SavingsGoal(
+                user=user, name=name, target_amount=money(target),
+                current_amount=money(sum(amounts)), linked_account=bank,
+                target_date=self.today + relativedelta(years=2),
+            )
+            goals.append(goal)
+            contributions.append(amounts)
+        self._save(SavingsGoal, goals)
+        self._save(GoalContribution, (
+            GoalContribution(
+                goal=goal, amount=money(amount),
+                date=self.today - relativedelta(months=n),
+            )
+            for goal, amounts in zip(goals, contributions)
+            for n, amount in enumerate(amounts)
+        ))
+
+    def _portfolio(self, user):
+        holdings = []
+        trades = []
+        for name, kind, price in (
+            ("Safaricom", "STOCK", 18_00), ("Equity Group", "STOCK", 45_00),
+            ("Money Market Fund", "MMF", 1_00), ("Treasury Bond", "BOND", 100_00),
+            ("Unit Trust", "UNIT_TRUST", 10_00),
+        ):
+            buys = [self.rng.randint(50, 500) for _ in range(min(self.months, 24))]
+            holdings.append(Investment(
+                user=user, name=name, investment_type=kind,
+                purchase_date=self.start, purchase_price=money(price),
+                quantity=Decimal(sum(buys)),
+                current_price=money(int(price * self.rng.uniform(0.8, 1.4))),
+            ))
+            trades.append([(n, units, price) for n, units in enumerate(buys)])
+        self._save(Investment, holdings)
+        self._save(InvestmentTransaction, (
+            InvestmentTransaction(
+                investment=holding, transaction_type="BUY",
+                date=self.start + relativedelta(months=n), quantity=Decimal(units),
+                price_per_unit=money(price), total_amount=money(price * units),
+            )
+            for holding, rows in zip(holdings, trades)
+            for n, units, price in rows
+        ))
+        self._save(Asset, [
+            Asset(user=user, name="Car", asset_type=Asset.AssetType.VEHICLE,
+                  current_value=money(1_200_000_00)),
+            Asset(user=user, name="Pension", asset_type=Asset.AssetType.PENSION,
+                  current_value=money(self._cents(800_000_00))),
+        ])
+
+    def _debts(self, user):
+        self._save(Liability, [
+            Liability(
+                user=user, name=name, liability_type=kind,
+                principal_balance=money(balance), interest_rate=Decimal(rate),
+                minimum_payment=money(minimum), tenure_months=tenure,
+                start_date=self.start,
+            )
+            for name, kind, balance, rate, minimum, tenure in (
+                ("Mortgage", Liability.LiabilityType.MORTGAGE, 6_500_000_00, "13.50", 80_000_00, 240),
+                ("Car Loan", Liability.LiabilityType.LOAN, 900_000_00, "15.00", 25_000_00, 48),
+                ("Credit Card", Liability.LiabilityType.CREDIT_CARD, 85_000_00, "24.00", 5_000_00, None),
+            )
+        ])
+        self._save(DebtPlan, [DebtPlan(
+            user=user, monthly_amount_available=money(130_000_00),
+            start_date=self.today.replace(day=1),
+        )])
+
+
+def seed_users(users, transactions, months=24, seed=42, prefix="bench-user"):
+    """Create ``users`` users sharing ``transactions`` transactions.
+
+    Returns the users and the number of rows written per model.
+    """
+    seeder = Seeder(seed=seed, months=months)
+    per_user, extra = divmod(transactions, users)
+    created = [
+        seeder.seed_user(f"{prefix}-{n}", per_user + (1 if n < extra else 0))
+        for n in range(users)
+    ]
+    return created, seeder.rows
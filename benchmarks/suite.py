@@ -0,0 +1,199 @@
+"""Timed cases for the benchmark command.
+
+Each ``Case`` runs one endpoint through the test client or calls one utility
+directly, for one seeded user. Cold cases clear the cache before every run;
+cached cases prime it once and time the hits. Cases that write run inside a
+transaction that is rolled back, so every run sees the same data.
+"""
+import statistics
+import time
+from contextlib import nullcontext
+from dataclasses import dataclass
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Callable
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import CommandError
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from backend.profiling import count_queries
+from budgeting.models import Budget
+from budgeting.utils import calculate_budget_summary
+from debt_planner.models import DebtPlan
+from debt_planner.utils import generate_debt_schedule
+from finance.statement_import import StatementTransaction, build_preview
+from investments.valuation import build_valuations
+from wealth.utils import account_balances, compute_current_net_worth
+
+IMPORT_ROWS = 200
+
+
+@dataclass
+class Case:
+    name: str
+    run: Callable
+    kind: str = "endpoint"
+    cached: bool = False
+    writes: bool = False
+
+
+class Context:
+    """What the cases need to know about the user being measured."""
+
+    def __init__(self, user):
+        self.user = user
+        self.client = APIClient()
+        self.client.force_authenticate(user=user)
+        self.account = user.accounts.order_by("id").first()
+        self.budget = Budget.objects.filter(user=user).order_by("-start_date").first()
+        self.plan = DebtPlan.objects.filter(user=user).first()
+        today = timezone.localdate()
+        self.end = today.isoformat()
+        self.start = (today - timedelta(days=365)).isoformat()
+        self.rows = [
+            {
+                "date": (today - timedelta(days=n)).isoformat(),
+                "amount": f"{100 + n}.00",
+                "kind": "EXPENSE",
+                "description": f"Benchmark import {n}",
+            }
+            for n in range(IMPORT_ROWS)
+        ]
+
+    def get(self, path):
+        response = self.client.get(path)
+        if response.status_code != 200:
+            raise CommandError(f"GET {path} answered {response.status_code}")
+        return response
+
+    def post(self, path, data, **kwargs):
+        response = self.client.post(path, data, **kwargs)
+        if response.status_code not in (200, 201):
+            raise CommandError(f"POST {path} answered {response.status_code}")
+        return response
+
+    def statement(self):
+        balance = Decimal("50000.00")
+        lines = []
+        for row in reversed(self.rows):
+            balance -= Decimal(row["amount"])
+            lines.append(StatementTransaction(
+                date=date.fromisoformat(row["date"]),
+                description=row["description"],
+                amount=Decimal(row["amount"]),
+                balance=balance,
+            ))
+        return lines
+
+    def csv_upload(self):
+        body = "account,date,amount,kind,description\n" + "".join(
+            f'{self.account.id},{row["date"]},{row["amount"]},EXPENSE,{row["description"]}\n'
+            for row in self.rows
+        )
+        return SimpleUploadedFile("statement.csv", body.encode(), content_type="text/csv")
+
+
+def endpoint(name, path, **options):
+    return Case(name, lambda ctx: ctx.get(path.format(ctx=ctx)), **options)
+
+
+def utility(name, call):
+    return Case(name, call, kind="utility")
+
+
+CASES = [
+    endpoint("accounts", "/api/finance/accounts/"),
+    endpoint("transactions", "/api/finance/transactions/?limit=50"),
+    endpoint(
+        "aggregated",
+        "/api/finance/transactions/aggregated/?group_by=month&start={ctx.start}&end={ctx.end}",
+    ),
+    endpoint(
+        "top_categories",
+        "/api/finance/transactions/top_categories/?start={ctx.start}&end={ctx.end}",
+    ),
+    endpoint("budget_summary", "/api/budgeting/budgets/{ctx.budget.id}/summary/"),
+    endpoint("net_worth", "/api/wealth/net-worth-snapshots/current/"),
+    endpoint("debt_schedule", "/api/debt/debt-plans/{ctx.plan.id}/schedule/"),
+    endpoint("savings_summary", "/api/savings/goals/summary/"),
+    endpoint("investments_summary", "/api/investments/investments/summary/"),
+    endpoint("dashboard", "/api/dashboard/"),
+    endpoint("dashboard_cached", "/api/dashboard/", cached=True),
+    endpoint("sync_full", "/api/sync/"),
+    Case(
+        "import_csv",
+        lambda ctx: ctx.post(
+            "/api/finance/transactions/import-csv/", {"file": ctx.csv_upload()}
+        ),
+        writes=True,
+    ),
+    Case(
+        "import_pdf_confirm",
+        lambda ctx: ctx.post(
+            "/api/finance/transactions/import-pdf-confirm/",
+            {"account": ctx.account.id, "transactions": ctx.rows},
+            format="json",
+        ),
+        writes=True,
+    ),
+    utility("account_balances", lambda ctx: account_balances(ctx.user.accounts.all())),
+    utility("compute_net_worth", lambda ctx: compute_current_net_worth(ctx.user)),
+    utility("calculate_budget_summary", lambda ctx: calculate_budget_summary(ctx.budget)),
+    utility("generate_debt_schedule", lambda ctx: generate_debt_schedule(ctx.plan)),
+    utility("build_preview", lambda ctx: build_preview(ctx.statement())),
+    utility("build_valuations", lambda ctx: build_valuations(ctx.user)),
+]
+
+
+def measure(case, ctx, repeat):
+    """Run ``case`` ``repeat`` times and summarise the timings."""
+    if case.cached:
+        cache.clear()
+        case.run(ctx)
+    timings = []
+    queries = 0
+    for _ in range(repeat):
+        if not case.cached:
+            cache.clear()
+        with transaction.atomic() if case.writes else nullcontext():
+            with count_queries() as counter:
+                start = time.perf_counter()
+                case.run(ctx)
+                timings.append((time.perf_counter() - start) * 1000)
+            if case.writes:
+                transaction.set_rollback(True)
+        queries = counter.count
+    return {
+        "name": case.name,
+        "kind": case.kind,
+        "runs": repeat,
+        "min_ms": round(min(timings), 3),
+        "median_ms": round(statistics.median(timings), 3),
+        "mean_ms": round(statistics.fmean(timings), 3),
+        "max_ms": round(max(timings), 3),
+        "queries": queries,
+    }
+
+
+def run_suite(user, repeat=5, only=None):
+    ctx = Context(user)
+    return [
+        measure(case, ctx, repeat)
+        for case in CASES
+        if not only or case.name in only
+    ]
+
+
+def compare(results, baseline):
+    """Add each case's baseline median and relative change to ``results``."""
+    medians = {case["name"]: case["median_ms"] for case in baseline.get("results", [])}
+    for case in results:
+        before = medians.get(case["name"])
+        if before:
+            case["baseline_median_ms"] = before
+            case["change"] = round(case["median_ms"] / before - 1, 3)
+    return results
@@ -0,0 +1,101 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from benchmarks.query_budget import (
+    LARGE, SMALL, measure, populate, report, uncovered_routes,
+)
+from benchmarks.seed import seed_users
+from benchmarks.suite import CASES
+from finance.models import Transaction
+
+User = get_user_model()
+
+
+class BenchmarkTestCase(TestCase):
+    """Test the synthetic dataset and the benchmark command."""
+
+    def test_seed_is_reproducible(self):
+        users, rows = seed_users(2, 101, months=6, seed=7, prefix='a')
+        self.assertEqual(rows['finance.Transaction'], 101)
+        self.assertEqual(rows['auth.User'], 2)
+        self.assertEqual(Transaction.objects.filter(user=users[0]).count(), 51)
+        first = list(Transaction.objects.filter(user=users[0]).order_by('id').values_list(
+            'date', 'amount', 'kind', 'category__name'
+        ))
+
+        # Rows are streamed in batches; a partial last batch is still counted.
+        with mock.patch('benchmarks.seed.BATCH_SIZE', 8):
+            again, rows = seed_users(2, 101, months=6, seed=7, prefix='b')
+        self.assertEqual(rows['finance.Transaction'], 101)
+        second = list(Transaction.objects.filter(user=again[0]).order_by('id').values_list(
+            'date', 'amount', 'kind', 'category__name'
+        ))
+        self.assertEqual(first, second)
+
+    def test_command_writes_results(self):
+        with tempfile.TemporaryDirectory() as directory:
+            first = Path(directory) / 'first.json'
+            out = StringIO()
+            call_command(
+                'benchmark', '--current-db', '--transactions', '200', '--months', '6',
+                '--repeat', '1', '--output', str(first), stdout=out,
+            )
+            results = json.loads(first.read_text())
+            self.assertEqual(
+                [case['name'] for case in results['results']], [case.name for case in CASES]
+            )
+            self.assertEqual(results['dataset']['rows']['finance.Transaction'], 200)
+            self.assertIn('queries', results['results'][0])
+            self.assertIn(f'Wrote {first}', out.getvalue())
+
+            # Imports are rolled back after each run.
+            self.assertEqual(Transaction.objects.count(), 200)
+
+            with self.assertRaises(CommandError):
+                call_command('benchmark', '--current-db', stdout=StringIO())
+
+            out = StringIO()
+            call_command(
+                'benchmark', '--current-db', '--keepdb', '--repeat', '1',
+                '--only', 'accounts', '--baseline', str(first), stdout=out,
+            )
+            results = json.loads(out.getvalue())
+            self.assertEqual(len(results['results']), 1)
+            self.assertIn('change', results['results'][0])
+
+
+class QueryBudgetTestCase(TestCase):
+    """Test that no endpoint's query count grows with the dataset."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_every_route_is_budgeted(self):
+        self.assertEqual(uncovered_routes(), [])
+
+    def test_query_counts_do_not_grow(self):
+        counts = []
+        for size in (SMALL, LARGE):
+            user = User.objects.create_user(
+                username=f'budget-{size}', password='testpass123'
+            )
+            counts.append(measure(user, populate(user, size)))
+        small, large = counts
+        grew = [label for label in small if large[label] > small[label]]
+        self.assertEqual(grew, [], '\n' + report(small, large))
+
+    def test_report_command(self):
+        out = StringIO()
+        call_command('query_budget', '--current-db', stdout=out)
+        self.assertIn('transaction-list', out.getvalue())
+        self.assertIn('endpoints within budget', out.getvalue())
+        self.assertFalse(User.objects.filter(username__startswith='query-budget').exists())
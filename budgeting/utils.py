@@ -1,8 +1,8 @@
 # budgeting/utils.py
 from decimal import Decimal
-from django.db.models import Sum
+from django.db.models import Prefetch, Q, Sum, prefetch_related_objects
 from finance.models import Transaction
-from .models import Budget
+from .models import Budget, BudgetLine
 from notifications.utils import create_notification
 from notifications.models import Notification as NotificationModel
 
@@ -13,26 +13,56 @@ def calculate_budget_summary(budget: Budget):
     - lines: list of {category_id, category_name, planned, actual, difference}
     - totals: {planned, actual, difference}
     """
-    user = budget.user
+    return calculate_budget_summaries([budget])[0]
 
+
+def calculate_budget_summaries(budgets):
+    """``calculate_budget_summary`` for each budget, from two queries in all.
+
+    Lines are prefetched together (reusing a prefetch already done by the
+    caller), and the actuals of every budget come from one grouped query
+    with a conditional sum per budget period.
+    """
+    budgets = list(budgets)
+    prefetch_related_objects(
+        budgets,
+        Prefetch("lines", queryset=BudgetLine.objects.select_related("category")),
+    )
+    category_ids = {
+        line.category_id for budget in budgets for line in budget.lines.all()
+    }
+    rows = []
+    if category_ids:
+        sums = {}
+        for budget in budgets:
+            period = Q(date__gte=budget.start_date, date__lte=budget.end_date)
+            sums[f"amount_{budget.pk}"] = Sum("amount", filter=period)
+            sums[f"fees_{budget.pk}"] = Sum("fee", filter=period)
+        rows = (
+            Transaction.objects.filter(
+                user_id__in={budget.user_id for budget in budgets},
+                date__gte=min(budget.start_date for budget in budgets),
+                date__lte=max(budget.end_date for budget in budgets),
+                category_id__in=category_ids,
+            )
+            .values("category_id", "kind")
+            .annotate(**sums)
+        )
+    totals = {(row["category_id"], row["kind"]): row for row in rows}
+    return [_budget_summary(budget, totals) for budget in budgets]
+
+
+def _budget_summary(budget, totals):
     lines_data = []
     total_planned = Decimal("0")
     total_actual = Decimal("0")
 
-    for line in budget.lines.select_related("category"):
+    for line in budget.lines.all():
         planned = line.planned_amount or Decimal("0")
 
-        totals = (
-            Transaction.objects.filter(
-                user=user,
-                date__gte=budget.start_date,
-                date__lte=budget.end_date,
-                category=line.category,
-                kind=line.category.kind,
-            ).aggregate(amount=Sum("amount"), fees=Sum("fee"))
-        )
-        actual_amount = totals.get("amount") or Decimal("0")
-        actual_fees = totals.get("fees") or Decimal("0")
+        row = totals.get((line.category_id, line.category.kind), {})
+        actual_amount = row.get(f"amount_{budget.pk}") or Decimal("0")
+        actual_fees = row.get(f"fees_{budget.pk}") or Decimal("0")
         if line.category.kind == Transaction.Kind.INCOME:
             actual = actual_amount - actual_fees
         else:
@@ -1,7 +1,13 @@
+from functools import partial
+
+from django.db.models import Prefetch
 from rest_framework import viewsets, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
+from backend.cache import get_or_build
+from backend.conditional import ConditionalListMixin
+
 from .models import Budget, BudgetLine
 from .serializers import BudgetSerializer, BudgetLineSerializer
 from .utils import calculate_budget_summary
@@ -12,12 +18,19 @@ class IsOwner(permissions.BasePermission):
         return getattr(obj, "user", None) == request.user
 
 
-class BudgetViewSet(viewsets.ModelViewSet):
+class BudgetViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     serializer_class = BudgetSerializer
     permission_classes = [permissions.IsAuthenticated, IsOwner]
+    # Budgets nest their lines and the lines' category names.
+    conditional_groups = ("budgeting", "finance")
 
     def get_queryset(self):
-        return Budget.objects.filter(user=self.request.user)
+        qs = Budget.objects.filter(user=self.request.user)
+        if self.action in ("list", "retrieve"):
+            qs = qs.prefetch_related(Prefetch(
+                "lines", queryset=BudgetLine.objects.select_related("category")
+            ))
+        return qs
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -25,16 +38,25 @@ class BudgetViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=["get"])
     def summary(self, request, pk=None):
         budget = self.get_object()
-        data = calculate_budget_summary(budget)
+        data, _ = get_or_build(
+            request.user.id,
+            "budget_summary",
+            ("budgeting", "finance"),
+            partial(calculate_budget_summary, budget),
+            params={"budget": budget.id},
+        )
         return Response(data)
 
 
-class BudgetLineViewSet(viewsets.ModelViewSet):
+class BudgetLineViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     serializer_class = BudgetLineSerializer
     permission_classes = [permissions.IsAuthenticated]
+    conditional_groups = ("finance",)
 
     def get_queryset(self):
-        qs = BudgetLine.objects.filter(budget__user=self.request.user)
+        qs = BudgetLine.objects.filter(
+            budget__user=self.request.user
+        ).select_related("category")
         budget_id = self.request.query_params.get("budget")
         if budget_id:
             qs = qs.filter(budget_id=budget_id)
@@ -0,0 +1,40 @@
+// src/api/dashboard.ts
+import { api } from "./client";
+import type { Account, BudgetSummary, NetWorthCurrent } from "./types";
+import type { SavingsSummary } from "./savings";
+import type { InvestmentSummary } from "./investments";
+
+export type DashboardSection =
+  | "accounts"
+  | "aggregated"
+  | "top_categories"
+  | "net_worth"
+  | "budgets"
+  | "savings"
+  | "investments";
+
+export interface DashboardQuery {
+  start?: string;
+  end?: string;
+  limit?: number;
+  sections?: DashboardSection[];
+}
+
+export interface Dashboard {
+  accounts?: Account[];
+  aggregated?: { series: Array<{ date: string; income: number; expenses: number }> };
+  top_categories?: { categories: Array<{ id: number; name: string; amount: number }> };
+  net_worth?: NetWorthCurrent;
+  budgets?: BudgetSummary[];
+  savings?: SavingsSummary;
+  investments?: InvestmentSummary;
+  // Sections served from the server-side cache
+  cached: DashboardSection[];
+}
+
+export async function fetchDashboard(q: DashboardQuery = {}): Promise<Dashboard> {
+  const { sections, ...rest } = q;
+  const params = sections ? { ...rest, sections: sections.join(",") } : rest;
+  const res = await api.get("/api/dashboard/", { params });
+  return res.data;
+}
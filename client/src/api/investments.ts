@@ -64,6 +64,7 @@ export interface InvestmentTransaction {
   fees: string;
   notes: string;
   created_at: string;
+  updated_at: string;
 }
 
 export interface InvestmentSummary {
@@ -78,9 +79,17 @@ export interface InvestmentSummary {
     invested: number;
     current_value: number;
     gain_loss: number;
+    annual_income: number;
   }>;
 }
 
+export interface PaginatedInvestmentTransactions {
+  count: number;
+  next: string | null;
+  previous: string | null;
+  results: InvestmentTransaction[];
+}
+
 export interface CreateInvestmentData {
   name: string;
   symbol?: string;
@@ -169,6 +178,15 @@ export const updateInvestmentPrice = async (id: number, currentPrice: number | s
   return response.data;
 };
 
+// Get an investment's trade history, newest first
+export const getInvestmentTransactions = async (
+  id: number,
+  params: { limit?: number; offset?: number } = {}
+): Promise<PaginatedInvestmentTransactions> => {
+  const response = await apiClient.get(`/api/investments/investments/${id}/transactions/`, { params });
+  return response.data;
+};
+
 // Add transaction to investment
 export const addInvestmentTransaction = async (id: number, data: CreateTransactionData): Promise<Investment> => {
   const response = await apiClient.post(`/api/investments/investments/${id}/add_transaction/`, data);
@@ -29,6 +29,7 @@ export interface GoalContribution {
   date: string;
   notes: string;
   created_at: string;
+  updated_at: string;
   transaction: number | null;
   transaction_description: string | null;
 }
@@ -39,6 +40,14 @@ export interface SavingsSummary {
   total_saved: number;
   total_remaining: number;
   average_progress: number;
+  velocity_months?: number;
+  monthly_velocity?: number;
+  goals?: {
+    id: number;
+    name: string;
+    monthly_velocity: number;
+    months_to_target: number | null;
+  }[];
 }
 
 export interface CreateGoalData {
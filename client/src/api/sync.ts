@@ -0,0 +1,51 @@
+// src/api/sync.ts
+import { api } from "./client";
+import type {
+  Account,
+  Asset,
+  Category,
+  Liability,
+  NetWorthSnapshot,
+  Tag,
+  Transaction,
+} from "./types";
+import type { RecurringTransaction } from "./finance";
+import type { GoalContribution, SavingsGoal } from "./savings";
+import type { Investment, InvestmentTransaction } from "./investments";
+
+export interface SyncFeeds {
+  accounts: Account;
+  categories: Category;
+  tags: Tag;
+  recurring: RecurringTransaction;
+  transactions: Transaction;
+  savings_goals: SavingsGoal;
+  goal_contributions: GoalContribution & { goal: number };
+  investments: Investment;
+  investment_transactions: InvestmentTransaction & { investment: number };
+  assets: Asset;
+  liabilities: Liability;
+  net_worth_snapshots: NetWorthSnapshot;
+}
+
+export type SyncFeed = keyof SyncFeeds;
+
+export interface SyncResponse {
+  // Pass back as `since` on the next sync
+  token: string;
+  // When true, `changes` holds every row: drop anything else held locally
+  reset: boolean;
+  changes: { [K in SyncFeed]?: SyncFeeds[K][] };
+  deleted: { [K in SyncFeed]?: number[] };
+}
+
+export async function fetchChanges(
+  since?: string | null,
+  models?: SyncFeed[]
+): Promise<SyncResponse> {
+  const params: Record<string, string> = {};
+  if (since) params.since = since;
+  if (models) params.models = models.join(",");
+  const res = await api.get("/api/sync/", { params });
+  return res.data;
+}
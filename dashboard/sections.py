@@ -0,0 +1,139 @@
+"""Builders for the sections of the dashboard bundle.
+
+A ``Dashboard`` builds each section on demand for one user. Sections that
+read the same data share it: the account list and balances are loaded once
+for the accounts and net worth sections, and one grouped transaction scan
+over the date range feeds both the daily cash flow series and the top
+expense categories.
+"""
+from decimal import Decimal
+from functools import cached_property
+
+from django.db.models import Sum
+
+from budgeting.models import Budget
+from budgeting.utils import calculate_budget_summaries
+from finance.models import Account, Transaction
+from finance.serializers import AccountSerializer
+from investments.models import Investment
+from investments.utils import investment_summary
+from savings.models import SavingsGoal
+from savings.utils import savings_summary
+from wealth.utils import account_balances, compute_current_net_worth
+
+# Section name -> model groups it is built from (see backend.cache).
+SECTIONS = {
+    "accounts": ("finance",),
+    "aggregated": ("finance",),
+    "top_categories": ("finance",),
+    "net_worth": ("finance", "savings", "wealth"),
+    "budgets": ("budgeting", "finance"),
+    "savings": ("savings",),
+    "investments": ("investments",),
+}
+
+
+class Dashboard:
+    def __init__(self, user, start, end, today, limit=6):
+        self.user = user
+        self.start = start
+        self.end = end
+        self.today = today
+        self.limit = limit
+
+    def params(self, name):
+        """The request parameters a section's content depends on."""
+        if name in ("aggregated", "top_categories"):
+            return {"start": self.start, "end": self.end, "limit": self.limit}
+        if name in ("budgets", "savings"):
+            return {"today": self.today}
+        return None
+
+    def build(self, name):
+        return getattr(self, f"build_{name}")()
+
+    @cached_property
+    def accounts(self):
+        return list(Account.objects.filter(user=self.user))
+
+    @cached_property
+    def balances(self):
+        return account_balances(self.accounts)
+
+    @cached_property
+    def transaction_rows(self):
+        """Transactions in the range summed per day, kind and category."""
+        return list(
+            Transaction.objects.filter(
+                user=self.user, date__gte=self.start, date__lte=self.end
+            )
+            .values("date", "kind", "category_id", "category__name")
+            .annotate(amount=Sum("amount"), fees=Sum("fee"))
+            .order_by("date")
+        )
+
+    def build_accounts(self):
+        serializer = AccountSerializer(
+            self.accounts, many=True, context={"balances": self.balances}
+        )
+        return list(serializer.data)
+
+    def build_aggregated(self):
+        days = {}
+        for row in self.transaction_rows:
+            day = days.setdefault(row["date"], {"income": Decimal("0"), "expenses": Decimal("0")})
+            amount = row["amount"] or 0
+            fees = row["fees"] or 0
+            if row["kind"] == Transaction.Kind.INCOME:
+                day["income"] += amount - fees
+            elif row["kind"] == Transaction.Kind.EXPENSE:
+                day["expenses"] += amount + fees
+        return {
+            "series": [
+                {
+                    "date": day.strftime("%Y-%m-%d"),
+                    "income": float(totals["income"]),
+                    "expenses": float(totals["expenses"]),
+                }
+                for day, totals in days.items()
+            ]
+        }
+
+    def build_top_categories(self):
+        categories = {}
+        for row in self.transaction_rows:
+            if row["kind"] != Transaction.Kind.EXPENSE:
+                continue
+            entry = categories.setdefault(row["category_id"], {
+                "id": row["category_id"],
+                "name": row["category__name"],
+                "amount": Decimal("0"),
+                "fees": Decimal("0"),
+            })
+            entry["amount"] += row["amount"] or 0
+            entry["fees"] += row["fees"] or 0
+        # Ranked by amount before fees, like the top_categories action.
+        ranked = sorted(categories.values(), key=lambda c: c["amount"], reverse=True)
+        return {
+            "categories": [
+                {"id": c["id"], "name": c["name"], "amount": float(c["amount"] + c["fees"])}
+                for c in ranked[:self.limit]
+            ]
+        }
+
+    def build_net_worth(self):
+        return compute_current_net_worth(self.user, self.balances)
+
+    def build_budgets(self):
+        budgets = Budget.objects.filter(
+            user=self.user, start_date__lte=self.today, end_date__gte=self.today
+        ).order_by("start_date", "id")
+        return calculate_budget_summaries(budgets)
+
+    def build_savings(self):
+        return savings_summary(SavingsGoal.objects.filter(user=self.user), today=self.today)
+
+    def build_investments(self):
+        return investment_summary(
+            Investment.objects.filter(user=self.user, status="ACTIVE")
+        )
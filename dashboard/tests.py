@@ -0,0 +1,244 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from backend.cache import reset_stats
+from budgeting.models import Budget, BudgetLine
+from finance.models import Account, Category, Transaction
+from investments.models import Investment
+from savings.models import SavingsGoal
+from wealth.models import Liability
+
+User = get_user_model()
+
+
+class DashboardTestCase(TestCase):
+    """Test the cached dashboard bundle."""
+
+    url = '/api/dashboard/'
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='testuser', password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.today = timezone.localdate()
+        self.start = self.today.replace(day=1)
+        self.bank = Account.objects.create(
+            user=self.user, name='Bank', opening_balance=Decimal('1000.00')
+        )
+        self.card = Account.objects.create(
+            user=self.user, name='Card', opening_balance=Decimal('0')
+        )
+        self.salary = Category.objects.create(
+            user=self.user, name='Salary', kind='INCOME'
+        )
+        self.food = Category.objects.create(
+            user=self.user, name='Food', kind='EXPENSE'
+        )
+        self.rent = Category.objects.create(
+            user=self.user, name='Rent', kind='EXPENSE'
+        )
+        budget = Budget.objects.create(
+            user=self.user, name='Month', start_date=self.start,
+            end_date=self.start + timedelta(days=40),
+        )
+        BudgetLine.objects.create(
+            budget=budget, category=self.food, planned_amount=Decimal('300.00')
+        )
+        SavingsGoal.objects.create(
+            user=self.user, name='House', target_amount=Decimal('1000.00'),
+            current_amount=Decimal('250.00'),
+        )
+        Investment.objects.create(
+            user=self.user, name='Fund', investment_type='STOCK',
+            purchase_date=date(2024, 1, 1), purchase_price=Decimal('10.00'),
+            quantity=Decimal('10'), current_price=Decimal('12.00'),
+        )
+        self.liability = Liability.objects.create(
+            user=self.user, name='Loan', principal_balance=Decimal('500.00'),
+            interest_rate=Decimal('10.00'), minimum_payment=Decimal('10.00'),
+        )
+        self.add_transactions(1)
+
+    def add_transactions(self, count):
+        for n in range(count):
+            for kind, category, amount, account in (
+                ('INCOME', self.salary, '900.00', self.bank),
+                ('EXPENSE', self.food, '40.00', self.bank),
+                ('EXPENSE', self.rent, '30.00', self.card),
+            ):
+                Transaction.objects.create(
+                    user=self.user, account=account, date=self.today,
+                    amount=Decimal(amount), fee=Decimal('1.00'), kind=kind,
+                    category=category,
+                )
+
+    def test_bundle_matches_the_standalone_endpoints(self):
+        data = self.client.get(self.url).json()
+        period = {'start': self.start.isoformat(), 'end': self.today.isoformat()}
+
+        aggregated = self.client.get(
+            '/api/finance/transactions/aggregated/', {**period, 'group_by': 'day'}
+        ).json()
+        self.assertEqual(data['aggregated'], aggregated)
+        top = self.client.get('/api/finance/transactions/top_categories/', period).json()
+        self.assertEqual(data['top_categories'], top)
+        self.assertEqual([c['name'] for c in top['categories']], ['Food', 'Rent'])
+
+        for section, url in (
+            ('net_worth', '/api/wealth/net-worth-snapshots/current/'),
+            ('savings', '/api/savings/goals/summary/'),
+            ('investments', '/api/investments/investments/summary/'),
+            ('accounts', '/api/finance/accounts/'),
+        ):
+            self.assertEqual(data[section], self.client.get(url).json(), section)
+
+        self.assertEqual(len(data['budgets']), 1)
+        self.assertEqual(data['budgets'][0]['lines'][0]['actual'], 41.0)
+        self.assertEqual(data['cached'], [])
+
+    def test_sections_are_built_with_shared_queries_and_cached(self):
+        # Accounts, balances and the transaction scan are each read once.
+        with self.assertNumQueries(13):
+            self.client.get(self.url)
+        with self.assertNumQueries(0):
+            data = self.client.get(self.url).json()
+        self.assertEqual(len(data['cached']), 7)
+
+        cache.clear()
+        Account.objects.bulk_create([
+            Account(user=self.user, name=f'Extra {n}') for n in range(5)
+        ])
+        self.add_transactions(5)
+        with self.assertNumQueries(13):
+            self.client.get(self.url)
+
+    def test_writes_invalidate_only_dependent_sections(self):
+        self.client.get(self.url)
+
+        SavingsGoal.objects.create(
+            user=self.user, name='Car', target_amount=Decimal('100.00'),
+        )
+        data = self.client.get(self.url).json()
+        self.assertEqual(
+            data['cached'],
+            ['accounts', 'aggregated', 'top_categories', 'budgets', 'investments'],
+        )
+        self.assertEqual(data['savings']['total_goals'], 2)
+
+        # A payment is applied to the liability with an UPDATE, no signal.
+        self.client.post('/api/finance/transactions/', {
+            'account': self.bank.id, 'date': self.today.isoformat(),
+            'amount': '100.00', 'kind': 'EXPENSE', 'liability': self.liability.id,
+        }, format='json')
+        data = self.client.get(self.url).json()
+        self.assertEqual(data['cached'], ['savings', 'investments'])
+        self.assertEqual(data['net_worth']['breakdown']['liabilities_loans'], 400.0)
+
+        other = User.objects.create_user(username='other', password='testpass123')
+        SavingsGoal.objects.create(user=other, name='Theirs', target_amount=Decimal('1'))
+        self.assertEqual(len(self.client.get(self.url).json()['cached']), 7)
+
+    def test_parameters(self):
+        data = self.client.get(
+            self.url, {'sections': 'top_categories', 'limit': 1}
+        ).json()
+        self.assertEqual(list(data), ['top_categories', 'cached'])
+        self.assertEqual(len(data['top_categories']['categories']), 1)
+
+        data = self.client.get(self.url, {
+            'sections': 'aggregated', 'start': '2000-01-01', 'end': '2000-01-31',
+        }).json()
+        self.assertEqual(data, {'aggregated': {'series': []}, 'cached': []})
+
+        for params in ({'start': 'soon'}, {'end': '2024-02-30'}, {'limit': 0}, {'sections': 'x'}):
+            self.assertEqual(self.client.get(self.url, params).status_code, 400, params)
+
+
+class CacheLayerTestCase(TestCase):
+    """Test the per-user cache behind the read endpoints."""
+
+    def setUp(self):
+        cache.clear()
+        reset_stats()
+        self.user = User.objects.create_user(
+            username='testuser', password='testpass123', is_staff=True
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_account_list_reads_balances_once(self):
+        for n in range(3):
+            account = Account.objects.create(
+                user=self.user, name=f'Account {n}', opening_balance=Decimal('100.00')
+            )
+            Transaction.objects.create(
+                user=self.user, account=account, date=date(2024, 1, 1),
+                amount=Decimal('40.00'), kind='EXPENSE',
+            )
+        # The conditional GET validator, accounts, then the cached balances:
+        # accounts and one grouped query.
+        with self.assertNumQueries(4):
+            data = self.client.get('/api/finance/accounts/').json()
+        self.assertEqual([a['current_balance'] for a in data], [60.0] * 3)
+        with self.assertNumQueries(2):
+            self.client.get('/api/finance/accounts/')
+
+        Transaction.objects.create(
+            user=self.user, account=account, date=date(2024, 1, 2),
+            amount=Decimal('10.00'), kind='EXPENSE',
+        )
+        data = self.client.get('/api/finance/accounts/').json()
+        self.assertEqual(data[-1]['current_balance'], 50.0)
+
+    def test_bulk_writes_invalidate(self):
+        holding = Investment.objects.create(
+            user=self.user, name='Fund', investment_type='STOCK', symbol='FND',
+            purchase_date=date(2024, 1, 1), purchase_price=Decimal('10.00'),
+            quantity=Decimal('10'), current_price=Decimal('10.00'),
+        )
+        url = '/api/investments/investments/summary/'
+        self.assertEqual(self.client.get(url).json()['total_current_value'], 100.0)
+        self.client.post('/api/investments/investments/prices/', {
+            'prices': [{'id': holding.id, 'price': '12.00'}],
+        }, format='json')
+        self.assertEqual(self.client.get(url).json()['total_current_value'], 120.0)
+
+        Account.objects.create(
+            user=self.user, name='Bank', opening_balance=Decimal('500.00')
+        )
+        url = '/api/wealth/net-worth-snapshots/current/'
+        self.assertEqual(self.client.get(url).json()['breakdown']['account_balances'], 500.0)
+        self.client.post('/api/wealth/assets/sync_from_accounts/')
+        # Synced accounts count as assets instead of account balances.
+        data = self.client.get(url).json()
+        self.assertEqual(data['breakdown']['account_balances'], 0.0)
+        self.assertEqual(data['breakdown']['assets_manual'], 500.0)
+
+    def test_hit_and_miss_counters(self):
+        url = '/api/savings/goals/summary/'
+        self.client.get(url)
+        self.client.get(url)
+        self.client.get(url, {'months': 6})
+        SavingsGoal.objects.create(
+            user=self.user, name='Car', target_amount=Decimal('100.00'),
+        )
+        self.client.get(url)
+
+        data = self.client.get('/api/cache/stats/').json()
+        self.assertEqual(data['names']['savings_summary'], {
+            'hits': 1, 'misses': 3, 'hit_ratio': 0.25,
+        })
+        self.assertEqual(data['hits'], 1)
+
+        self.user.is_staff = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/cache/stats/').status_code, 403)
@@ -0,0 +1,76 @@
+from functools import partial
+
+from dateutil.relativedelta import relativedelta
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from backend.cache import get_or_build
+
+from .sections import SECTIONS, Dashboard
+
+
+class DashboardView(APIView):
+    """Everything the dashboard page shows, in one request.
+
+    Params: start, end (YYYY-MM-DD, default the current month) bound the
+    cash flow series and top categories; limit caps the categories
+    (default 6); sections is a comma-separated subset of sections to
+    return. Each section is cached per user and rebuilt only after a write
+    to the models it is built from; ``cached`` lists the sections served
+    from cache.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        today = timezone.localdate()
+        params = request.query_params
+        errors = {}
+
+        dates = {}
+        for field, default in (
+            ("start", today.replace(day=1)),
+            ("end", today + relativedelta(day=31)),
+        ):
+            try:
+                dates[field] = parse_date(params[field]) if params.get(field) else default
+            except ValueError:
+                dates[field] = None
+            if dates[field] is None:
+                errors[field] = "Use YYYY-MM-DD."
+
+        try:
+            limit = int(params.get("limit", 6))
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= 50:
+            errors["limit"] = "Must be an integer between 1 and 50."
+
+        names = list(SECTIONS)
+        if params.get("sections"):
+            names = [n.strip() for n in params["sections"].split(",") if n.strip()]
+            unknown = [n for n in names if n not in SECTIONS]
+            if unknown:
+                errors["sections"] = f"Unknown sections: {', '.join(unknown)}."
+
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        dashboard = Dashboard(request.user, dates["start"], dates["end"], today, limit)
+        data = {}
+        cached = []
+        for name in names:
+            data[name], hit = get_or_build(
+                request.user.id,
+                f"dashboard:{name}",
+                SECTIONS[name],
+                partial(dashboard.build, name),
+                params=dashboard.params(name),
+            )
+            if hit:
+                cached.append(name)
+        data["cached"] = cached
+        return Response(data)
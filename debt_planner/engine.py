@@ -0,0 +1,306 @@
+"""Integer-cents payoff simulator behind ``generate_debt_schedule``.
+
+Balances, payments and the monthly budget are held as integer cents in
+parallel lists indexed by debt, and each month walks the still-open debts in
+payoff order. Interest is computed from the same ``Decimal`` monthly rate the
+original implementation used and rounded with integer arithmetic that
+reproduces ``Decimal`` multiplication followed by ``quantize(Decimal("0.01"))``
+under the active context, so results match the ``Decimal`` simulation to the
+cent.
+"""
+import calendar
+import decimal
+from dataclasses import dataclass, field
+from datetime import date
+from decimal import Decimal
+from fractions import Fraction
+from typing import List, Optional, Sequence, Tuple
+
+MAX_MONTHS = 600  # safety cap, 50 years
+
+_CENT = Decimal("0.01")
+# Beyond this the rounding argument for the fast interest path needs more
+# care than it is worth; such rates always use exact Decimal emulation.
+_MAX_FAST_DENOMINATOR = 10 ** 9
+
+
+class NotCentExact(ValueError):
+    """Raised when inputs cannot be simulated exactly in integer cents."""
+
+
+@dataclass
+class DebtInput:
+    """One liability in payoff order, as consumed by the engine."""
+
+    balance: int  # cents
+    minimum: int  # cents
+    rate: Tuple[int, int]  # Decimal monthly rate as (coefficient, exponent)
+    ratio: Tuple[int, int]  # exact monthly rate as (numerator, denominator)
+
+
+@dataclass
+class PayoffSimulation:
+    """Columnar result: one entry per debt per simulated month."""
+
+    months: int
+    paid_off: bool = False
+    total_interest: int = 0
+    total_paid: int = 0
+    month_index: List[int] = field(default_factory=list)
+    debt_index: List[int] = field(default_factory=list)
+    starting_balance: List[int] = field(default_factory=list)
+    interest: List[int] = field(default_factory=list)
+    payment: List[int] = field(default_factory=list)
+    principal: List[int] = field(default_factory=list)
+    ending_balance: List[int] = field(default_factory=list)
+
+
+def to_cents(value) -> int:
+    """Convert a money value to integer cents, refusing sub-cent amounts."""
+    amount = Decimal(value or 0)
+    cents = amount * 100
+    if cents != cents.to_integral_value():
+        raise NotCentExact(f"{value} is not a whole number of cents")
+    return int(cents)
+
+
+def from_cents(cents: int) -> Decimal:
+    return Decimal(cents).scaleb(-2)
+
+
+def monthly_rate(interest_rate) -> Decimal:
+    """Monthly rate exactly as the Decimal schedule derives it."""
+    return Decimal(interest_rate or 0) / Decimal("100") / Decimal("12")
+
+
+def rate_parts(rate: Decimal) -> Tuple[int, int]:
+    sign, digits, exponent = rate.as_tuple()
+    coefficient = int("".join(map(str, digits)) or "0")
+    return (-coefficient if sign else coefficient), exponent
+
+
+def rate_ratio(interest_rate) -> Tuple[int, int]:
+    exact = Fraction(Decimal(interest_rate or 0)) / 1200
+    return exact.numerator, exact.denominator
+
+
+def build_inputs(debts) -> List[DebtInput]:
+    """Snapshot ordered liabilities into engine inputs."""
+    return [
+        DebtInput(
+            balance=to_cents(d.principal_balance),
+            minimum=to_cents(d.minimum_payment),
+            rate=rate_parts(monthly_rate(d.interest_rate)),
+            ratio=rate_ratio(d.interest_rate),
+        )
+        for d in debts
+    ]
+
+
+def _shift_round(n: int, places: int) -> int:
+    """Drop ``places`` trailing digits of ``n`` with ROUND_HALF_EVEN."""
+    if places <= 0:
+        return n * 10 ** -places
+    q, r = divmod(abs(n), 10 ** places)
+    half = 5 * 10 ** (places - 1)
+    if r > half or (r == half and q & 1):
+        q += 1
+    return q if n >= 0 else -q
+
+
+def _check_context() -> int:
+    context = decimal.getcontext()
+    if context.rounding != decimal.ROUND_HALF_EVEN:
+        raise NotCentExact("engine only reproduces ROUND_HALF_EVEN")
+    return context.prec
+
+
+def _decimal_interest(balance: int, rate: Tuple[int, int], prec: int) -> int:
+    """Interest in cents exactly as ``(balance * rate).quantize(cent)``.
+
+    The product is first rounded to ``prec`` significant digits, as Decimal
+    multiplication does, and then to cents.
+    """
+    coefficient, exponent = rate
+    product = balance * coefficient
+    exp = exponent - 2  # balance is in cents
+    if abs(product) >= 10 ** prec:
+        drop = len(str(abs(product))) - prec
+        product = _shift_round(product, drop)
+        exp += drop
+    return _shift_round(product, -2 - exp)
+
+
+def simulate(
+    debts: Sequence[DebtInput],
+    budget: int,
+    max_months: int = MAX_MONTHS,
+    *,
+    lump_sum: int = 0,
+    record: bool = True,
+) -> PayoffSimulation:
+    """Run the payoff simulation for debts already in payoff order.
+
+    Matches the Decimal schedule step for step, including its conventions:
+    extra money only ever goes to the first debt in the ordering, and
+    ``months`` counts the final all-paid check. ``lump_sum`` is paid in the
+    first month on top of the regular payments, rolling over from one debt to
+    the next in payoff order until it is used up. With ``record=False`` only the totals are
+    kept, not the per-month columns.
+    """
+    prec = _check_context()
+    balances = [d.balance for d in debts]
+    minimums = [d.minimum for d in debts]
+    rates = [d.rate for d in debts]
+    # Interest is balance * num / den rounded to the nearest cent. Decimal's
+    # 28-digit rate and product stray from that exact value by far less than
+    # the gap (at least 1 / (2 * den) cents) to the nearest half cent, so
+    # integer rounding agrees with Decimal except on exact ties and for
+    # unusual rates, which take the exact emulation path.
+    nums = [d.ratio[0] for d in debts]
+    dens = [d.ratio[1] for d in debts]
+    exact_only = [
+        n < 0 or d > _MAX_FAST_DENOMINATOR for n, d in zip(nums, dens)
+    ]
+
+    active = [i for i, b in enumerate(balances) if b > 0]
+    active_minimum = sum(minimums[i] for i in active)
+
+    result = PayoffSimulation(months=0)
+    month_index = result.month_index.append
+    debt_index = result.debt_index.append
+    starting = result.starting_balance.append
+    interest_col = result.interest.append
+    payment_col = result.payment.append
+    principal_col = result.principal.append
+    ending = result.ending_balance.append
+    total_interest = 0
+    total_paid = 0
+
+    m = 0
+    for m in range(max_months):
+        if not active or budget < active_minimum:
+            break
+        extra = budget - active_minimum
+        lump = lump_sum if m == 0 else 0
+
+        still_open = []
+        for i in active:
+            balance = balances[i]
+            num = nums[i]
+            if num:
+                den = dens[i]
+                interest, rem = divmod(2 * balance * num + den, 2 * den)
+                if not rem or exact_only[i]:
+                    interest = _decimal_interest(balance, rates[i], prec)
+            else:
+                interest = 0
+            payment = minimums[i]
+            if extra > 0 and i == 0:
+                payment += extra
+            max_pay = balance + interest
+            if payment > max_pay:
+                payment = max_pay
+            elif lump > 0:
+                applied = min(lump, max_pay - payment)
+                payment += applied
+                lump -= applied
+            new_balance = max_pay - payment
+            balances[i] = new_balance
+
+            total_interest += interest
+            total_paid += payment
+            if record:
+                month_index(m)
+                debt_index(i)
+                starting(balance)
+                interest_col(interest)
+                payment_col(payment)
+                principal_col(payment - interest)
+                ending(new_balance)
+
+            if new_balance > 0:
+                still_open.append(i)
+            else:
+                active_minimum -= minimums[i]
+        active = still_open
+
+    result.months = m + 1
+    result.paid_off = not active
+    result.total_interest = total_interest
+    result.total_paid = total_paid
+    return result
+
+
+def month_dates(start: date, count: int) -> List[date]:
+    """Dates for ``count`` months, advanced one month at a time.
+
+    Equivalent to repeatedly adding ``relativedelta(months=1)``: the day is
+    clamped to the month length and the clamped day carries forward.
+    """
+    dates = []
+    year, month, day = start.year, start.month, start.day
+    for _ in range(count):
+        dates.append(date(year, month, day))
+        month += 1
+        if month > 12:
+            month = 1
+            year += 1
+        day = min(day, calendar.monthrange(year, month)[1])
+    return dates
+
+
+def simulate_decimal(
+    debts,
+    budget: Decimal,
+    max_months: int = MAX_MONTHS,
+) -> Tuple[int, List[Tuple[int, int, Decimal, Decimal, Decimal, Decimal, Decimal]]]:
+    """Reference ``Decimal`` simulation for debts already in payoff order.
+
+    Used when inputs are not whole cents or the decimal context is not the
+    default one, and as the baseline for parity tests and benchmarks.
+    Returns ``(months, rows)`` with rows of
+    ``(month, debt, starting, interest, payment, principal, ending)``.
+    """
+    balances = [Decimal(d.principal_balance) for d in debts]
+    rows = []
+    m = 0
+    for m in range(max_months):
+        if all(b <= 0 for b in balances):
+            break
+
+        monthly_budget = Decimal(budget)
+        total_minimum = sum(
+            (d.minimum_payment or 0)
+            for d, b in zip(debts, balances)
+            if b > 0
+        )
+        if monthly_budget < total_minimum:
+            break
+        extra = monthly_budget - total_minimum
+
+        for idx, d in enumerate(debts):
+            bal = balances[idx]
+            if bal <= 0:
+                continue
+            interest = (bal * monthly_rate(d.interest_rate)).quantize(_CENT)
+            payment = Decimal(d.minimum_payment or 0)
+            if extra > 0 and idx == 0:
+                payment += extra
+            max_pay = bal + interest
+            if payment > max_pay:
+                payment = max_pay
+            new_balance = bal + interest - payment
+            balances[idx] = new_balance
+            rows.append(
+                (m, idx, bal, interest, payment, payment - interest, new_balance)
+            )
+    return m + 1, rows
+
+
+def simulate_for(debts, budget, max_months: int = MAX_MONTHS) -> Optional[PayoffSimulation]:
+    """Run the integer engine for model instances, or ``None`` if inexact."""
+    try:
+        return simulate(build_inputs(debts), to_cents(budget), max_months)
+    except NotCentExact:
+        return None
@@ -0,0 +1,66 @@
+import random
+import time
+from decimal import Decimal
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand, CommandError
+
+from debt_planner import engine
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the integer-cents payoff engine against the Decimal "
+        "simulation on synthetic plans and check that both agree."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--debts", type=int, default=20, help="Debts per plan (default 20)")
+        parser.add_argument("--runs", type=int, default=20, help="Timed runs (default 20)")
+        parser.add_argument("--seed", type=int, default=1, help="Random seed")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        count = options["debts"]
+        runs = options["runs"]
+
+        # Minimums barely above interest keep most debts open for ~50 years.
+        debts = []
+        for i in range(count):
+            balance = Decimal(rng.randint(100000, 2000000)) / 100
+            rate = Decimal(rng.randint(100, 2500)) / 100
+            interest = balance * rate / 1200
+            debts.append(
+                SimpleNamespace(
+                    id=i + 1,
+                    name=f"Debt {i + 1}",
+                    principal_balance=balance,
+                    interest_rate=rate,
+                    minimum_payment=(interest * Decimal("1.02")).quantize(Decimal("0.01")),
+                )
+            )
+        budget = sum(d.minimum_payment for d in debts) + Decimal("50.00")
+
+        inputs = engine.build_inputs(debts)
+        budget_cents = engine.to_cents(budget)
+
+        start = time.perf_counter()
+        for _ in range(runs):
+            sim = engine.simulate(inputs, budget_cents)
+        engine_ms = (time.perf_counter() - start) * 1000 / runs
+
+        start = time.perf_counter()
+        months, rows = engine.simulate_decimal(debts, budget)
+        decimal_ms = (time.perf_counter() - start) * 1000
+
+        if sim.months != months or sim.total_interest != sum(
+            engine.to_cents(row[3]) for row in rows
+        ):
+            raise CommandError("Engine and Decimal simulation disagree.")
+
+        self.stdout.write(
+            f"{count} debts, {sim.months} months, {len(sim.interest)} rows"
+        )
+        self.stdout.write(f"integer engine: {engine_ms:.2f} ms/run")
+        self.stdout.write(f"decimal reference: {decimal_ms:.2f} ms")
+        self.stdout.write(self.style.SUCCESS(f"speedup: {decimal_ms / engine_ms:.1f}x"))
@@ -1,3 +1,5 @@
+from decimal import Decimal
+
 from rest_framework import serializers
 from .models import DebtPlan
 
@@ -14,3 +16,76 @@ class DebtPlanSerializer(serializers.ModelSerializer):
             "updated_at",
         ]
         read_only_fields = ["id", "created_at", "updated_at"]
+
+
+class DebtScenarioRequestSerializer(serializers.Serializer):
+    """Parameters for a strategy x monthly amount x lump sum sweep."""
+
+    MAX_SCENARIOS = 200
+
+    strategies = serializers.ListField(
+        child=serializers.ChoiceField(choices=DebtPlan.Strategy.choices),
+        required=False,
+        allow_empty=False,
+    )
+    monthly_amounts = serializers.ListField(
+        child=serializers.DecimalField(max_digits=14, decimal_places=2, min_value=0),
+        required=False,
+        allow_empty=False,
+    )
+    monthly_amount_start = serializers.DecimalField(
+        max_digits=14, decimal_places=2, min_value=0, required=False
+    )
+    monthly_amount_stop = serializers.DecimalField(
+        max_digits=14, decimal_places=2, min_value=0, required=False
+    )
+    monthly_amount_step = serializers.DecimalField(
+        max_digits=14, decimal_places=2, min_value=Decimal("0.01"), required=False
+    )
+    lump_sums = serializers.ListField(
+        child=serializers.DecimalField(max_digits=14, decimal_places=2, min_value=0),
+        required=False,
+        allow_empty=False,
+    )
+    include_schedule = serializers.BooleanField(default=False)
+
+    def validate(self, attrs):
+        amounts = list(attrs.get("monthly_amounts") or [])
+        range_keys = ("monthly_amount_start", "monthly_amount_stop", "monthly_amount_step")
+        given = [k for k in range_keys if k in attrs]
+        if given and len(given) != len(range_keys):
+            raise serializers.ValidationError(
+                "monthly_amount_start, monthly_amount_stop and monthly_amount_step "
+                "must be given together."
+            )
+        if given:
+            start, stop, step = (attrs.pop(k) for k in range_keys)
+            if stop < start:
+                raise serializers.ValidationError(
+                    {"monthly_amount_stop": "Must not be less than monthly_amount_start."}
+                )
+            count = int((stop - start) / step) + 1
+            if count > self.MAX_SCENARIOS:
+                raise serializers.ValidationError(
+                    {"monthly_amount_step": "Range produces too many amounts."}
+                )
+            amounts.extend(start + step * k for k in range(count))
+
+        attrs["monthly_amounts"] = sorted(set(amounts))
+        attrs["strategies"] = list(
+            dict.fromkeys(
+                attrs.get("strategies") or [c.value for c in DebtPlan.Strategy]
+            )
+        )
+        attrs["lump_sums"] = sorted(set(attrs.get("lump_sums") or [Decimal("0")]))
+
+        scenarios = (
+            len(attrs["strategies"])
+            * max(len(attrs["monthly_amounts"]), 1)
+            * len(attrs["lump_sums"])
+        )
+        if scenarios > self.MAX_SCENARIOS:
+            raise serializers.ValidationError(
+                f"At most {self.MAX_SCENARIOS} scenarios per request ({scenarios} requested)."
+            )
+        return attrs
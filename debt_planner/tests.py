@@ -1,3 +1,237 @@
-from django.test import TestCase
+import datetime
+import random
+from decimal import Decimal
+from types import SimpleNamespace
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APIClient
+
+from wealth.models import Liability
+from . import engine
+from .models import DebtPlan
+
+User = get_user_model()
+
+
+def make_debts(rng, count):
+    """Random in-memory liabilities in arbitrary order."""
+    return [
+        SimpleNamespace(
+            id=i + 1,
+            name=f"Debt {i + 1}",
+            principal_balance=Decimal(rng.randint(10000, 5000000)) / 100,
+            interest_rate=Decimal(rng.randint(0, 3600)) / 100,
+            minimum_payment=Decimal(rng.randint(500, 20000)) / 100,
+        )
+        for i in range(count)
+    ]
+
+
+class PayoffEngineParityTestCase(SimpleTestCase):
+    """The integer-cents engine must match the Decimal simulation exactly."""
+
+    def assertParity(self, debts, budget):
+        sim = engine.simulate(engine.build_inputs(debts), engine.to_cents(budget))
+        months, rows = engine.simulate_decimal(debts, budget)
+        self.assertEqual(sim.months, months)
+        self.assertEqual(len(sim.month_index), len(rows))
+        cents = engine.from_cents
+        for k, row in enumerate(rows):
+            self.assertEqual(
+                (
+                    sim.month_index[k],
+                    sim.debt_index[k],
+                    cents(sim.starting_balance[k]),
+                    cents(sim.interest[k]),
+                    cents(sim.payment[k]),
+                    cents(sim.principal[k]),
+                    cents(sim.ending_balance[k]),
+                ),
+                row,
+            )
+
+    def test_random_plans(self):
+        """Randomized plans, including non-terminating monthly rates."""
+        rng = random.Random(2024)
+        for _ in range(40):
+            debts = make_debts(rng, rng.randint(1, 12))
+            minimum = sum(d.minimum_payment for d in debts)
+            budget = minimum + Decimal(rng.randint(0, 200000)) / 100
+            self.assertParity(debts, budget)
+
+    def test_negative_amortization_hits_cap(self):
+        """Payments below interest run to the 600 month cap identically."""
+        debts = [
+            SimpleNamespace(
+                id=1,
+                name="Loan",
+                principal_balance=Decimal("100000.00"),
+                interest_rate=Decimal("29.99"),
+                minimum_payment=Decimal("100.00"),
+            )
+        ]
+        self.assertParity(debts, Decimal("100.00"))
+
+    def test_half_cent_ties(self):
+        """Interest landing exactly on half a cent rounds half-even."""
+        debts = [
+            SimpleNamespace(
+                id=1,
+                name="Card",
+                principal_balance=Decimal("1.25"),
+                interest_rate=Decimal("24.00"),
+                minimum_payment=Decimal("0.50"),
+            ),
+            SimpleNamespace(
+                id=2,
+                name="Loan",
+                principal_balance=Decimal("3.75"),
+                interest_rate=Decimal("12.00"),
+                minimum_payment=Decimal("0.10"),
+            ),
+        ]
+        self.assertParity(debts, Decimal("0.60"))
+
+    def test_month_dates_match_relativedelta(self):
+        from dateutil.relativedelta import relativedelta
+
+        start = datetime.date(2024, 1, 31)
+        expected = []
+        d = start
+        for _ in range(30):
+            expected.append(d)
+            d = d + relativedelta(months=1)
+        self.assertEqual(engine.month_dates(start, 30), expected)
+
+
+class DebtScheduleEndpointTestCase(TestCase):
+    """Test the schedule endpoint built on the engine."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser', password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        Liability.objects.create(
+            user=self.user,
+            name="Car loan",
+            principal_balance=Decimal("1000.00"),
+            interest_rate=Decimal("12.00"),
+            minimum_payment=Decimal("100.00"),
+        )
+        Liability.objects.create(
+            user=self.user,
+            name="Card",
+            principal_balance=Decimal("500.00"),
+            interest_rate=Decimal("24.00"),
+            minimum_payment=Decimal("50.00"),
+        )
+        self.plan = DebtPlan.objects.create(
+            user=self.user,
+            strategy=DebtPlan.Strategy.AVALANCHE,
+            monthly_amount_available=Decimal("300.00"),
+            start_date=datetime.date(2024, 1, 31),
+        )
+
+    def test_schedule(self):
+        response = self.client.get(f'/api/debt/debt-plans/{self.plan.id}/schedule/')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['strategy'], 'AVALANCHE')
+        first = data['schedule'][0]
+        # Avalanche pays the 24% card first and it takes the extra 150.
+        self.assertEqual(first['liability_name'], 'Card')
+        self.assertEqual(first['month'], '2024-01-31')
+        self.assertEqual(Decimal(str(first['interest'])), Decimal('10.00'))
+        self.assertEqual(Decimal(str(first['payment'])), Decimal('200.00'))
+        self.assertEqual(data['schedule'][2]['month'], '2024-02-29')
+        self.assertEqual(data['schedule'][-1]['ending_balance'], 0)
+
+    def test_compare_sweep(self):
+        """Compare runs every combination and matches the schedule endpoint."""
+        url = f'/api/debt/debt-plans/{self.plan.id}/compare/'
+        response = self.client.post(
+            url,
+            {
+                'monthly_amount_start': '100.00',
+                'monthly_amount_stop': '300.00',
+                'monthly_amount_step': '100.00',
+                'lump_sums': ['0', '500.00'],
+            },
+            format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['debts'], 2)
+        self.assertEqual(len(data['scenarios']), 2 * 3 * 2)
+
+        by_key = {
+            (s['strategy'], Decimal(str(s['monthly_amount_available'])), Decimal(str(s['lump_sum']))): s
+            for s in data['scenarios']
+        }
+        # Below the 150.00 of minimums the scenario reports an error.
+        self.assertIn('error', by_key[('AVALANCHE', Decimal('100'), Decimal('0'))])
+
+        base = by_key[('AVALANCHE', Decimal('300'), Decimal('0'))]
+        schedule = self.client.get(f'/api/debt/debt-plans/{self.plan.id}/schedule/').json()
+        self.assertEqual(base['months'], schedule['months'])
+        self.assertTrue(base['debt_free'])
+        self.assertNotIn('schedule', base)
+        self.assertEqual(
+            Decimal(str(base['total_interest'])),
+            sum(Decimal(str(row['interest'])) for row in schedule['schedule']),
+        )
+
+        lump = by_key[('AVALANCHE', Decimal('300'), Decimal('500'))]
+        self.assertLess(lump['months'], base['months'])
+        self.assertLess(lump['total_interest'], base['total_interest'])
+
+    def test_compare_limits_scenarios(self):
+        response = self.client.post(
+            f'/api/debt/debt-plans/{self.plan.id}/compare/',
+            {'monthly_amounts': [str(150 + k) for k in range(150)]},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_schedule_rollups_and_columns(self):
+        """Yearly rollups and the columnar layout carry the same totals."""
+        url = f'/api/debt/debt-plans/{self.plan.id}/schedule/'
+        monthly = self.client.get(url).json()
+        yearly = self.client.get(url, {'granularity': 'yearly'}).json()
+        columns = self.client.get(
+            url, {'granularity': 'quarterly', 'layout': 'columns'}
+        ).json()
+
+        def total(rows, key):
+            return sum(Decimal(str(row[key])) for row in rows)
+
+        self.assertEqual(yearly['granularity'], 'yearly')
+        self.assertEqual({row['period'] for row in yearly['schedule']}, {'2024'})
+        self.assertEqual(len(yearly['schedule']), 2)
+        self.assertEqual(
+            total(yearly['schedule'], 'interest'),
+            total(monthly['schedule'], 'interest'),
+        )
+
+        self.assertEqual(columns['periods'][:2], ['2024-Q1', '2024-Q2'])
+        card = columns['liabilities'][0]
+        self.assertEqual(card['liability_name'], 'Card')
+        self.assertLessEqual(len(card['interest']), len(columns['periods']))
+        self.assertEqual(
+            sum(Decimal(str(v)) for c in columns['liabilities'] for v in c['payment']),
+            total(monthly['schedule'], 'payment'),
+        )
+
+    def test_schedule_cache_tracks_liability_changes(self):
+        url = f'/api/debt/debt-plans/{self.plan.id}/schedule/'
+        before = self.client.get(url).json()
+        with self.assertNumQueries(2):
+            # A cache hit still reads the plan and the liabilities.
+            self.assertEqual(self.client.get(url).json(), before)
+        Liability.objects.filter(name='Card').update(principal_balance=Decimal('50.00'))
+        after = self.client.get(url).json()
+        self.assertEqual(Decimal(str(after['schedule'][0]['starting_balance'])), Decimal('50'))
+        self.assertLess(len(after['schedule']), len(before['schedule']))
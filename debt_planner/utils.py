@@ -1,25 +1,48 @@
 # debt_planner/utils.py
+import hashlib
 from decimal import Decimal
-from dateutil.relativedelta import relativedelta  # pip install python-dateutil
-
+from itertools import product
 from typing import Optional
+
+from django.core.cache import cache
 from wealth.models import Liability
+from . import engine
 from .models import DebtPlan
 
 
+def order_debts(debts, strategy):
+    """Sort liabilities into payoff order for the given strategy."""
+    if strategy == DebtPlan.Strategy.AVALANCHE:
+        return sorted(debts, key=lambda d: d.interest_rate or 0, reverse=True)
+    # SNOWBALL
+    return sorted(debts, key=lambda d: d.principal_balance)
+
+
+GRANULARITIES = ("monthly", "quarterly", "yearly")
+LAYOUTS = ("rows", "columns")
+SCHEDULE_CACHE_TIMEOUT = 60 * 60
+
+
 def generate_debt_schedule(
     plan: DebtPlan,
     strategy_override: Optional[str] = None,
+    granularity: str = "monthly",
+    layout: str = "rows",
 ):
     """
     Generate a simple monthly payoff schedule for all liabilities of the user
     using either Avalanche (highest rate) or Snowball (lowest balance).
-    Returns a dict with summary and a 'schedule' list.
+    Returns a dict with summary and a 'schedule' list, or with 'periods' and
+    per-liability parallel arrays under 'liabilities' for the columnar layout.
+    Quarterly and yearly granularity sum interest, payments and principal
+    per calendar period. Results are cached against the plan and the current
+    liability values.
     """
 
-    user = plan.user
     debts = list(
-        Liability.objects.filter(user=user).exclude(principal_balance__lte=0)
+        Liability.objects.filter(user_id=plan.user_id).exclude(
+            principal_balance__lte=0
+        )
     )
 
     if not debts:
@@ -34,83 +57,243 @@ def generate_debt_schedule(
             "monthly_amount_available": plan.monthly_amount_available,
         }
 
-    # ordering
     strategy = strategy_override or plan.strategy
+    key = schedule_cache_key(plan, strategy, debts, granularity, layout)
+    data = cache.get(key)
+    if data is not None:
+        return data
 
-    if strategy == DebtPlan.Strategy.AVALANCHE:
-        debts.sort(key=lambda d: d.interest_rate or 0, reverse=True)
-    else:  # SNOWBALL
-        debts.sort(key=lambda d: d.principal_balance)
-
-    balances = {d.id: Decimal(d.principal_balance) for d in debts}
-    month_date = plan.start_date
-    schedule = []
-    max_months = 600  # safety cap
-
-    for m in range(max_months):
-        # check if all paid
-        if all(balances[d.id] <= 0 for d in debts):
-            break
-
-        monthly_budget = Decimal(plan.monthly_amount_available)
-        total_minimum = sum(
-            (d.minimum_payment or 0)
-            for d in debts
-            if balances[d.id] > 0
+    debts = order_debts(debts, strategy)
+    months, rows = simulate_rows(debts, plan.monthly_amount_available)
+    last_month = rows[-1][0] if rows else -1
+    dates = engine.month_dates(plan.start_date, last_month + 1)
+    if granularity == "monthly":
+        periods = [d.isoformat() for d in dates]
+    else:
+        periods, period_of = _periods(dates, granularity)
+        rows = _rollup(rows, period_of)
+
+    data = {
+        "strategy": strategy,
+        "months": months,
+        "monthly_amount_available": plan.monthly_amount_available,
+        "granularity": granularity,
+    }
+    if layout == "columns":
+        data["periods"] = periods
+        data["liabilities"] = _columns(debts, rows)
+    else:
+        period_key = "month" if granularity == "monthly" else "period"
+        data["schedule"] = _schedule_rows(debts, rows, periods, period_key)
+    cache.set(key, data, SCHEDULE_CACHE_TIMEOUT)
+    return data
+
+
+def schedule_cache_key(plan, strategy, debts, granularity, layout) -> str:
+    """Cache key covering every input the schedule depends on.
+
+    Liability values are hashed directly rather than relying on
+    ``updated_at``, since balances are also changed by queryset updates.
+    """
+    state = [
+        plan.id,
+        strategy,
+        str(plan.monthly_amount_available),
+        plan.start_date.isoformat(),
+        granularity,
+        layout,
+    ]
+    for d in sorted(debts, key=lambda d: d.id):
+        state.append(
+            (d.id, d.name, str(d.principal_balance), str(d.interest_rate),
+             str(d.minimum_payment))
         )
+    digest = hashlib.sha1(repr(state).encode()).hexdigest()
+    return f"debt-schedule:{plan.user_id}:{digest}"
 
-        if monthly_budget < total_minimum:
-            # this shouldn't happen if checked above, but guard anyway
-            break
 
-        extra = monthly_budget - total_minimum
+def simulate_rows(debts, monthly_amount):
+    """Simulate ordered debts and return ``(months, row tuples)``.
 
-        for idx, d in enumerate(debts):
-            bal = balances[d.id]
-            if bal <= 0:
-                continue
+    Rows are ``(month, debt, starting, interest, payment, principal,
+    ending)`` with Decimal amounts. Uses the integer-cents engine, falling
+    back to the Decimal simulation when an input is not a whole number of
+    cents.
+    """
+    sim = engine.simulate_for(debts, monthly_amount)
+    if sim is None:
+        return engine.simulate_decimal(debts, monthly_amount)
+    return sim.months, _simulation_rows(sim)
+
+
+def simulation_schedule(debts, sim, start_date):
+    """Expand an engine result into the per-debt, per-month schedule rows."""
+    dates = [d.isoformat() for d in engine.month_dates(start_date, sim.months)]
+    return _schedule_rows(debts, _simulation_rows(sim), dates)
 
-            monthly_rate = (
-                Decimal(d.interest_rate or 0)
-                / Decimal("100")
-                / Decimal("12")
-            )
-            interest = (bal * monthly_rate).quantize(Decimal("0.01"))
-
-            payment = Decimal(d.minimum_payment or 0)
-            if extra > 0 and idx == 0:
-                payment += extra
-
-            # cap payment
-            max_pay = bal + interest
-            if payment > max_pay:
-                payment = max_pay
-
-            principal_paid = payment - interest
-            new_balance = bal + interest - payment
-
-            balances[d.id] = new_balance
-
-            schedule.append(
-                {
-                    "month": month_date.isoformat(),
-                    "liability_id": d.id,
-                    "liability_name": d.name,
-                    "starting_balance": bal,
-                    "interest": interest,
-                    "payment": payment,
-                    "principal": principal_paid,
-                    "ending_balance": new_balance,
-                }
-            )
 
-        month_date = month_date + relativedelta(months=1)
+def _simulation_rows(sim):
+    cents = engine.from_cents
+    return list(
+        zip(
+            sim.month_index,
+            sim.debt_index,
+            map(cents, sim.starting_balance),
+            map(cents, sim.interest),
+            map(cents, sim.payment),
+            map(cents, sim.principal),
+            map(cents, sim.ending_balance),
+        )
+    )
+
+
+def _periods(dates, granularity):
+    """Calendar period labels and the period index of each month."""
+    if granularity == "quarterly":
+        labels = [f"{d.year}-Q{(d.month - 1) // 3 + 1}" for d in dates]
+    else:
+        labels = [str(d.year) for d in dates]
+    periods = []
+    period_of = []
+    for label in labels:
+        if not periods or periods[-1] != label:
+            periods.append(label)
+        period_of.append(len(periods) - 1)
+    return periods, period_of
 
-    months_used = m + 1
+
+def _rollup(rows, period_of):
+    """Combine monthly rows per (period, debt).
+
+    Flows are summed; the starting balance is the first month's and the
+    ending balance the last month's. Debts never reopen once paid off, so
+    insertion order keeps rows ordered by period and then payoff order.
+    """
+    totals = {}
+    for m, i, starting, interest, payment, principal, ending in rows:
+        key = (period_of[m], i)
+        acc = totals.get(key)
+        if acc is None:
+            totals[key] = [starting, interest, payment, principal, ending]
+        else:
+            acc[1] += interest
+            acc[2] += payment
+            acc[3] += principal
+            acc[4] = ending
+    return [(p, i, *acc) for (p, i), acc in totals.items()]
+
+
+def _schedule_rows(debts, rows, periods, period_key="month"):
+    schedule = [
+        {
+            period_key: periods[m],
+            "liability_id": debts[i].id,
+            "liability_name": debts[i].name,
+            "starting_balance": starting,
+            "interest": interest,
+            "payment": payment,
+            "principal": principal,
+            "ending_balance": ending,
+        }
+        for m, i, starting, interest, payment, principal, ending in rows
+    ]
+    return schedule
+
+
+def _columns(debts, rows):
+    """One entry per liability with parallel arrays indexed by period.
+
+    A liability is open from the first period until it is paid off, so its
+    arrays cover ``periods[:len(interest)]``.
+    """
+    columns = [
+        {
+            "liability_id": d.id,
+            "liability_name": d.name,
+            "starting_balance": [],
+            "interest": [],
+            "payment": [],
+            "principal": [],
+            "ending_balance": [],
+        }
+        for d in debts
+    ]
+    for _, i, starting, interest, payment, principal, ending in rows:
+        column = columns[i]
+        column["starting_balance"].append(starting)
+        column["interest"].append(interest)
+        column["payment"].append(payment)
+        column["principal"].append(principal)
+        column["ending_balance"].append(ending)
+    return columns
+
+
+def compare_scenarios(
+    plan: DebtPlan,
+    strategies,
+    monthly_amounts,
+    lump_sums=(Decimal("0"),),
+    include_schedule: bool = False,
+):
+    """
+    Simulate every strategy x monthly amount x lump sum combination against
+    one snapshot of the user's liabilities and return summary metrics per
+    scenario. Debts are loaded and converted to engine inputs once per
+    strategy; each scenario is then a single in-memory simulation.
+    """
+    debts = list(
+        Liability.objects.filter(user_id=plan.user_id).exclude(
+            principal_balance__lte=0
+        )
+    )
+    if not debts:
+        return {"debts": 0, "required_minimum": Decimal("0"), "scenarios": []}
+
+    total_minimum = sum((d.minimum_payment or 0) for d in debts)
+    ordered = {s: order_debts(debts, s) for s in strategies}
+    # DecimalField values are whole cents, so the integer engine always applies.
+    inputs = {s: engine.build_inputs(ordered[s]) for s in strategies}
+
+    scenarios = []
+    for strategy, amount, lump_sum in product(strategies, monthly_amounts, lump_sums):
+        scenario = {
+            "strategy": strategy,
+            "monthly_amount_available": amount,
+            "lump_sum": lump_sum,
+        }
+        if amount < total_minimum:
+            scenario["error"] = "Monthly amount is less than sum of minimum payments."
+            scenarios.append(scenario)
+            continue
+
+        sim = engine.simulate(
+            inputs[strategy],
+            engine.to_cents(amount),
+            lump_sum=engine.to_cents(lump_sum),
+            record=include_schedule,
+        )
+        debt_free_month = None
+        if sim.paid_off and sim.months > 1:
+            debt_free_month = engine.month_dates(
+                plan.start_date, sim.months - 1
+            )[-1].isoformat()
+        scenario.update(
+            {
+                "months": sim.months,
+                "debt_free": sim.paid_off,
+                "debt_free_month": debt_free_month,
+                "total_interest": engine.from_cents(sim.total_interest),
+                "total_paid": engine.from_cents(sim.total_paid),
+            }
+        )
+        if include_schedule:
+            scenario["schedule"] = simulation_schedule(
+                ordered[strategy], sim, plan.start_date
+            )
+        scenarios.append(scenario)
 
     return {
-        "strategy": strategy,
-        "months": months_used,
-        "monthly_amount_available": plan.monthly_amount_available,
-        "schedule": schedule,
+        "debts": len(debts),
+        "required_minimum": total_minimum,
+        "scenarios": scenarios,
     }
@@ -2,17 +2,24 @@ from rest_framework import viewsets, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
+from backend.conditional import ConditionalListMixin
+
 from .models import DebtPlan
-from .serializers import DebtPlanSerializer
-from .utils import generate_debt_schedule
+from .serializers import DebtPlanSerializer, DebtScenarioRequestSerializer
+from .utils import (
+    GRANULARITIES,
+    LAYOUTS,
+    compare_scenarios,
+    generate_debt_schedule,
+)
 
 
 class IsOwner(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
-        return getattr(obj, "user", None) == request.user
+        return getattr(obj, "user_id", None) == request.user.pk
 
 
-class DebtPlanViewSet(viewsets.ModelViewSet):
+class DebtPlanViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     serializer_class = DebtPlanSerializer
     permission_classes = [permissions.IsAuthenticated, IsOwner]
 
@@ -29,5 +36,36 @@ class DebtPlanViewSet(viewsets.ModelViewSet):
         # validate strategy value
         if strategy not in (None, *[c.value for c in DebtPlan.Strategy]):
             strategy = None
-        data = generate_debt_schedule(plan, strategy_override=strategy)
+        granularity = request.query_params.get("granularity", "monthly")
+        if granularity not in GRANULARITIES:
+            granularity = "monthly"
+        layout = request.query_params.get("layout", "rows")
+        if layout not in LAYOUTS:
+            layout = "rows"
+        data = generate_debt_schedule(
+            plan,
+            strategy_override=strategy,
+            granularity=granularity,
+            layout=layout,
+        )
+        return Response(data)
+
+    @action(detail=True, methods=["post"])
+    def compare(self, request, pk=None):
+        """Run a strategy x monthly amount x lump sum sweep for this plan.
+
+        Monthly amounts default to the plan's own amount when neither a list
+        nor a start/stop/step range is given.
+        """
+        plan = self.get_object()
+        serializer = DebtScenarioRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        data = compare_scenarios(
+            plan,
+            strategies=params["strategies"],
+            monthly_amounts=params["monthly_amounts"] or [plan.monthly_amount_available],
+            lump_sums=params["lump_sums"],
+            include_schedule=params["include_schedule"],
+        )
         return Response(data)
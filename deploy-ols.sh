@@ -23,6 +23,7 @@ PUBLIC_HTML="${HOME_DIR}/public_html"       # Frontend deployment (same as APP_D
 VENV_PATH="${HOME_DIR}/.venv"               # Virtual environment
 ENV_FILE="${HOME_DIR}/.env"                 # Environment file
 LOG_DIR="${HOME_DIR}/logs"                  # Log directory
+METRICS_DIR="${HOME_DIR}/metrics"           # Prometheus metrics files
 PYTHON_VERSION="python3.11"                 # or python3.10, python3.9
 
 # Colors for output
@@ -177,6 +178,9 @@ SOCIALACCOUNT_LOGIN_REDIRECT_URL=https://$DOMAIN/oauth-callback
 # Session/Cookie Security
 SESSION_COOKIE_DOMAIN=.$DOMAIN
 SECURE_SSL_REDIRECT=True
+
+# Prometheus metrics - gunicorn and cron-run commands must share this directory
+PROMETHEUS_MULTIPROC_DIR=$METRICS_DIR
 EOF
 
     chmod 600 "$ENV_FILE"
@@ -430,6 +434,11 @@ User=$APP_USER
 Group=$APP_USER
 WorkingDirectory=$APP_DIR
 EnvironmentFile=$ENV_FILE
+# Prometheus metrics files shared by the workers and cron-run commands;
+# stale files from the previous run must go before the workers start
+Environment=PROMETHEUS_MULTIPROC_DIR=$METRICS_DIR
+ExecStartPre=/bin/rm -rf $METRICS_DIR
+ExecStartPre=/bin/mkdir -p $METRICS_DIR
 ExecStart=$VENV_PATH/bin/gunicorn \\
     --workers 3 \
     --bind 127.0.0.1:8001 \
@@ -567,6 +576,7 @@ ${YELLOW}Your Setup:${NC}
 - Venv: $VENV_PATH
 - Env: $ENV_FILE
 - Logs: $LOG_DIR
+- Metrics: $METRICS_DIR
 
 ${YELLOW}Useful Commands:${NC}
 - View Gunicorn logs: journalctl -u finance-app -f
@@ -2,8 +2,10 @@ from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
 from django.db import transaction as db_transaction
 from django.db.models import Sum
+from django.utils import timezone
 from uuid import uuid4
 
+from backend.cache import bump
 from finance.models import Transaction
 from savings.models import GoalContribution, SavingsGoal
 
@@ -114,8 +116,15 @@ class Command(BaseCommand):
         count += expense_qs.count() + income_qs.count()
         if dry_run:
             return count
-        expense_qs.update(investment_action=Transaction.InvestmentAction.BUY)
-        income_qs.update(investment_action=Transaction.InvestmentAction.SELL)
+        now = timezone.now()
+        expense_qs.update(
+            investment_action=Transaction.InvestmentAction.BUY, updated_at=now
+        )
+        income_qs.update(
+            investment_action=Transaction.InvestmentAction.SELL, updated_at=now
+        )
+        if count:
+            bump(user.pk, "finance")
         return count
 
     def _backfill_transfers(self, user, dry_run):
@@ -137,7 +146,7 @@ class Command(BaseCommand):
             if not dry_run:
                 tx.transfer_group = group_id
                 tx.transfer_direction = direction
-                tx.save(update_fields=["transfer_group", "transfer_direction"])
+                tx.save(update_fields=["transfer_group", "transfer_direction", "updated_at"])
 
             counterpart = Transaction.objects.filter(
                 user=user,
@@ -153,7 +162,7 @@ class Command(BaseCommand):
                 if not dry_run:
                     counterpart.transfer_group = group_id
                     counterpart.transfer_direction = Transaction.TransferDirection.IN
-                    counterpart.save(update_fields=["transfer_group", "transfer_direction"])
+                    counterpart.save(update_fields=["transfer_group", "transfer_direction", "updated_at"])
                 continue
 
             created += 1
@@ -196,5 +205,5 @@ class Command(BaseCommand):
             if dry_run:
                 continue
             goal.current_amount = total
-            goal.save(update_fields=["current_amount"])
+            goal.save(update_fields=["current_amount", "updated_at"])
         return count
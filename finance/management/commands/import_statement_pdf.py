@@ -1,12 +1,14 @@
 from datetime import datetime
 from decimal import Decimal, InvalidOperation
 import re
+import time
 from pathlib import Path
 
 from django.contrib.auth import get_user_model
-from django.core.management.base import BaseCommand, CommandError
+from django.core.management.base import CommandError
 from django.db import transaction as db_transaction
 
+from backend import metrics
 from finance.models import Account, Transaction
 
 try:
@@ -46,7 +48,7 @@ NOISE_CONTAINS = [
 ]
 
 
-class Command(BaseCommand):
+class Command(metrics.MeteredCommand):
     help = "Import transactions from a bank statement PDF."
 
     def add_arguments(self, parser):
@@ -99,6 +101,7 @@ class Command(BaseCommand):
         if transactions[0]["date"] > transactions[-1]["date"]:
             transactions = list(reversed(transactions))
 
+        started = time.perf_counter()
         created = 0
         duplicates = 0
         prev_balance = opening_balance
@@ -146,6 +149,10 @@ class Command(BaseCommand):
             if dry_run:
                 db_transaction.set_rollback(True)
 
+        if not dry_run:
+            self.rows = created
+            metrics.record_import("pdf_command", started, created=created, skipped=duplicates)
+
         self.stdout.write(self.style.SUCCESS("Statement import complete."))
         self.stdout.write(f"parsed: {len(transactions)}")
         self.stdout.write(f"created: {created}")
@@ -1,4 +1,4 @@
-from django.core.management.base import BaseCommand
+from backend.metrics import MeteredCommand
 from django.utils import timezone
 from finance.models import RecurringTransaction, Transaction
 
@@ -15,7 +15,7 @@ def add_months(d, months):
     return date(year, month, day)
 
 
-class Command(BaseCommand):
+class Command(MeteredCommand):
     help = "Materialize recurring transactions into actual Transaction rows"
 
     def add_arguments(self, parser):
@@ -66,4 +66,5 @@ class Command(BaseCommand):
 
             r.save()
 
+        self.rows = created
         self.stdout.write(self.style.SUCCESS(f"Materialized {created} transactions"))
@@ -0,0 +1,35 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("finance", "0009_transaction_user_updated_index"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="account",
+            index=models.Index(
+                fields=["user", "updated_at"], name="finance_acct_user_updated_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="category",
+            index=models.Index(
+                fields=["user", "updated_at"], name="finance_cat_user_updated_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="recurringtransaction",
+            index=models.Index(
+                fields=["user", "updated_at"], name="finance_rec_user_updated_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="tag",
+            index=models.Index(
+                fields=["user", "updated_at"], name="finance_tag_user_updated_idx"
+            ),
+        ),
+    ]
@@ -40,6 +40,11 @@ class Account(TimeStampedModel):
     institution = models.CharField(max_length=100, blank=True)
     notes = models.TextField(blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "updated_at"], name="finance_acct_user_updated_idx"),
+        ]
+
     def __str__(self):
         return f"{self.name} ({self.account_type})"
     
@@ -103,6 +108,9 @@ class Category(TimeStampedModel):
 
     class Meta:
         unique_together = ("user", "name", "kind")
+        indexes = [
+            models.Index(fields=["user", "updated_at"], name="finance_cat_user_updated_idx"),
+        ]
 
     def __str__(self):
         return self.name
@@ -208,6 +216,10 @@ class Transaction(TimeStampedModel):
 
     class Meta:
         ordering = ["-date", "-created_at"]
+        indexes = [
+            # Conditional GET validators and delta sync.
+            models.Index(fields=["user", "updated_at"], name="finance_tx_user_updated_idx"),
+        ]
 
     def __str__(self):
         return f"{self.date} - {self.kind} - {self.amount}"
@@ -237,6 +249,9 @@ class RecurringTransaction(TimeStampedModel):
 
     class Meta:
         ordering = ["-date"]
+        indexes = [
+            models.Index(fields=["user", "updated_at"], name="finance_rec_user_updated_idx"),
+        ]
 
     def __str__(self):
         return f"Recurring {self.kind} {self.amount} every {self.frequency} starting {self.date}"
@@ -255,6 +270,9 @@ class Tag(TimeStampedModel):
     class Meta:
         unique_together = ("user", "name")
         ordering = ["name"]
+        indexes = [
+            models.Index(fields=["user", "updated_at"], name="finance_tag_user_updated_idx"),
+        ]
     
     def __str__(self):
         return self.name
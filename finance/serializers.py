@@ -26,6 +26,10 @@ class AccountSerializer(serializers.ModelSerializer):
         read_only_fields = ["id", "current_balance", "created_at", "updated_at"]
     
     def get_current_balance(self, obj):
+        # Callers serializing many accounts can pass precomputed balances.
+        balances = self.context.get("balances")
+        if balances is not None and obj.id in balances:
+            return balances[obj.id]
         return obj.calculate_current_balance()
 
 
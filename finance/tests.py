@@ -1,3 +1,217 @@
+import time
+from contextlib import contextmanager
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.utils.http import http_date
+from rest_framework.test import APIClient
+
+from investments.models import Investment, InvestmentTransaction
+from investments.utils import apply_cash_flow, apply_trade
+from savings.models import GoalContribution, SavingsGoal
+from savings.utils import adjust_goal_amount
+from wealth.models import Liability
+from wealth.utils import adjust_liability_balance
+from .models import Account, Category, Transaction
+
+User = get_user_model()
+
+
+class ConcurrentBalanceUpdateTestCase(TestCase):
+    """Interleave a competing write with each running-total update."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser', password='testpass123'
+        )
+
+    @contextmanager
+    def interleaved(self, model, write):
+        """Run ``write`` just before the next UPDATE of ``model``'s table.
+
+        This is the window a concurrent request gets between a stale read
+        and the write. A read-modify-write overwrites the change ``write``
+        made there; an UPDATE computed from the row keeps both.
+        """
+        prefix = f'UPDATE {connection.ops.quote_name(model._meta.db_table)}'
+        fired = []
+
+        def wrapper(execute, sql, params, many, context):
+            if not fired and sql.startswith(prefix):
+                fired.append(True)
+                write()
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(wrapper):
+            yield
+        self.assertEqual(fired, [True])
+
+    def test_goal_contributions_and_deltas(self):
+        goal = SavingsGoal.objects.create(
+            user=self.user, name='Fund', target_amount=Decimal('100000.00')
+        )
+
+        def contribute():
+            GoalContribution.objects.create(
+                goal_id=goal.id, amount=Decimal('3.00'), date=date(2024, 1, 1)
+            )
+
+        with self.interleaved(SavingsGoal, contribute):
+            adjust_goal_amount(goal.id, Decimal('2.00'), user=self.user)
+        with self.interleaved(
+            SavingsGoal, lambda: adjust_goal_amount(goal.id, Decimal('2.00'))
+        ):
+            contribute()
+        goal.refresh_from_db()
+        self.assertEqual(GoalContribution.objects.count(), 2)
+        self.assertEqual(goal.current_amount, Decimal('10.00'))
+
+    def test_liability_payments(self):
+        liability = Liability.objects.create(
+            user=self.user,
+            name='Loan',
+            principal_balance=Decimal('1000.00'),
+            interest_rate=Decimal('10.00'),
+            minimum_payment=Decimal('10.00'),
+        )
+
+        def pay():
+            adjust_liability_balance(liability.id, Decimal('-1.50'), user=self.user)
+
+        with self.interleaved(Liability, pay):
+            pay()
+        liability.refresh_from_db()
+        self.assertEqual(liability.principal_balance, Decimal('997.00'))
+
+    def test_investment_cash_flows_and_trades(self):
+        holding = Investment.objects.create(
+            user=self.user,
+            name='Fund',
+            investment_type='MMF',
+            purchase_date=date(2024, 1, 1),
+            purchase_price=Decimal('10.00'),
+            quantity=Decimal('1000'),
+            current_price=Decimal('10.00'),
+        )
+
+        def buy():
+            apply_trade(holding.id, 'BUY', Decimal('1'), Decimal('10.00'), Decimal('0'))
+
+        with self.interleaved(Investment, buy):
+            apply_cash_flow(holding.id, Decimal('25.00'), user=self.user)
+        with self.interleaved(
+            Investment, lambda: apply_cash_flow(holding.id, Decimal('25.00'))
+        ):
+            buy()
+        holding.refresh_from_db()
+        # Two cash flows of 2.5 units and two buys of 1 unit.
+        self.assertEqual(holding.quantity, Decimal('1007'))
+        self.assertEqual(holding.purchase_price, Decimal('10.00'))
+
+    def test_trade_endpoint_averages_in_the_database(self):
+        holding = Investment.objects.create(
+            user=self.user,
+            name='Stock',
+            investment_type='STOCK',
+            purchase_date=date(2024, 1, 1),
+            purchase_price=Decimal('10.00'),
+            quantity=Decimal('3'),
+            current_price=Decimal('10.00'),
+        )
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        url = f'/api/investments/investments/{holding.id}/add_transaction/'
+        data = client.post(url, {
+            'transaction_type': 'BUY', 'date': '2024-02-01', 'quantity': '2',
+            'price_per_unit': '21.00', 'total_amount': '42.00', 'fees': '1.50',
+        }, format='json').json()
+        self.assertEqual(Decimal(str(data['quantity'])), Decimal('5'))
+        self.assertEqual(Decimal(str(data['purchase_price'])), Decimal('14.40'))
+        self.assertEqual(Decimal(str(data['purchase_fees'])), Decimal('1.50'))
+
+        data = client.post(url, {
+            'transaction_type': 'SELL', 'date': '2024-03-01', 'quantity': '5',
+            'price_per_unit': '30.00', 'total_amount': '150.00',
+        }, format='json').json()
+        self.assertEqual(data['status'], 'SOLD')
+        self.assertEqual(InvestmentTransaction.objects.count(), 2)
+
+
+class ConditionalListTestCase(TestCase):
+    """Test ETag handling on list endpoints."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='testuser', password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.account = Account.objects.create(
+            user=self.user, name='Bank', opening_balance=Decimal('100.00')
+        )
+        self.category = Category.objects.create(
+            user=self.user, name='Food', kind='EXPENSE'
+        )
+
+    def test_unchanged_list_is_not_modified(self):
+        url = '/api/finance/categories/'
+        response = self.client.get(url)
+        etag = response['ETag']
+
+        # Only the validator query runs; nothing is fetched or serialized.
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        self.assertEqual(
+            self.client.get(url, {'kind': 'EXPENSE'}, HTTP_IF_NONE_MATCH=etag).status_code,
+            200,
+        )
+
+    def test_writes_change_the_etag(self):
+        url = '/api/finance/categories/'
+        etag = self.client.get(url)['ETag']
+        self.category.name = 'Groceries'
+        self.category.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]['name'], 'Groceries')
+
+        etag = response['ETag']
+        Category.objects.create(user=self.user, name='Rent', kind='EXPENSE')
+        Category.objects.filter(name='Rent').delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.category.delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_deletes_are_not_hidden_by_if_modified_since(self):
+        url = '/api/finance/categories/'
+        Category.objects.create(user=self.user, name='Rent', kind='EXPENSE')
+        response = self.client.get(url)
+        self.assertFalse(response.has_header('Last-Modified'))
+        since = http_date(time.time() + 60)
+
+        self.category.delete()
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=since)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([c['name'] for c in response.json()], ['Rent'])
+
+    def test_dependent_data_changes_the_etag(self):
+        url = '/api/finance/accounts/'
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
 
-# Create your tests here.
+        Transaction.objects.create(
+            user=self.user, account=self.account, date=date(2024, 1, 1),
+            amount=Decimal('40.00'), kind='EXPENSE',
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]['current_balance'], 60.0)
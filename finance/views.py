@@ -1,5 +1,6 @@
 # finance/views.py
 import datetime
+import time
 from decimal import Decimal, InvalidOperation
 from uuid import uuid4
 
@@ -33,26 +34,45 @@ from activity.utils import (
     ACTION_IMPORT_PDF,
 )
 from notifications.models import Notification as NotificationModel
-from wealth.models import Liability
-from savings.models import SavingsGoal, GoalContribution
-from investments.models import Investment
+from wealth.utils import account_balances, adjust_liability_balance
+from savings.models import GoalContribution
+from savings.utils import adjust_goal_amount
+from investments.utils import apply_cash_flow
+from investments.valuation import invalidate_valuations
 from .statement_import import build_preview, parse_statement_pdf
+from backend import metrics
+from backend.cache import get_or_build
+from backend.conditional import ConditionalListMixin
 
 User = get_user_model()
 
 
-class AccountViewSet(viewsets.ModelViewSet):
+class AccountViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     serializer_class = AccountSerializer
     permission_classes = [permissions.IsAuthenticated]
+    # Balances change with the account's transactions.
+    conditional_groups = ("finance",)
 
     def get_queryset(self):
         return Account.objects.filter(user=self.request.user)
 
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action in ("list", "retrieve"):
+            user = self.request.user
+            context["balances"], _ = get_or_build(
+                user.id,
+                "account_balances",
+                ("finance",),
+                lambda: account_balances(list(Account.objects.filter(user=user))),
+            )
+        return context
+
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     serializer_class = CategorySerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -63,13 +83,19 @@ class CategoryViewSet(viewsets.ModelViewSet):
         serializer.save(user=self.request.user)
 
 
-class TransactionViewSet(viewsets.ModelViewSet):
+class TransactionViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     serializer_class = TransactionSerializer
     permission_classes = [permissions.IsAuthenticated]
     pagination_class = LimitOffsetPagination
+    # Rows show the names of linked accounts, categories, goals,
+    # liabilities and investments.
+    conditional_groups = ("finance", "savings", "wealth", "investments")
 
     def get_queryset(self):
-        qs = Transaction.objects.filter(user=self.request.user)
+        qs = Transaction.objects.filter(user=self.request.user).select_related(
+            "account", "transfer_account", "category", "savings_goal",
+            "liability", "investment",
+        )
         account_id = self.request.query_params.get("account")
         start = self.request.query_params.get("start")
         end = self.request.query_params.get("end")
@@ -111,16 +137,7 @@ class TransactionViewSet(viewsets.ModelViewSet):
     def _apply_liability_delta(self, liability_id, delta):
         if not liability_id or delta == 0:
             return
-        liability = Liability.objects.select_for_update().filter(
-            id=liability_id, user=self.request.user
-        ).first()
-        if not liability:
-            return
-        new_balance = Decimal(liability.principal_balance) + delta
-        if new_balance < 0:
-            new_balance = Decimal("0")
-        liability.principal_balance = new_balance
-        liability.save(update_fields=["principal_balance"])
+        adjust_liability_balance(liability_id, delta, user=self.request.user)
 
     def _sync_liability(self, before, after):
         before_effect = self._liability_effect(before)
@@ -138,16 +155,7 @@ class TransactionViewSet(viewsets.ModelViewSet):
     def _apply_savings_delta(self, goal_id, delta):
         if not goal_id or delta == 0:
             return
-        goal = SavingsGoal.objects.select_for_update().filter(
-            id=goal_id, user=self.request.user
-        ).first()
-        if not goal:
-            return
-        new_amount = Decimal(goal.current_amount) + delta
-        if new_amount < 0:
-            new_amount = Decimal("0")
-        goal.current_amount = new_amount
-        goal.save(update_fields=["current_amount"])
+        adjust_goal_amount(goal_id, delta, user=self.request.user)
 
     def _sync_savings(self, before, after):
         before_effect = self._savings_effect(before)
@@ -205,9 +213,9 @@ class TransactionViewSet(viewsets.ModelViewSet):
                 action = Transaction.InvestmentAction.SELL
             else:
                 return None
-        return tx.investment_id, action, Decimal(tx.amount)
+        return tx.investment_id, action, Decimal(tx.amount), tx.date
 
-    def _apply_investment_delta(self, investment_id, action, amount, reverse=False):
+    def _apply_investment_delta(self, investment_id, action, amount, on, reverse=False):
         if not investment_id or amount == 0:
             return
 
@@ -224,47 +232,21 @@ class TransactionViewSet(viewsets.ModelViewSet):
         if sign == 0:
             return
 
-        investment = Investment.objects.select_for_update().filter(
-            id=investment_id, user=self.request.user
-        ).first()
-        if not investment:
-            return
-
-        delta = amount * Decimal(sign)
-        update_fields = []
-
-        if investment.quantity == 1:
-            new_price = Decimal(investment.current_price) + delta
-            if new_price < 0:
-                new_price = Decimal("0")
-            investment.current_price = new_price
-            update_fields.append("current_price")
-        else:
-            current_price = Decimal(investment.current_price)
-            if current_price > 0:
-                qty_delta = delta / current_price
-                new_qty = Decimal(investment.quantity) + qty_delta
-                if new_qty < 0:
-                    new_qty = Decimal("0")
-                investment.quantity = new_qty
-                update_fields.append("quantity")
-                if new_qty == 0 and investment.status != "SOLD":
-                    investment.status = "SOLD"
-                    update_fields.append("status")
-
-        if update_fields:
-            investment.save(update_fields=update_fields)
+        if apply_cash_flow(
+            investment_id, amount * Decimal(sign), user=self.request.user
+        ):
+            invalidate_valuations(self.request.user, on)
 
     def _sync_investment(self, before, after):
         before_effect = self._investment_effect(before)
         after_effect = self._investment_effect(after)
         if before_effect:
             self._apply_investment_delta(
-                before_effect[0], before_effect[1], before_effect[2], reverse=True
+                before_effect[0], before_effect[1], before_effect[2], before_effect[3], reverse=True
             )
         if after_effect:
             self._apply_investment_delta(
-                after_effect[0], after_effect[1], after_effect[2], reverse=False
+                after_effect[0], after_effect[1], after_effect[2], after_effect[3], reverse=False
             )
 
     def _ensure_investment_action(self, tx):
@@ -276,7 +258,7 @@ class TransactionViewSet(viewsets.ModelViewSet):
             tx.investment_action = Transaction.InvestmentAction.SELL
         else:
             return
-        tx.save(update_fields=["investment_action"])
+        tx.save(update_fields=["investment_action", "updated_at"])
 
     def _log_transaction_activity(self, action, tx, before=None):
         if not tx:
@@ -511,7 +493,9 @@ class TransactionViewSet(viewsets.ModelViewSet):
     def update(self, request, *args, **kwargs):
         partial = kwargs.pop("partial", False)
         instance = self.get_object()
-        before = Transaction.objects.get(pk=instance.pk)
+        before = Transaction.objects.select_related(
+            "account", "transfer_account"
+        ).get(pk=instance.pk)
         serializer = self.get_serializer(
             instance, data=request.data, partial=partial
         )
@@ -560,7 +544,9 @@ class TransactionViewSet(viewsets.ModelViewSet):
 
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
-        before = Transaction.objects.get(pk=instance.pk)
+        before = Transaction.objects.select_related(
+            "account", "transfer_account"
+        ).get(pk=instance.pk)
         with db_transaction.atomic():
             if instance.kind == Transaction.Kind.TRANSFER and instance.transfer_group:
                 Transaction.objects.filter(
@@ -605,6 +591,16 @@ class TransactionViewSet(viewsets.ModelViewSet):
         if kind:
             qs = qs.filter(kind=kind)
 
+        data, _ = get_or_build(
+            request.user.id,
+            "aggregated",
+            ("finance",),
+            lambda: self._aggregated_series(qs, group_by),
+            params={"start": start, "end": end, "group_by": group_by, "kind": kind},
+        )
+        return Response({"series": data})
+
+    def _aggregated_series(self, qs, group_by):
         # Handle quarter grouping separately (year + quarter)
         if group_by == "quarter":
             series = (
@@ -645,7 +641,7 @@ class TransactionViewSet(viewsets.ModelViewSet):
                 }
                 for s in series
             ]
-            return Response({"series": data})
+            return data
 
         # Other groupings use Trunc functions
         if group_by == "month":
@@ -694,7 +690,7 @@ class TransactionViewSet(viewsets.ModelViewSet):
             }
             for s in series
         ]
-        return Response({"series": data})
+        return data
 
     @action(detail=False, methods=["post"], url_path="import-csv")
     def import_csv(self, request):
@@ -708,6 +704,7 @@ class TransactionViewSet(viewsets.ModelViewSet):
 
         import csv
         from io import TextIOWrapper
+        started = time.perf_counter()
         reader = csv.DictReader(TextIOWrapper(f.file, encoding='utf-8'))
         created = 0
         errors = []
@@ -731,6 +728,7 @@ class TransactionViewSet(viewsets.ModelViewSet):
                 created += 1
             except Exception as e:
                 errors.append({"row": idx + 1, "error": str(e)})
+        metrics.record_import("csv", started, created=created, failed=len(errors))
 
         try:
             file_name = getattr(f, "name", "")
@@ -816,6 +814,7 @@ class TransactionViewSet(viewsets.ModelViewSet):
         if not account:
             return Response({"detail": "account not found"}, status=400)
 
+        started = time.perf_counter()
         created = 0
         skipped = 0
         errors = []
@@ -858,6 +857,9 @@ class TransactionViewSet(viewsets.ModelViewSet):
                 created += 1
             except Exception as exc:
                 errors.append({"row": idx + 1, "error": str(exc)})
+        metrics.record_import(
+            "pdf", started, created=created, skipped=skipped, failed=len(errors)
+        )
 
         try:
             meta = {
@@ -906,11 +908,11 @@ class TransactionViewSet(viewsets.ModelViewSet):
             writer.writerow([
                 t.id,
                 t.date.isoformat(),
-                getattr(t.account, 'id', ''),
+                t.account_id,
                 str(t.amount),
                 str(t.fee or 0),
                 t.kind,
-                getattr(t.category, 'id', ''),
+                t.category_id or '',
                 t.description,
             ])
         resp = Response(out.getvalue(), content_type='text/csv')
@@ -935,28 +937,40 @@ class TransactionViewSet(viewsets.ModelViewSet):
         if end:
             qs = qs.filter(date__lte=end)
 
-        cat_series = (
-            qs.values("category", "category__name")
-            .annotate(amount=Sum("amount"), fees=Sum("fee"))
-            .order_by("-amount")[:limit]
+        def build():
+            cat_series = (
+                qs.values("category", "category__name")
+                .annotate(amount=Sum("amount"), fees=Sum("fee"))
+                .order_by("-amount")[:limit]
+            )
+            return [
+                {
+                    "id": c["category"],
+                    "name": c["category__name"],
+                    "amount": float((c["amount"] or 0) + (c["fees"] or 0)),
+                }
+                for c in cat_series
+            ]
+
+        data, _ = get_or_build(
+            request.user.id,
+            "top_categories",
+            ("finance",),
+            build,
+            params={"start": start, "end": end, "limit": limit},
         )
-        data = [
-            {
-                "id": c["category"],
-                "name": c["category__name"],
-                "amount": float((c["amount"] or 0) + (c["fees"] or 0)),
-            }
-            for c in cat_series
-        ]
         return Response({"categories": data})
 
 
-class RecurringTransactionViewSet(viewsets.ModelViewSet):
+class RecurringTransactionViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     serializer_class = RecurringTransactionSerializer
     permission_classes = [permissions.IsAuthenticated]
+    conditional_groups = ("finance",)
 
     def get_queryset(self):
-        return RecurringTransaction.objects.filter(user=self.request.user)
+        return RecurringTransaction.objects.filter(
+            user=self.request.user
+        ).select_related("account", "category")
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -1012,9 +1026,12 @@ class RecurringTransactionViewSet(viewsets.ModelViewSet):
 
         today = datetime.date.today()
         horizon = today + datetime.timedelta(days=days)
-        qs = RecurringTransaction.objects.filter(user=request.user)
+        qs = RecurringTransaction.objects.filter(
+            user=request.user
+        ).select_related("account", "category")
         created = 0
         for r in qs:
+            last_executed = r.last_executed
             next_date = r.date if not r.last_executed else r.last_executed
             if r.last_executed:
                 if r.frequency == RecurringTransaction.Frequency.DAILY:
@@ -1031,7 +1048,7 @@ class RecurringTransactionViewSet(viewsets.ModelViewSet):
                 and (not r.end_date or next_date <= r.end_date)
             ):
                 Transaction.objects.create(
-                    user=r.user,
+                    user=request.user,
                     account=r.account,
                     date=next_date,
                     amount=r.amount,
@@ -1049,7 +1066,8 @@ class RecurringTransactionViewSet(viewsets.ModelViewSet):
                     next_date = add_months(next_date, 1)
                 else:
                     next_date = next_date.replace(year=next_date.year + 1)
-            r.save()
+            if r.last_executed != last_executed:
+                r.save()
 
         # Create a notification for the user about materialized transactions
         plural_tx = 's' if created != 1 else ''
@@ -1132,7 +1150,7 @@ class RecurringTransactionViewSet(viewsets.ModelViewSet):
         return Response({"notified": created, "days": days})
 
 
-class TagViewSet(viewsets.ModelViewSet):
+class TagViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     serializer_class = TagSerializer
     permission_classes = [permissions.IsAuthenticated]
 
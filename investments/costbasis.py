@@ -0,0 +1,230 @@
+"""Lot-based cost basis for investment trades.
+
+A ``LotBook`` holds the open lots of one investment and applies trades one
+at a time, so a position can be rebuilt from its ``InvestmentTransaction``
+rows in a single pass or kept up to date as trades arrive.
+
+FIFO books keep running totals of bought quantity and cost, one entry per
+lot, plus how much of that total has been sold. A sale is a binary search
+for the lot it ends in, so it costs O(log n) however many lots it spans, and
+the cost of the units sold is the difference of two interpolated running
+totals. Average-cost books keep a single pooled quantity and cost.
+
+Stock splits are ignored, matching ``add_transaction``, which does not
+change the holding's quantity for them.
+"""
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Iterable, List, Tuple
+
+from django.db.models import Case, DecimalField, F, Q, Sum, Value, When
+
+ZERO = Decimal("0")
+_CENT = Decimal("0.01")
+
+FIFO = "fifo"
+AVERAGE = "average"
+METHODS = (FIFO, AVERAGE)
+
+# Fields read per trade, in the order ``LotBook.apply`` takes them.
+TRADE_FIELDS = ("transaction_type", "quantity", "price_per_unit", "total_amount", "fees")
+
+
+@dataclass
+class Lot:
+    """Units still held from one purchase."""
+
+    quantity: Decimal
+    cost: Decimal
+
+    @property
+    def unit_cost(self) -> Decimal:
+        return self.cost / self.quantity if self.quantity else ZERO
+
+
+@dataclass
+class LotBook:
+    """Open lots and realized results of one holding."""
+
+    method: str = FIFO
+    realized_gain: Decimal = ZERO
+    income: Decimal = ZERO
+    fees: Decimal = ZERO
+    # Units sold beyond what the book held; they are not matched to lots.
+    unmatched_quantity: Decimal = ZERO
+    trades: int = 0
+    # FIFO running totals per lot, and how far sales have consumed them.
+    _cum_quantity: List[Decimal] = field(default_factory=list, repr=False)
+    _cum_cost: List[Decimal] = field(default_factory=list, repr=False)
+    _sold_quantity: Decimal = ZERO
+    _sold_cost: Decimal = ZERO
+    # Average-cost pool.
+    _quantity: Decimal = ZERO
+    _cost: Decimal = ZERO
+
+    def __post_init__(self):
+        if self.method not in METHODS:
+            raise ValueError(f"method must be one of {', '.join(METHODS)}")
+
+    @property
+    def quantity(self) -> Decimal:
+        if self.method == AVERAGE:
+            return self._quantity
+        total = self._cum_quantity[-1] if self._cum_quantity else ZERO
+        return total - self._sold_quantity
+
+    @property
+    def cost_basis(self) -> Decimal:
+        if self.method == AVERAGE:
+            return self._cost
+        total = self._cum_cost[-1] if self._cum_cost else ZERO
+        return total - self._sold_cost
+
+    @property
+    def average_cost(self) -> Decimal:
+        quantity = self.quantity
+        return self.cost_basis / quantity if quantity else ZERO
+
+    def unrealized_gain(self, price) -> Decimal:
+        return Decimal(price) * self.quantity - self.cost_basis
+
+    def lots(self) -> List[Lot]:
+        """Open lots, oldest first (a single pooled lot for average cost)."""
+        if self.method == AVERAGE:
+            return [Lot(self._quantity, self._cost)] if self._quantity else []
+        start = bisect_right(self._cum_quantity, self._sold_quantity)
+        lots = []
+        prev_quantity, prev_cost = self._sold_quantity, self._sold_cost
+        for quantity, cost in zip(self._cum_quantity[start:], self._cum_cost[start:]):
+            if quantity > prev_quantity:
+                lots.append(Lot(quantity - prev_quantity, cost - prev_cost))
+            prev_quantity, prev_cost = quantity, cost
+        return lots
+
+    def buy(self, quantity, cost) -> None:
+        """Open a lot of ``quantity`` units that cost ``cost`` in total."""
+        if quantity <= 0:
+            return
+        if self.method == AVERAGE:
+            self._quantity += quantity
+            self._cost += cost
+            return
+        last_quantity = self._cum_quantity[-1] if self._cum_quantity else ZERO
+        last_cost = self._cum_cost[-1] if self._cum_cost else ZERO
+        self._cum_quantity.append(last_quantity + quantity)
+        self._cum_cost.append(last_cost + cost)
+
+    def sell(self, quantity, proceeds) -> Decimal:
+        """Close ``quantity`` units for net ``proceeds``; return the gain."""
+        if quantity <= 0:
+            return ZERO
+        held = self.quantity
+        if quantity > held:
+            self.unmatched_quantity += quantity - held
+            proceeds = proceeds * held / quantity
+            quantity = held
+        if not quantity:
+            return ZERO
+        if self.method == AVERAGE:
+            cost = self._cost * quantity / self._quantity
+            self._quantity -= quantity
+            self._cost -= cost
+        else:
+            target = self._sold_quantity + quantity
+            sold_cost = self._cost_at(target)
+            cost = sold_cost - self._sold_cost
+            self._sold_quantity, self._sold_cost = target, sold_cost
+        gain = proceeds - cost
+        self.realized_gain += gain
+        return gain
+
+    def _cost_at(self, quantity) -> Decimal:
+        """Running cost of the first ``quantity`` units bought."""
+        i = bisect_left(self._cum_quantity, quantity)
+        if i == len(self._cum_quantity):
+            return self._cum_cost[-1]
+        prev_quantity = self._cum_quantity[i - 1] if i else ZERO
+        prev_cost = self._cum_cost[i - 1] if i else ZERO
+        lot_quantity = self._cum_quantity[i] - prev_quantity
+        if not lot_quantity:
+            return prev_cost
+        lot_cost = self._cum_cost[i] - prev_cost
+        return prev_cost + lot_cost * (quantity - prev_quantity) / lot_quantity
+
+    def apply(self, transaction_type, quantity, price_per_unit, total_amount, fees) -> None:
+        """Apply one trade, given as the fields in ``TRADE_FIELDS``."""
+        self.trades += 1
+        if transaction_type == "BUY":
+            self.buy(quantity, quantity * price_per_unit + fees)
+            self.fees += fees
+        elif transaction_type == "SELL":
+            self.sell(quantity, quantity * price_per_unit - fees)
+            self.fees += fees
+        elif transaction_type == "BONUS":
+            self.buy(quantity, ZERO)
+        elif transaction_type in ("DIVIDEND", "INTEREST"):
+            self.income += total_amount
+        elif transaction_type == "FEE":
+            self.fees += total_amount
+            self.realized_gain -= total_amount
+
+    def summary(self, price=None) -> dict:
+        data = {
+            "method": self.method,
+            "quantity": self.quantity,
+            "cost_basis": self.cost_basis.quantize(_CENT),
+            "average_cost": self.average_cost.quantize(_CENT),
+            "realized_gain": self.realized_gain.quantize(_CENT),
+            "income": self.income.quantize(_CENT),
+            "fees": self.fees.quantize(_CENT),
+            "unmatched_quantity": self.unmatched_quantity,
+            "trades": self.trades,
+        }
+        if price is not None:
+            data["unrealized_gain"] = self.unrealized_gain(price).quantize(_CENT)
+        return data
+
+
+def replay(trades: Iterable[Tuple], method: str = FIFO, book: LotBook = None) -> LotBook:
+    """Apply ``trades`` (tuples of ``TRADE_FIELDS``) in order to a book."""
+    book = book or LotBook(method=method)
+    apply = book.apply
+    for trade in trades:
+        apply(*trade)
+    return book
+
+
+def replay_investment(investment, method: str = FIFO, chunk_size: int = 2000) -> LotBook:
+    """Rebuild an investment's lots from its transactions in one pass.
+
+    The units held before the first recorded trade (the initial purchase
+    entered on the investment itself) open the book as one lot at the
+    recorded purchase price. Trades are then streamed oldest first in
+    chunks, so memory stays flat however long the history is.
+    """
+    trades = investment.investment_transactions.all()
+    signed = Case(
+        When(transaction_type__in=["BUY", "BONUS"], then=F("quantity")),
+        When(transaction_type="SELL", then=-F("quantity")),
+        default=Value(ZERO),
+        output_field=DecimalField(max_digits=20, decimal_places=4),
+    )
+    totals = trades.aggregate(
+        net=Sum(signed),
+        buy_fees=Sum("fees", filter=Q(transaction_type="BUY")),
+    )
+    opening = investment.quantity - (totals["net"] or ZERO)
+    opening_fees = max(investment.purchase_fees - (totals["buy_fees"] or ZERO), ZERO)
+
+    book = LotBook(method=method)
+    if opening > 0:
+        book.buy(opening, opening * investment.purchase_price + opening_fees)
+        book.fees += opening_fees
+    rows = (
+        trades.order_by("date", "created_at", "id")
+        .values_list(*TRADE_FIELDS)
+        .iterator(chunk_size=chunk_size)
+    )
+    return replay(rows, book=book)
+
@@ -0,0 +1,87 @@
+import random
+import time
+from collections import deque
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from investments import costbasis
+
+
+def naive_fifo(trades):
+    """Reference FIFO that walks lots one by one; returns (realized, cost)."""
+    lots = deque()
+    realized = Decimal("0")
+    for kind, quantity, price, _total, fees in trades:
+        if kind == "BUY":
+            lots.append([quantity, (quantity * price + fees) / quantity])
+        elif kind == "SELL":
+            remaining = quantity
+            cost = Decimal("0")
+            while remaining and lots:
+                lot = lots[0]
+                take = min(lot[0], remaining)
+                cost += take * lot[1]
+                lot[0] -= take
+                remaining -= take
+                if not lot[0]:
+                    lots.popleft()
+            realized += quantity * price - fees - cost
+    return realized, sum(q * unit for q, unit in lots)
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark replaying synthetic trade histories through the lot-based "
+        "cost basis engine and check FIFO against a lot-walking reference."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--trades", type=int, default=100000, help="Trades (default 100000)")
+        parser.add_argument("--seed", type=int, default=1, help="Random seed")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        count = options["trades"]
+
+        # Mostly small buys with occasional large sells that span many lots.
+        trades = []
+        held = Decimal("0")
+        for _ in range(count):
+            price = Decimal(rng.randint(1000, 5000)) / 100
+            if held > 100 and rng.random() < 0.2:
+                quantity = min(held, Decimal(rng.randint(1, 400)))
+                held -= quantity
+                trades.append(("SELL", quantity, price, quantity * price, Decimal("1.00")))
+            else:
+                quantity = Decimal(rng.randint(1, 100))
+                held += quantity
+                trades.append(("BUY", quantity, price, quantity * price, Decimal("0.50")))
+
+        timings = {}
+        books = {}
+        for method in costbasis.METHODS:
+            start = time.perf_counter()
+            books[method] = costbasis.replay(trades, method)
+            timings[method] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        realized, cost = naive_fifo(trades)
+        naive = time.perf_counter() - start
+
+        cent = Decimal("0.01")
+        fifo = books[costbasis.FIFO]
+        if (
+            fifo.realized_gain.quantize(cent) != realized.quantize(cent)
+            or fifo.cost_basis.quantize(cent) != cost.quantize(cent)
+        ):
+            raise CommandError("Lot engine and reference FIFO disagree.")
+
+        self.stdout.write(f"{count} trades, {len(fifo.lots())} open lots, {fifo.quantity} units held")
+        for method, seconds in timings.items():
+            self.stdout.write(
+                f"{method}: {seconds * 1000:.1f} ms ({count / seconds:,.0f} trades/sec), "
+                f"realized {books[method].realized_gain.quantize(cent)}"
+            )
+        self.stdout.write(f"reference fifo: {naive * 1000:.1f} ms")
+        self.stdout.write(self.style.SUCCESS("FIFO engine matches the reference."))
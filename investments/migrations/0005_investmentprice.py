@@ -0,0 +1,29 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investments', '0004_update_investmenttransaction_related_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InvestmentPrice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('price', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('investment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='prices', to='investments.investment')),
+            ],
+            options={
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='investmentprice',
+            constraint=models.UniqueConstraint(fields=('investment', 'date'), name='unique_investment_price_date'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("investments", "0006_portfoliovaluation"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="investmenttransaction",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True, default=django.utils.timezone.now
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name="investment",
+            index=models.Index(
+                fields=["user", "updated_at"], name="inv_user_updated_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="investmenttransaction",
+            index=models.Index(fields=["updated_at"], name="inv_trade_updated_idx"),
+        ),
+    ]
@@ -149,6 +149,9 @@ class Investment(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'updated_at'], name='inv_user_updated_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.get_investment_type_display()})"
@@ -242,72 +245,81 @@ class InvestmentTransaction(models.Model):
     fees = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     notes = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-date', '-created_at']
+        indexes = [
+            models.Index(fields=['updated_at'], name='inv_trade_updated_idx'),
+        ]
 
     def __str__(self):
         return f"{self.investment.name} - {self.get_transaction_type_display()} - {self.total_amount}"
 
 
-# Signal to sync investments to assets
+class InvestmentPrice(models.Model):
+    """Price of an investment on a given day"""
+
+    investment = models.ForeignKey(
+        Investment,
+        on_delete=models.CASCADE,
+        related_name="prices"
+    )
+    date = models.DateField()
+    price = models.DecimalField(max_digits=14, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-date']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['investment', 'date'],
+                name='unique_investment_price_date',
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.investment.name} - {self.date} - {self.price}"
+
+
+class PortfolioValuation(models.Model):
+    """Daily rollup of a user's portfolio value, built from price history"""
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="portfolio_valuations"
+    )
+    date = models.DateField()
+    market_value = models.DecimalField(max_digits=16, decimal_places=2)
+    cost_basis = models.DecimalField(max_digits=16, decimal_places=2)
+    holdings = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['date']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'date'],
+                name='unique_portfolio_valuation_date',
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.user} - {self.date} - {self.market_value}"
+
+
+# Signals to sync investments to assets, batched per transaction
 @receiver(post_save, sender=Investment)
 def sync_investment_to_asset(sender, instance, created, **kwargs):
-    """Automatically create/update corresponding asset when investment changes"""
-    from wealth.models import Asset
-    
-    if instance.status != 'ACTIVE':
-        # If investment is sold/matured, remove the asset
-        Asset.objects.filter(
-            user=instance.user,
-            source_type='INVESTMENT',
-            source_id=instance.id
-        ).delete()
-        return
-    
-    # Map investment type to asset type
-    type_mapping = {
-        'STOCK': 'STOCK',
-        'BOND': 'BOND',
-        'MMF': 'MMF',
-        'MUTUAL_FUND': 'MMF',
-        'ETF': 'STOCK',
-        'TREASURY_BILL': 'BOND',
-        'TREASURY_BOND': 'BOND',
-        'SACCO_SHARES': 'OTHER',
-        'UNIT_TRUST': 'MMF',
-        'REAL_ESTATE': 'LAND',
-        'CRYPTO': 'OTHER',
-        'PENSION': 'PENSION',
-        'INSURANCE_ENDOWMENT': 'INSURANCE',
-        'INSURANCE_WHOLE_LIFE': 'INSURANCE',
-        'INSURANCE_EDUCATION': 'INSURANCE',
-        'INSURANCE_INVESTMENT': 'INSURANCE',
-        'OTHER': 'OTHER',
-    }
-    
-    asset_type = type_mapping.get(instance.investment_type, 'OTHER')
-    
-    # Create or update the asset
-    Asset.objects.update_or_create(
-        user=instance.user,
-        source_type='INVESTMENT',
-        source_id=instance.id,
-        defaults={
-            'name': f"{instance.name}",
-            'asset_type': asset_type,
-            'current_value': instance.current_value,
-            'notes': f"Auto-synced from Investments. Platform: {instance.platform}"
-        }
-    )
+    """Queue the corresponding asset for sync when the investment changes"""
+    from .utils import mark_investment_dirty
+    mark_investment_dirty(instance.id)
 
 
 @receiver(post_delete, sender=Investment)
 def delete_investment_asset(sender, instance, **kwargs):
-    """Remove corresponding asset when investment is deleted"""
-    from wealth.models import Asset
-    Asset.objects.filter(
-        user=instance.user,
-        source_type='INVESTMENT',
-        source_id=instance.id
-    ).delete()
+    """Queue removal of the corresponding asset when the investment is deleted"""
+    from .utils import mark_investment_dirty
+    mark_investment_dirty(instance.id)
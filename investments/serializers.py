@@ -7,9 +7,10 @@ class InvestmentTransactionSerializer(serializers.ModelSerializer):
         model = InvestmentTransaction
         fields = [
             'id', 'transaction_type', 'date', 'quantity',
-            'price_per_unit', 'total_amount', 'fees', 'notes', 'created_at'
+            'price_per_unit', 'total_amount', 'fees', 'notes', 'created_at',
+            'updated_at'
         ]
-        read_only_fields = ['id', 'created_at']
+        read_only_fields = ['id', 'created_at', 'updated_at']
 
 
 class InvestmentSerializer(serializers.ModelSerializer):
@@ -57,6 +58,16 @@ class InvestmentSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at', 'last_updated']
 
 
+class InvestmentListSerializer(InvestmentSerializer):
+    """Investment without its nested trade history, for portfolio lists"""
+    transactions = None
+
+    class Meta(InvestmentSerializer.Meta):
+        fields = [
+            f for f in InvestmentSerializer.Meta.fields if f != 'transactions'
+        ]
+
+
 class InvestmentSummarySerializer(serializers.Serializer):
     """Summary statistics for all investments"""
     total_invested = serializers.DecimalField(max_digits=16, decimal_places=2)
@@ -66,3 +77,19 @@ class InvestmentSummarySerializer(serializers.Serializer):
     total_annual_income = serializers.DecimalField(max_digits=16, decimal_places=2)
     investment_count = serializers.IntegerField()
     by_type = serializers.DictField()
+
+
+class PriceQuoteSerializer(serializers.Serializer):
+    """One price for a holding, identified by id or symbol"""
+    id = serializers.IntegerField(required=False)
+    symbol = serializers.CharField(required=False, allow_blank=False, max_length=50)
+    price = serializers.DecimalField(max_digits=14, decimal_places=2, min_value=0)
+    date = serializers.DateField(required=False)
+
+    def validate_symbol(self, value):
+        return value.strip()
+
+    def validate(self, attrs):
+        if attrs.get('id') is None and not attrs.get('symbol'):
+            raise serializers.ValidationError('Either id or symbol is required.')
+        return attrs
@@ -1,3 +1,554 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
 from django.test import TestCase
+from django.utils import timezone
+
+from wealth.models import Asset
+from .models import Investment, InvestmentPrice, InvestmentTransaction, PortfolioValuation
+from .costbasis import AVERAGE, replay
+from .utils import suspend_asset_sync
+from .valuation import build_valuations
+
+User = get_user_model()
+
+
+class InvestmentAssetSyncTestCase(TestCase):
+    """Test the batched investment to asset sync."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser', password='testpass123'
+        )
+
+    def make_investments(self, count):
+        return [
+            Investment.objects.create(
+                user=self.user,
+                name=f'Holding {n}',
+                investment_type='STOCK',
+                purchase_date=date(2024, 1, 1),
+                purchase_price=Decimal('10.00'),
+                quantity=Decimal('3'),
+                current_price=Decimal('10.00') + n,
+            )
+            for n in range(count)
+        ]
+
+    def assets(self):
+        return {
+            a.source_id: a
+            for a in Asset.objects.filter(user=self.user, source_type='INVESTMENT')
+        }
+
+    def test_saves_flush_once_on_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            investments = self.make_investments(50)
+            for investment in investments:
+                investment.current_price += 1
+                investment.save()
+        self.assertEqual(Asset.objects.count(), 0)
+
+        # Investments, existing assets and one bulk insert.
+        with self.assertNumQueries(3):
+            for callback in callbacks:
+                callback()
+        assets = self.assets()
+        self.assertEqual(len(assets), 50)
+        self.assertEqual(assets[investments[5].id].current_value, Decimal('48.00'))
+        self.assertEqual(assets[investments[5].id].asset_type, 'STOCK')
+
+    def test_unchanged_rows_are_not_written(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            investments = self.make_investments(3)
+        with self.captureOnCommitCallbacks() as callbacks:
+            investments[0].save()
+            investments[1].current_price = Decimal('99.00')
+            investments[1].save()
+        with self.assertNumQueries(3):
+            # Investments, existing assets and one bulk update.
+            for callback in callbacks:
+                callback()
+        self.assertEqual(self.assets()[investments[1].id].current_value, Decimal('297.00'))
+
+    def test_sold_and_deleted_investments_lose_their_asset(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            sold, deleted, kept = self.make_investments(3)
+        with self.captureOnCommitCallbacks(execute=True):
+            sold.status = 'SOLD'
+            sold.save()
+            deleted.delete()
+        self.assertEqual(set(self.assets()), {kept.id})
+
+    def test_suspend_reconciles_bulk_updates(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            investments = self.make_investments(4)
+        with self.captureOnCommitCallbacks(execute=True):
+            with suspend_asset_sync() as dirty:
+                for investment in investments:
+                    investment.current_price = Decimal('1.00')
+                Investment.objects.bulk_update(investments, ['current_price'])
+                dirty.update(i.id for i in investments)
+                self.assertEqual(
+                    self.assets()[investments[0].id].current_value, Decimal('30.00')
+                )
+        self.assertEqual(
+            {a.current_value for a in self.assets().values()}, {Decimal('3.00')}
+        )
+
+    def test_rolled_back_save_does_not_block_later_syncs(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            investment, = self.make_investments(1)
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                investment.save()
+                transaction.set_rollback(True)
+            investment.current_price = Decimal('20.00')
+            investment.save()
+        self.assertEqual(
+            self.assets()[investment.id].current_value, Decimal('60.00')
+        )
+
+
+class BulkPriceUpdateTestCase(TestCase):
+    """Test the bulk price endpoint."""
+
+    url = '/api/investments/investments/prices/'
+
+    def setUp(self):
+        from rest_framework.test import APIClient
+
+        self.user = User.objects.create_user(
+            username='testuser', password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.holdings = [
+            Investment.objects.create(
+                user=self.user,
+                name=f'Holding {n}',
+                symbol=f'SYM{n}',
+                investment_type='STOCK',
+                purchase_date=date(2024, 1, 1),
+                purchase_price=Decimal('10.00'),
+                quantity=Decimal('2'),
+                current_price=Decimal('10.00'),
+            )
+            for n in range(30)
+        ]
+
+    def test_json_prices_use_constant_queries(self):
+        payload = {
+            'date': '2024-06-03',
+            'prices': [
+                {'symbol': f'SYM{n}', 'price': f'{20 + n}.50'} for n in range(30)
+            ] + [{'symbol': 'NOPE', 'price': '1.00'}],
+        }
+        # Holdings, latest stored price dates, bulk price update and history
+        # upsert (in a savepoint), valuation invalidation, then the on-commit
+        # asset sync: holdings, assets and one insert.
+        with self.assertNumQueries(10):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(self.url, payload, format='json')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['updated'], 30)
+        self.assertEqual(data['unmatched'], [{'symbol': 'NOPE', 'price': '1.00'}])
+
+        holding = Investment.objects.get(id=self.holdings[3].id)
+        self.assertEqual(holding.current_price, Decimal('23.50'))
+        self.assertEqual(
+            list(holding.prices.values_list('date', 'price')),
+            [(date(2024, 6, 3), Decimal('23.50'))],
+        )
+        asset = Asset.objects.get(source_type='INVESTMENT', source_id=holding.id)
+        self.assertEqual(asset.current_value, Decimal('47.00'))
+
+    def test_csv_upload(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        csv_text = (
+            'symbol,price,date\n'
+            'SYM1,11.00,2024-06-01\n'
+            'SYM1,12.00,2024-06-02\n'
+            'SYM2,13.00,\n'
+        )
+        upload = SimpleUploadedFile('prices.csv', csv_text.encode(), 'text/csv')
+        response = self.client.post(self.url, {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['updated'], 2)
+        holding = Investment.objects.get(id=self.holdings[1].id)
+        self.assertEqual(holding.current_price, Decimal('12.00'))
+        self.assertEqual(holding.prices.count(), 2)
+
+    def test_backfill_keeps_current_price(self):
+        holding = self.holdings[0]
+        self.client.post(self.url, [{'id': holding.id, 'price': '15.00'}], format='json')
+        holding.refresh_from_db()
+        last_updated = holding.last_updated
+
+        response = self.client.post(self.url, {
+            'date': '2024-05-31',
+            'prices': [{'id': holding.id, 'price': '9.00'}],
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        holding.refresh_from_db()
+        self.assertEqual(holding.current_price, Decimal('15.00'))
+        self.assertEqual(holding.last_updated, last_updated)
+        self.assertEqual(
+            holding.prices.get(date=date(2024, 5, 31)).price, Decimal('9.00')
+        )
+
+    def test_invalid_rows_are_rejected(self):
+        response = self.client.post(
+            self.url, [{'price': '1.00'}, {'symbol': 'SYM1', 'price': '-1'}], format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class PortfolioValuationTestCase(TestCase):
+    """Test the daily valuation rollup and the series endpoints."""
+
+    def setUp(self):
+        from rest_framework.test import APIClient
+
+        self.user = User.objects.create_user(
+            username='testuser', password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.today = timezone.localdate()
+        self.start = self.today - timedelta(days=10)
+        self.holding = Investment.objects.create(
+            user=self.user,
+            name='Safaricom',
+            symbol='SCOM',
+            investment_type='STOCK',
+            purchase_date=self.start,
+            purchase_price=Decimal('10.00'),
+            quantity=Decimal('15'),
+            current_price=Decimal('14.00'),
+        )
+        # 10 units bought at the start, 5 more on day 4.
+        InvestmentTransaction.objects.create(
+            investment=self.holding,
+            transaction_type='BUY',
+            date=self.start + timedelta(days=4),
+            quantity=Decimal('5'),
+            price_per_unit=Decimal('10.00'),
+            total_amount=Decimal('50.00'),
+        )
+        InvestmentPrice.objects.create(
+            investment=self.holding, date=self.start + timedelta(days=2), price=Decimal('12.00')
+        )
+
+    def test_build_walks_quantities_and_prices(self):
+        rows = {row.date: row for row in build_valuations(self.user)}
+        self.assertEqual(len(rows), 11)
+        self.assertEqual(rows[self.start].market_value, Decimal('100.00'))
+        self.assertEqual(rows[self.start + timedelta(days=2)].market_value, Decimal('120.00'))
+        self.assertEqual(rows[self.start + timedelta(days=4)].market_value, Decimal('180.00'))
+        self.assertEqual(rows[self.start + timedelta(days=4)].cost_basis, Decimal('150.00'))
+        self.assertEqual(rows[self.today].market_value, Decimal('210.00'))
+
+    def test_series_is_served_from_the_rollup(self):
+        url = '/api/investments/investments/portfolio_series/'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 11)
+        self.assertEqual(PortfolioValuation.objects.filter(user=self.user).count(), 11)
+
+        # Later reads only rebuild today.
+        created = PortfolioValuation.objects.get(user=self.user, date=self.start).updated_at
+        response = self.client.get(url, {'start': str(self.today - timedelta(days=1))})
+        self.assertEqual(
+            [p['market_value'] for p in response.json()['series']], [180.0, 210.0]
+        )
+        self.assertEqual(
+            PortfolioValuation.objects.get(user=self.user, date=self.start).updated_at, created
+        )
+
+    def test_price_updates_invalidate_later_days(self):
+        url = '/api/investments/investments/portfolio_series/'
+        self.client.get(url)
+        self.client.post(
+            '/api/investments/investments/prices/',
+            {'date': str(self.start + timedelta(days=6)), 'prices': [{'symbol': 'SCOM', 'price': '20.00'}]},
+            format='json',
+        )
+        self.assertFalse(
+            PortfolioValuation.objects.filter(
+                user=self.user, date__gte=self.start + timedelta(days=6)
+            ).exists()
+        )
+        series = {p['date']: p for p in self.client.get(url).json()['series']}
+        self.assertEqual(series[str(self.start + timedelta(days=5))]['market_value'], 180.0)
+        self.assertEqual(series[str(self.start + timedelta(days=6))]['market_value'], 300.0)
+
+    def test_finance_cash_flows_invalidate_later_days(self):
+        from finance.models import Account
+
+        url = '/api/investments/investments/portfolio_series/'
+        self.client.get(url)
+        account = Account.objects.create(user=self.user, name='Bank')
+        response = self.client.post('/api/finance/transactions/', {
+            'account': account.id,
+            'date': str(self.start + timedelta(days=6)),
+            'amount': '70.00',
+            'kind': 'EXPENSE',
+            'investment': self.holding.id,
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        rows = PortfolioValuation.objects.filter(user=self.user)
+        self.assertEqual(rows.count(), 6)
+        self.assertFalse(rows.filter(date__gte=self.start + timedelta(days=6)).exists())
+        series = {p['date']: p for p in self.client.get(url).json()['series']}
+        self.assertEqual(series[str(self.today)]['market_value'], 280.0)
+
+    def test_invalid_dates_are_rejected(self):
+        response = self.client.get(
+            '/api/investments/investments/portfolio_series/', {'start': 'soon'}
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_holding_performance(self):
+        response = self.client.get(
+            f'/api/investments/investments/{self.holding.id}/performance/'
+        )
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(len(data['prices']), 1)
+        self.assertIsNone(data['returns']['1m'])
+        self.assertEqual(data['current_value'], 210.0)
+
+
+class InvestmentSummaryTestCase(TestCase):
+    """Test the SQL-side summary."""
+
+    def setUp(self):
+        from rest_framework.test import APIClient
+
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='testuser', password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        common = {'user': self.user, 'purchase_date': date(2024, 1, 1)}
+        self.investments = [
+            Investment.objects.create(
+                name='Stock', investment_type='STOCK', purchase_price=Decimal('10.10'),
+                quantity=Decimal('3.3333'), purchase_fees=Decimal('1.25'),
+                current_price=Decimal('12.35'), **common,
+            ),
+            Investment.objects.create(
+                name='Bond', investment_type='TBOND', purchase_price=Decimal('98.50'),
+                quantity=Decimal('1000'), face_value=Decimal('100000.00'),
+                interest_rate=Decimal('13.250'), tax_rate=Decimal('15.00'),
+                current_price=Decimal('99.00'), **common,
+            ),
+            Investment.objects.create(
+                name='Bill', investment_type='TBILL', purchase_price=Decimal('95.00'),
+                quantity=Decimal('500'), interest_rate=Decimal('10.000'),
+                current_price=Decimal('96.00'), **common,
+            ),
+            Investment.objects.create(
+                name='SACCO', investment_type='SACCO', purchase_price=Decimal('50000.00'),
+                dividend_rate=Decimal('12.00'), current_price=Decimal('55000.00'), **common,
+            ),
+            Investment.objects.create(
+                name='Flat', investment_type='REAL_ESTATE', purchase_price=Decimal('4000000.00'),
+                monthly_rent=Decimal('35000.00'), monthly_costs=Decimal('5000.00'),
+                property_tax_annual=Decimal('12000.00'), current_price=Decimal('4500000.00'),
+                **common,
+            ),
+        ]
+        Investment.objects.create(
+            name='Old', investment_type='STOCK', purchase_price=Decimal('1.00'),
+            current_price=Decimal('1.00'), status='SOLD', **common,
+        )
+
+    def test_summary_matches_model_properties_in_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/investments/investments/summary/')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        cent = Decimal('0.01')
+        self.investments = list(Investment.objects.filter(status='ACTIVE'))
+        invested = sum(inv.total_invested.quantize(cent) for inv in self.investments)
+        income = sum(
+            Decimal(str(inv.annual_income)).quantize(cent) for inv in self.investments
+        )
+        self.assertEqual(data['investment_count'], 5)
+        self.assertEqual(Decimal(str(data['total_invested'])), invested)
+        self.assertEqual(Decimal(str(data['total_annual_income'])), income)
+        bond = data['by_type']['Treasury Bond']
+        self.assertEqual(bond['count'], 1)
+        self.assertEqual(bond['annual_income'], 11262.5)
+        self.assertEqual(data['by_type']['Treasury Bill']['annual_income'], 50.0)
+        self.assertEqual(data['by_type']['SACCO']['annual_income'], 6600.0)
+        self.assertEqual(data['by_type']['Real Estate']['annual_income'], 348000.0)
+        self.assertEqual(data['by_type']['Stock/Shares']['gain_loss'], 6.25)
+
+    def test_whole_number_rates_are_not_truncated(self):
+        Investment.objects.filter(user=self.user).delete()
+        Investment.objects.create(
+            user=self.user, name='MMF', investment_type='MMF', purchase_date=date(2024, 1, 1),
+            purchase_price=Decimal('1'), interest_rate=Decimal('7'), current_price=Decimal('3'),
+        )
+        Investment.objects.create(
+            user=self.user, name='Bond', investment_type='BOND', purchase_date=date(2024, 1, 1),
+            purchase_price=Decimal('1'), quantity=Decimal('3'), interest_rate=Decimal('7'),
+            tax_rate=Decimal('10'), current_price=Decimal('1'),
+        )
+        data = self.client.get('/api/investments/investments/summary/').json()
+        self.assertEqual(data['by_type']['Money Market Fund']['annual_income'], 0.21)
+        self.assertEqual(data['by_type']['Bond']['annual_income'], 0.19)
+
+
+class InvestmentListTestCase(TestCase):
+    """Test the lean list and the paginated trade history."""
+
+    url = '/api/investments/investments/'
+
+    def setUp(self):
+        from rest_framework.test import APIClient
+
+        self.user = User.objects.create_user(
+            username='testuser', password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.holdings = []
+        for n in range(5):
+            holding = Investment.objects.create(
+                user=self.user,
+                name=f'Holding {n}',
+                investment_type='STOCK',
+                purchase_date=date(2024, 1, 1),
+                purchase_price=Decimal('10.00'),
+                current_price=Decimal('11.00'),
+            )
+            InvestmentTransaction.objects.bulk_create([
+                InvestmentTransaction(
+                    investment=holding,
+                    transaction_type='DIVIDEND',
+                    date=date(2024, 1, 1) + timedelta(days=day),
+                    total_amount=Decimal('1.00'),
+                )
+                for day in range(60)
+            ])
+            self.holdings.append(holding)
+
+    def test_list_omits_trade_history(self):
+        # The conditional GET validator, then the holdings.
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 5)
+        self.assertNotIn('transactions', response.json()[0])
+        self.assertEqual(response.json()[0]['current_value'], Decimal('11.00'))
+
+    def test_nested_history_is_prefetched(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url, {'include': 'transactions'})
+        self.assertEqual(len(response.json()[0]['transactions']), 60)
+
+    def test_trade_history_is_paginated(self):
+        url = f'{self.url}{self.holdings[0].id}/transactions/'
+        data = self.client.get(url).json()
+        self.assertEqual(data['count'], 60)
+        self.assertEqual(len(data['results']), 50)
+        self.assertEqual(data['results'][0]['date'], '2024-02-29')
+
+        data = self.client.get(url, {'limit': 20, 'offset': 50}).json()
+        self.assertEqual(len(data['results']), 10)
+        self.assertIsNone(data['next'])
+
+
+class CostBasisTestCase(TestCase):
+    """Test the lot-based cost basis engine."""
+
+    def setUp(self):
+        from rest_framework.test import APIClient
+
+        self.user = User.objects.create_user(
+            username='testuser', password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def trade(self, kind, quantity, price, fees='0'):
+        quantity, price = Decimal(quantity), Decimal(price)
+        return (kind, quantity, price, quantity * price, Decimal(fees))
+
+    def test_fifo_sale_spans_lots(self):
+        book = replay([
+            self.trade('BUY', '10', '10'),
+            self.trade('BUY', '10', '20'),
+            self.trade('BUY', '10', '30'),
+            self.trade('SELL', '15', '40', fees='5'),
+        ])
+        # 10 @ 10 and 5 @ 20 sold for 600 - 5.
+        self.assertEqual(book.realized_gain, Decimal('395'))
+        self.assertEqual(book.quantity, Decimal('15'))
+        self.assertEqual(book.cost_basis, Decimal('400'))
+        self.assertEqual(
+            [(lot.quantity, lot.cost) for lot in book.lots()],
+            [(Decimal('5'), Decimal('100')), (Decimal('10'), Decimal('300'))],
+        )
+        self.assertEqual(book.unrealized_gain(Decimal('30')), Decimal('50'))
+
+    def test_average_cost_pools_lots(self):
+        book = replay([
+            self.trade('BUY', '10', '10'),
+            self.trade('BUY', '10', '20'),
+            self.trade('SELL', '5', '30'),
+            self.trade('BONUS', '5', '0'),
+        ], method=AVERAGE)
+        self.assertEqual(book.realized_gain, Decimal('75'))
+        self.assertEqual(book.quantity, Decimal('20'))
+        self.assertEqual(book.cost_basis, Decimal('225'))
+
+    def test_oversold_units_are_unmatched(self):
+        book = replay([self.trade('BUY', '2', '10'), self.trade('SELL', '3', '12')])
+        self.assertEqual(book.unmatched_quantity, Decimal('1'))
+        self.assertEqual(book.realized_gain, Decimal('4'))
+        self.assertEqual(book.quantity, Decimal('0'))
+
+    def test_replay_investment_endpoint(self):
+        holding = Investment.objects.create(
+            user=self.user,
+            name='Safaricom',
+            investment_type='STOCK',
+            purchase_date=date(2024, 1, 1),
+            purchase_price=Decimal('10.00'),
+            quantity=Decimal('15'),
+            current_price=Decimal('25.00'),
+        )
+        for kind, day, quantity, price in [
+            ('BUY', 2, '10', '20.00'),
+            ('SELL', 3, '5', '30.00'),
+            ('DIVIDEND', 4, '0', '0'),
+        ]:
+            InvestmentTransaction.objects.create(
+                investment=holding, transaction_type=kind, date=date(2024, 1, day),
+                quantity=Decimal(quantity), price_per_unit=Decimal(price),
+                total_amount=Decimal(quantity) * Decimal(price) or Decimal('7.50'),
+            )
+
+        url = f'/api/investments/investments/{holding.id}/cost_basis/'
+        data = self.client.get(url).json()
+        # Opening lot of 10 @ 10, so the sale closes 5 @ 10.
+        self.assertEqual(Decimal(data['realized_gain']), Decimal('100.00'))
+        self.assertEqual(Decimal(data['cost_basis']), Decimal('250.00'))
+        self.assertEqual(Decimal(data['unrealized_gain']), Decimal('125.00'))
+        self.assertEqual(Decimal(data['income']), Decimal('7.50'))
+        self.assertEqual(len(data['lots']), 2)
 
-# Create your tests here.
+        data = self.client.get(url, {'method': 'average'}).json()
+        self.assertEqual(Decimal(data['realized_gain']), Decimal('75.00'))
+        self.assertEqual(self.client.get(url, {'method': 'lifo'}).status_code, 400)
@@ -0,0 +1,480 @@
+"""Batched synchronisation of investments into wealth assets.
+
+Saving or deleting an ``Investment`` only marks its id dirty. Dirty ids are
+collected per thread and synced once when the surrounding transaction
+commits (immediately in autocommit mode), so a request or job that saves
+hundreds of holdings issues a handful of bulk queries instead of an upsert
+per save.
+"""
+import threading
+from contextlib import contextmanager
+from decimal import Decimal
+from typing import Iterable, Set
+
+from django.db import transaction
+from django.db.models import (
+    Case, Count, DecimalField, ExpressionWrapper, F, Func, Max, Q, Sum, Value, When,
+)
+from django.db.models.functions import Coalesce, Greatest, NullIf
+from django.db.models.lookups import LessThanOrEqual
+from django.utils import timezone
+
+from backend.cache import bump, bump_owner
+
+ASSET_TYPE_MAP = {
+    'STOCK': 'STOCK',
+    'BOND': 'BOND',
+    'MMF': 'MMF',
+    'MUTUAL_FUND': 'MMF',
+    'ETF': 'STOCK',
+    'TREASURY_BILL': 'BOND',
+    'TREASURY_BOND': 'BOND',
+    'SACCO_SHARES': 'OTHER',
+    'UNIT_TRUST': 'MMF',
+    'REAL_ESTATE': 'LAND',
+    'CRYPTO': 'OTHER',
+    'PENSION': 'PENSION',
+    'INSURANCE_ENDOWMENT': 'INSURANCE',
+    'INSURANCE_WHOLE_LIFE': 'INSURANCE',
+    'INSURANCE_EDUCATION': 'INSURANCE',
+    'INSURANCE_INVESTMENT': 'INSURANCE',
+    'OTHER': 'OTHER',
+}
+
+_CENT = Decimal("0.01")
+
+_MONEY = DecimalField(max_digits=24, decimal_places=6)
+
+_state = threading.local()
+
+
+def _pending() -> Set[int]:
+    if not hasattr(_state, "pending"):
+        _state.pending = set()
+        _state.suspended = []
+    return _state.pending
+
+
+def mark_investment_dirty(investment_id) -> None:
+    """Queue an investment for asset sync when the transaction commits."""
+    pending = _pending()
+    if _state.suspended:
+        _state.suspended[-1].add(investment_id)
+        return
+    pending.add(investment_id)
+    # Registered on every call because callbacks of a rolled-back block are
+    # dropped. The first flush to run syncs everything queued and later
+    # ones find the set empty; ids left over from a rollback are re-read
+    # from the database by the next flush.
+    transaction.on_commit(flush_investment_sync)
+
+
+def flush_investment_sync() -> None:
+    """Sync every queued investment now."""
+    pending = _pending()
+    ids = set(pending)
+    pending.clear()
+    if ids:
+        sync_investments_to_assets(ids)
+
+
+@contextmanager
+def suspend_asset_sync():
+    """Hold back asset sync during bulk work and reconcile once afterwards.
+
+    Saves inside the block are collected instead of queued. The yielded set
+    can be extended with ids changed by ``bulk_update`` or ``update()``,
+    which fire no signals. On exit every collected id is queued for the
+    usual on-commit flush.
+    """
+    _pending()
+    dirty: Set[int] = set()
+    _state.suspended.append(dirty)
+    try:
+        yield dirty
+    finally:
+        _state.suspended.pop()
+        for investment_id in dirty:
+            mark_investment_dirty(investment_id)
+
+
+def sync_investments_to_assets(investment_ids: Iterable[int]) -> None:
+    """Bring the assets of the given investments in line with them.
+
+    Active investments get their asset created or updated; sold, matured
+    and deleted ones lose it. Rows that already match are not written.
+    """
+    from wealth.models import Asset
+    from .models import Investment
+
+    ids = set(investment_ids)
+    investments = {
+        inv.id: inv
+        for inv in Investment.objects.filter(id__in=ids).only(
+            'id', 'user_id', 'name', 'investment_type', 'status',
+            'current_price', 'quantity', 'platform',
+        )
+    }
+    active = {i: inv for i, inv in investments.items() if inv.status == 'ACTIVE'}
+
+    stale = ids - set(active)
+    if stale:
+        Asset.objects.filter(
+            source_type=Asset.SourceType.INVESTMENT, source_id__in=stale
+        ).delete()
+    if not active:
+        return
+
+    existing = {
+        (asset.user_id, asset.source_id): asset
+        for asset in Asset.objects.filter(
+            source_type=Asset.SourceType.INVESTMENT, source_id__in=active
+        )
+    }
+    fields = ['name', 'asset_type', 'current_value', 'notes']
+    to_create = []
+    to_update = []
+    for investment_id, inv in active.items():
+        values = {
+            'name': f"{inv.name}",
+            'asset_type': ASSET_TYPE_MAP.get(inv.investment_type, 'OTHER'),
+            'current_value': inv.current_value.quantize(_CENT),
+            'notes': f"Auto-synced from Investments. Platform: {inv.platform}",
+        }
+        asset = existing.get((inv.user_id, investment_id))
+        if asset is None:
+            to_create.append(Asset(
+                user_id=inv.user_id,
+                source_type=Asset.SourceType.INVESTMENT,
+                source_id=investment_id,
+                **values,
+            ))
+        elif any(getattr(asset, f) != v for f, v in values.items()):
+            for f, v in values.items():
+                setattr(asset, f, v)
+            to_update.append(asset)
+
+    if to_create:
+        Asset.objects.bulk_create(to_create)
+    if to_update:
+        now = timezone.now()
+        for asset in to_update:
+            asset.updated_at = now
+        Asset.objects.bulk_update(to_update, fields + ['updated_at'])
+    # Bulk writes send no signals; deleted assets above already did.
+    for user_id in {asset.user_id for asset in to_create + to_update}:
+        bump(user_id, 'wealth')
+
+
+def apply_prices(user, entries, default_date):
+    """Apply a batch of price quotes to the user's holdings.
+
+    ``entries`` are dicts with ``price``, either ``id`` or ``symbol``, and an
+    optional ``date``. A symbol updates every holding that carries it. Each
+    holding gets one price history row per date and takes the latest quote
+    as its current price, unless its stored history already has a later
+    date, so backfilling old quotes leaves today's price alone. Current
+    prices are written with one ``bulk_update``, history rows with one
+    upsert, and linked assets are reconciled in one batch when the
+    transaction commits.
+
+    Returns ``(updated investments, unmatched entries)``.
+    """
+    from .models import Investment, InvestmentPrice
+
+    ids = {e['id'] for e in entries if e.get('id') is not None}
+    symbols = {e['symbol'] for e in entries if e.get('symbol')}
+    holdings = list(
+        Investment.objects.filter(user=user).filter(
+            Q(id__in=ids) | Q(symbol__in=symbols)
+        )
+    )
+    by_id = {inv.id: inv for inv in holdings}
+    by_symbol = {}
+    for inv in holdings:
+        if inv.symbol:
+            by_symbol.setdefault(inv.symbol, []).append(inv)
+
+    quotes = {}  # (investment id, date) -> price
+    unmatched = []
+    for entry in entries:
+        if entry.get('id') is not None:
+            targets = [by_id[entry['id']]] if entry['id'] in by_id else []
+        else:
+            targets = by_symbol.get(entry.get('symbol'), [])
+        if not targets:
+            unmatched.append(entry)
+            continue
+        day = entry.get('date') or default_date
+        for inv in targets:
+            quotes[(inv.id, day)] = entry['price']
+
+    latest = {}  # investment id -> (date, price)
+    for (investment_id, day), price in sorted(quotes.items(), key=lambda q: q[0][1]):
+        latest[investment_id] = (day, price)
+    stored = dict(
+        InvestmentPrice.objects.filter(investment_id__in=latest)
+        .order_by()
+        .values_list('investment')
+        .annotate(latest=Max('date'))
+    )
+
+    now = timezone.now()
+    changed = [by_id[investment_id] for investment_id in latest]
+    repriced = []
+    for investment_id, (day, price) in latest.items():
+        if investment_id in stored and day < stored[investment_id]:
+            continue
+        inv = by_id[investment_id]
+        inv.current_price = price
+        inv.last_updated = now
+        inv.updated_at = now
+        repriced.append(inv)
+
+    with transaction.atomic():
+        with suspend_asset_sync() as dirty:
+            Investment.objects.bulk_update(
+                repriced, ['current_price', 'last_updated', 'updated_at']
+            )
+            InvestmentPrice.objects.bulk_create(
+                [
+                    InvestmentPrice(investment_id=investment_id, date=day, price=price)
+                    for (investment_id, day), price in quotes.items()
+                ],
+                update_conflicts=True,
+                unique_fields=['investment', 'date'],
+                update_fields=['price'],
+            )
+            dirty.update(inv.id for inv in repriced)
+        if changed:
+            bump(user.id, 'investments')
+    return changed, unmatched
+
+
+def _money(expression):
+    return ExpressionWrapper(expression, output_field=_MONEY)
+
+
+class _Percent(ExpressionWrapper):
+    """``expression / 100`` as an exact decimal.
+
+    Postgres divides numerics exactly. SQLite has no decimal type and stores
+    whole numbers as integers, so ``7 / 100`` would truncate to zero; there
+    the divisor is a REAL literal instead.
+    """
+
+    def __init__(self, expression):
+        super().__init__(
+            expression / Value(Decimal('100'), output_field=_MONEY),
+            output_field=_MONEY,
+        )
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        sql, params = compiler.compile(self.expression.lhs)
+        return f'({sql} / 100.0)', params
+
+
+def annual_income_expression():
+    """``Investment.annual_income`` as a database expression.
+
+    Mirrors the property branch for branch so a whole queryset can be
+    totalled in SQL: net rent for real estate, after-tax coupons on face
+    value (or quantity) for bonds and bills, and the interest or dividend
+    rate on the current price for MMFs, fixed deposits and SACCOs.
+    """
+    hundred = Value(Decimal('100'), output_field=_MONEY)
+    zero = Value(Decimal('0'), output_field=_MONEY)
+    return Case(
+        When(
+            investment_type='REAL_ESTATE',
+            then=_money((F('monthly_rent') - F('monthly_costs')) * 12 - F('property_tax_annual')),
+        ),
+        When(
+            investment_type__in=['BOND', 'TBOND', 'TBILL'],
+            then=_Percent(
+                _Percent(Coalesce(NullIf(F('face_value'), zero), F('quantity')) * F('interest_rate'))
+                * (hundred - F('tax_rate'))
+            ),
+        ),
+        When(
+            investment_type__in=['MMF', 'FIXED_DEPOSIT', 'SACCO'],
+            then=_Percent(
+                F('current_price')
+                * Coalesce(NullIf(F('interest_rate'), zero), F('dividend_rate'))
+            ),
+        ),
+        default=zero,
+        output_field=_MONEY,
+    )
+
+
+def summarize_investments(queryset):
+    """Totals for a queryset of investments, grouped by ``investment_type``.
+
+    Runs one grouped query. Returns ``(totals, by_type)`` where both hold
+    ``count``, ``invested``, ``current_value``, ``gain_loss`` and
+    ``annual_income`` as exact ``Decimal`` values rounded to cents, and
+    ``by_type`` is keyed by investment type code.
+    """
+    invested = _money(F('purchase_price') * F('quantity') + F('purchase_fees'))
+    current_value = _money(F('current_price') * F('quantity'))
+    rows = (
+        queryset.order_by()
+        .values('investment_type')
+        .annotate(
+            count=Count('id'),
+            invested=Sum(invested),
+            current_value=Sum(current_value),
+            annual_income=Sum(annual_income_expression()),
+        )
+    )
+    fields = ('invested', 'current_value', 'gain_loss', 'annual_income')
+    totals = {'count': 0, **{f: Decimal('0') for f in fields}}
+    by_type = {}
+    for row in rows:
+        entry = {
+            'count': row['count'],
+            'invested': Decimal(row['invested']).quantize(_CENT),
+            'current_value': Decimal(row['current_value']).quantize(_CENT),
+            'annual_income': Decimal(row['annual_income']).quantize(_CENT),
+        }
+        entry['gain_loss'] = entry['current_value'] - entry['invested']
+        by_type[row['investment_type']] = entry
+        for key, value in entry.items():
+            totals[key] += value
+    return totals, by_type
+
+
+def investment_summary(queryset):
+    """The investments summary payload for a queryset, from one query.
+
+    ``by_type`` is keyed by the investment type's display name.
+    """
+    from .models import Investment
+
+    totals, by_type = summarize_investments(queryset)
+    total_invested = totals['invested']
+    total_gain_loss_percentage = (
+        (totals['gain_loss'] / total_invested * 100) if total_invested > 0 else Decimal('0')
+    )
+    type_names = dict(Investment.INVESTMENT_TYPE)
+
+    return {
+        'total_invested': float(total_invested),
+        'total_current_value': float(totals['current_value']),
+        'total_gain_loss': float(totals['gain_loss']),
+        'total_gain_loss_percentage': float(total_gain_loss_percentage),
+        'total_annual_income': float(totals['annual_income']),
+        'investment_count': totals['count'],
+        'by_type': {
+            type_names.get(code, code): {
+                'count': entry['count'],
+                'invested': float(entry['invested']),
+                'current_value': float(entry['current_value']),
+                'gain_loss': float(entry['gain_loss']),
+                'annual_income': float(entry['annual_income']),
+            }
+            for code, entry in by_type.items()
+        }
+    }
+
+
+_UNIT = Decimal("0.0001")
+
+
+class _Divide(Func):
+    """``numerator / denominator`` as a decimal.
+
+    SQLite stores whole-number decimals as integers and divides integers
+    with truncation, so the numerator is promoted to a real there.
+    """
+    arg_joiner = ' / '
+    template = '(%(expressions)s)'
+    output_field = _MONEY
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return super().as_sql(compiler, connection, arg_joiner=' * 1.0 / ', **extra_context)
+
+
+def _decimal(value, exponent=_CENT):
+    return Value(Decimal(value).quantize(exponent), output_field=_MONEY)
+
+
+def apply_cash_flow(investment_id, delta, **filters):
+    """Apply a cash movement linked from a finance transaction in one UPDATE.
+
+    Single-unit holdings (quantity 1, e.g. a pension or policy tracked by
+    value) take ``delta`` on their current price; others convert it to
+    units at the current price, and are marked sold when none remain. Both
+    branches are evaluated by the database against the row being updated,
+    so concurrent transactions cannot lose each other's changes.
+    """
+    from .models import Investment
+
+    single = Q(quantity=1)
+    priced = ~single & Q(current_price__gt=0)
+    quantity = F('quantity') + _Divide(_decimal(delta), F('current_price'))
+    updated = Investment.objects.filter(pk=investment_id, **filters).update(
+        current_price=Case(
+            When(single, then=Greatest(F('current_price') + _decimal(delta), Value(Decimal('0')))),
+            default=F('current_price'),
+        ),
+        quantity=Case(
+            When(priced, then=Greatest(quantity, Value(Decimal('0')))),
+            default=F('quantity'),
+        ),
+        status=Case(
+            When(priced & LessThanOrEqual(quantity, Decimal('0')), then=Value('SOLD')),
+            default=F('status'),
+        ),
+        updated_at=timezone.now(),
+    )
+    if updated:
+        bump_owner(Investment, investment_id, 'investments', user=filters.get('user'))
+        mark_investment_dirty(investment_id)
+    return updated
+
+
+def apply_trade(investment_id, transaction_type, quantity, price_per_unit, fees):
+    """Fold a trade into the holding's running totals in one UPDATE.
+
+    Buys add units and re-average the purchase price, sells remove units
+    (marking the holding sold when none remain) and bonus issues add units.
+    Other trade types do not change the holding.
+    """
+    from .models import Investment
+
+    rows = Investment.objects.filter(pk=investment_id)
+    units = _decimal(quantity, _UNIT)
+    now = timezone.now()
+    if transaction_type == 'BUY':
+        updated = rows.update(
+            purchase_price=Coalesce(
+                _Divide(
+                    F('purchase_price') * F('quantity') + _decimal(price_per_unit) * units,
+                    NullIf(F('quantity') + units, Value(Decimal('0'))),
+                ),
+                F('purchase_price'),
+                output_field=_MONEY,
+            ),
+            quantity=F('quantity') + units,
+            purchase_fees=F('purchase_fees') + _decimal(fees),
+            updated_at=now,
+        )
+    elif transaction_type == 'SELL':
+        updated = rows.update(
+            quantity=F('quantity') - units,
+            status=Case(
+                When(LessThanOrEqual(F('quantity') - units, Decimal('0')), then=Value('SOLD')),
+                default=F('status'),
+            ),
+            updated_at=now,
+        )
+    elif transaction_type == 'BONUS':
+        updated = rows.update(quantity=F('quantity') + units, updated_at=now)
+    else:
+        return 0
+    if updated:
+        bump_owner(Investment, investment_id, 'investments')
+        mark_investment_dirty(investment_id)
+    return updated
@@ -0,0 +1,148 @@
+"""Daily portfolio valuation rollup built from price history.
+
+A holding's value on day ``d`` is its quantity on ``d`` times its price on
+``d``:
+
+- quantity is the current quantity minus the buys, bonus issues and sales
+  dated after ``d``
+- price is the latest ``InvestmentPrice`` on or before ``d``, the purchase
+  price before the first recorded quote, and ``current_price`` for today
+
+Rows are stored in ``PortfolioValuation`` and extended incrementally: a
+refresh only rebuilds the days after the last stored row (plus today, whose
+price is live). Writes that change history call ``invalidate_valuations``
+so the affected days are rebuilt on the next read.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import Investment, InvestmentPrice, InvestmentTransaction, PortfolioValuation
+
+ZERO = Decimal("0")
+_CENT = Decimal("0.01")
+_TRADE_SIGN = {'BUY': 1, 'BONUS': 1, 'SELL': -1}
+
+
+def invalidate_valuations(user, since=None):
+    """Drop stored rollup rows from ``since`` onward (all rows if None)."""
+    rows = PortfolioValuation.objects.filter(user=user)
+    if since is not None:
+        rows = rows.filter(date__gte=since)
+    rows.delete()
+
+
+def build_valuations(user, start=None, end=None):
+    """Compute ``PortfolioValuation`` rows (unsaved) for ``start``..``end``."""
+    end = end or timezone.localdate()
+    investments = list(
+        Investment.objects.filter(user=user).values(
+            'id', 'purchase_date', 'purchase_price', 'purchase_fees',
+            'quantity', 'current_price',
+        )
+    )
+    if not investments:
+        return []
+    if start is None:
+        start = min(inv['purchase_date'] for inv in investments)
+    if start > end:
+        return []
+    ids = [inv['id'] for inv in investments]
+
+    # Quantity on the start day, then the trades after it.
+    quantity = {inv['id']: inv['quantity'] for inv in investments}
+    trades_on = defaultdict(list)
+    for row in InvestmentTransaction.objects.filter(
+        investment_id__in=ids, date__gt=start, transaction_type__in=list(_TRADE_SIGN)
+    ).values('investment_id', 'date', 'transaction_type', 'quantity'):
+        delta = _TRADE_SIGN[row['transaction_type']] * row['quantity']
+        quantity[row['investment_id']] -= delta
+        trades_on[row['date']].append((row['investment_id'], delta))
+
+    # Price on the start day: the latest quote on or before it.
+    price = {inv['id']: inv['purchase_price'] for inv in investments}
+    seeds = (
+        InvestmentPrice.objects.filter(investment_id__in=ids, date__lte=start)
+        .values('investment_id')
+        .annotate(last=Max('date'))
+    )
+    seed_dates = {row['investment_id']: row['last'] for row in seeds}
+    prices_on = defaultdict(list)
+    for row in InvestmentPrice.objects.filter(investment_id__in=ids).filter(
+        date__gte=min(seed_dates.values(), default=start), date__lte=end
+    ).values('investment_id', 'date', 'price'):
+        investment_id = row['investment_id']
+        if row['date'] == seed_dates.get(investment_id):
+            price[investment_id] = row['price']
+        elif row['date'] > start:
+            prices_on[row['date']].append((investment_id, row['price']))
+
+    today = timezone.localdate()
+    purchased_on = defaultdict(list)
+    meta = {inv['id']: inv for inv in investments}
+    held = set()
+    for inv in investments:
+        if inv['purchase_date'] <= start:
+            held.add(inv['id'])
+        elif inv['purchase_date'] <= end:
+            purchased_on[inv['purchase_date']].append(inv['id'])
+
+    rows = []
+    day = start
+    while True:
+        if day > start:
+            held.update(purchased_on.get(day, ()))
+            for investment_id, delta in trades_on.get(day, ()):
+                quantity[investment_id] += delta
+            for investment_id, quote in prices_on.get(day, ()):
+                price[investment_id] = quote
+        market_value = ZERO
+        cost_basis = ZERO
+        count = 0
+        for investment_id in held:
+            qty = quantity[investment_id]
+            if qty <= 0:
+                continue
+            inv = meta[investment_id]
+            day_price = inv['current_price'] if day == today else price[investment_id]
+            market_value += day_price * qty
+            cost_basis += inv['purchase_price'] * qty + inv['purchase_fees']
+            count += 1
+        rows.append(PortfolioValuation(
+            user=user,
+            date=day,
+            market_value=market_value.quantize(_CENT),
+            cost_basis=cost_basis.quantize(_CENT),
+            holdings=count,
+        ))
+        if day >= end:
+            return rows
+        day += timedelta(days=1)
+
+
+def refresh_valuations(user, end=None):
+    """Extend the stored rollup through ``end`` and return nothing.
+
+    Only days after the last stored row are rebuilt, plus today because
+    today's value uses live prices.
+    """
+    end = end or timezone.localdate()
+    today = timezone.localdate()
+    last = (
+        PortfolioValuation.objects.filter(user=user, date__lt=today)
+        .aggregate(last=Max('date'))['last']
+    )
+    start = last + timedelta(days=1) if last else None
+    if start is not None and start > end:
+        return
+    rows = build_valuations(user, start, end)
+    PortfolioValuation.objects.bulk_create(
+        rows,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=['user', 'date'],
+        update_fields=['market_value', 'cost_basis', 'holdings', 'updated_at'],
+    )
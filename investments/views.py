@@ -1,73 +1,92 @@
-from rest_framework import viewsets, status
+import csv
+import io
+from functools import partial
+
+from rest_framework import serializers, viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Sum, F
+from django.utils import timezone
+from datetime import date, timedelta
 from decimal import Decimal
-from .models import Investment, InvestmentTransaction
+
+from backend.cache import get_or_build
+from backend.conditional import ConditionalListMixin
+from .models import Investment, InvestmentPrice, InvestmentTransaction, PortfolioValuation
 from .serializers import (
+    InvestmentListSerializer,
     InvestmentSerializer,
     InvestmentTransactionSerializer,
-    InvestmentSummarySerializer
+    InvestmentSummarySerializer,
+    PriceQuoteSerializer,
 )
+from .costbasis import METHODS, replay_investment
+from .utils import apply_prices, apply_trade, investment_summary
+from .valuation import invalidate_valuations, refresh_valuations
+
+
+def _percent_change(old, new):
+    if not old:
+        return None
+    return float((new - old) / old * 100)
+
+
+class TradeHistoryPagination(LimitOffsetPagination):
+    default_limit = 50
+    max_limit = 500
+
 
+class InvestmentViewSet(ConditionalListMixin, viewsets.ModelViewSet):
+    """ViewSet for managing investments
 
-class InvestmentViewSet(viewsets.ModelViewSet):
-    """ViewSet for managing investments"""
+    The list omits trade history unless ``?include=transactions`` is passed;
+    use the paginated ``transactions`` action for a holding's trades.
+    """
     serializer_class = InvestmentSerializer
     permission_classes = [IsAuthenticated]
+    # Trades nested with ?include=transactions are not covered by the
+    # holdings' own updated_at.
+    conditional_groups = ('investments',)
+
+    def _nests_transactions(self):
+        if self.action == 'list':
+            return self.request.query_params.get('include') == 'transactions'
+        return self.action == 'retrieve'
 
     def get_queryset(self):
-        return Investment.objects.filter(user=self.request.user)
+        qs = Investment.objects.filter(user=self.request.user)
+        if self._nests_transactions():
+            qs = qs.prefetch_related('investment_transactions')
+        return qs
+
+    def get_serializer_class(self):
+        if self.action == 'list' and not self._nests_transactions():
+            return InvestmentListSerializer
+        return super().get_serializer_class()
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        investment = serializer.save(user=self.request.user)
+        invalidate_valuations(self.request.user, investment.purchase_date)
+
+    def perform_update(self, serializer):
+        serializer.save()
+        invalidate_valuations(self.request.user)
+
+    def perform_destroy(self, instance):
+        instance.delete()
+        invalidate_valuations(self.request.user)
 
     @action(detail=False, methods=['get'])
     def summary(self, request):
         """Get summary statistics for all investments"""
-        investments = self.get_queryset().filter(status='ACTIVE')
-        
-        total_invested = Decimal('0')
-        total_current_value = Decimal('0')
-        by_type = {}
-        
-        for inv in investments:
-            total_invested += inv.total_invested
-            total_current_value += inv.current_value
-            
-            inv_type = inv.get_investment_type_display()
-            if inv_type not in by_type:
-                by_type[inv_type] = {
-                    'count': 0,
-                    'invested': Decimal('0'),
-                    'current_value': Decimal('0'),
-                    'gain_loss': Decimal('0')
-                }
-            by_type[inv_type]['count'] += 1
-            by_type[inv_type]['invested'] += inv.total_invested
-            by_type[inv_type]['current_value'] += inv.current_value
-            by_type[inv_type]['gain_loss'] += inv.gain_loss
-        
-        total_gain_loss = total_current_value - total_invested
-        total_gain_loss_percentage = (
-            (total_gain_loss / total_invested * 100) if total_invested > 0 else Decimal('0')
+        data, _ = get_or_build(
+            request.user.id,
+            'investment_summary',
+            ('investments',),
+            partial(investment_summary, self.get_queryset().filter(status='ACTIVE')),
         )
-        
-        # Convert by_type decimals to floats for JSON serialization
-        for key in by_type:
-            by_type[key]['invested'] = float(by_type[key]['invested'])
-            by_type[key]['current_value'] = float(by_type[key]['current_value'])
-            by_type[key]['gain_loss'] = float(by_type[key]['gain_loss'])
-        
-        return Response({
-            'total_invested': float(total_invested),
-            'total_current_value': float(total_current_value),
-            'total_gain_loss': float(total_gain_loss),
-            'total_gain_loss_percentage': float(total_gain_loss_percentage),
-            'investment_count': investments.count(),
-            'by_type': by_type
-        })
+        return Response(data)
 
     @action(detail=True, methods=['post'])
     def add_transaction(self, request, pk=None):
@@ -77,29 +96,104 @@ class InvestmentViewSet(viewsets.ModelViewSet):
         
         if serializer.is_valid():
             transaction = serializer.save(investment=investment)
-            
-            # Update investment based on transaction type
-            if transaction.transaction_type == 'BUY':
-                investment.quantity += transaction.quantity
-                # Update average purchase price
-                total_cost = (investment.purchase_price * (investment.quantity - transaction.quantity)) + (transaction.price_per_unit * transaction.quantity)
-                investment.purchase_price = total_cost / investment.quantity
-                investment.purchase_fees += transaction.fees
-            elif transaction.transaction_type == 'SELL':
-                investment.quantity -= transaction.quantity
-                if investment.quantity <= 0:
-                    investment.status = 'SOLD'
-            elif transaction.transaction_type in ['DIVIDEND', 'INTEREST']:
-                # Record dividend/interest - doesn't change quantity
-                pass
-            elif transaction.transaction_type == 'BONUS':
-                investment.quantity += transaction.quantity
-            
-            investment.save()
+            # Folded in by the database so concurrent trades on the same
+            # holding cannot overwrite each other's totals.
+            apply_trade(
+                investment.id,
+                transaction.transaction_type,
+                transaction.quantity,
+                transaction.price_per_unit,
+                transaction.fees,
+            )
+            investment.refresh_from_db()
+            invalidate_valuations(request.user, transaction.date)
             return Response(InvestmentSerializer(investment).data)
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=True, methods=['get'])
+    def transactions(self, request, pk=None):
+        """Paginated trade history of one investment, newest first"""
+        investment = self.get_object()
+        paginator = TradeHistoryPagination()
+        page = paginator.paginate_queryset(
+            investment.investment_transactions.all(), request, view=self
+        )
+        return paginator.get_paginated_response(
+            InvestmentTransactionSerializer(page, many=True).data
+        )
+
+    @action(detail=True, methods=['get'])
+    def cost_basis(self, request, pk=None):
+        """Lots, realized and unrealized gain rebuilt from trade history.
+
+        ``?method=fifo`` (default) or ``?method=average``.
+        """
+        investment = self.get_object()
+        method = request.query_params.get('method', 'fifo')
+        if method not in METHODS:
+            return Response(
+                {'method': f"Must be one of: {', '.join(METHODS)}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        book = replay_investment(investment, method)
+        data = book.summary(investment.current_price)
+        data['lots'] = [
+            {'quantity': lot.quantity, 'cost': lot.cost.quantize(Decimal('0.01'))}
+            for lot in book.lots()
+        ]
+        return Response(data)
+
+    @action(detail=False, methods=['post'], url_path='prices')
+    def prices(self, request):
+        """Apply many prices at once.
+
+        Accepts a JSON list of ``{"id" | "symbol", "price", "date"?}``
+        quotes, an object with that list under ``prices`` and an optional
+        default ``date``, or a CSV (uploaded as ``file`` or sent as a ``csv``
+        string) with ``id`` or ``symbol``, ``price`` and optional ``date``
+        columns.
+        """
+        data = request.data
+        default_date = None
+        upload = request.FILES.get('file')
+        if upload is not None or (isinstance(data, dict) and data.get('csv')):
+            text = upload.read().decode('utf-8-sig') if upload else data['csv']
+            rows = [
+                {k.strip().lower(): (v or '').strip() for k, v in row.items() if k}
+                for row in csv.DictReader(io.StringIO(text))
+            ]
+            rows = [{k: v for k, v in row.items() if v} for row in rows]
+            default_date = data.get('date') if isinstance(data, dict) else None
+        elif isinstance(data, list):
+            rows = data
+        else:
+            rows = data.get('prices')
+            default_date = data.get('date')
+        if not isinstance(rows, list) or not rows:
+            return Response(
+                {'error': 'Provide a non-empty list of prices or a CSV.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        quotes = PriceQuoteSerializer(data=rows, many=True)
+        quotes.is_valid(raise_exception=True)
+        if default_date:
+            default_date = serializers.DateField().to_internal_value(default_date)
+        default_date = default_date or timezone.localdate()
+        changed, unmatched = apply_prices(request.user, quotes.validated_data, default_date)
+        if changed:
+            invalidate_valuations(request.user, min(
+                entry.get('date') or default_date for entry in quotes.validated_data
+            ))
+        return Response({
+            'updated': len(changed),
+            'investment_ids': [inv.id for inv in changed],
+            'unmatched': [
+                {k: str(v) for k, v in entry.items()} for entry in unmatched
+            ],
+        })
+
     @action(detail=True, methods=['post'])
     def update_price(self, request, pk=None):
         """Update the current price of an investment"""
@@ -114,16 +208,116 @@ class InvestmentViewSet(viewsets.ModelViewSet):
         
         investment.current_price = Decimal(str(new_price))
         investment.save()
+        InvestmentPrice.objects.update_or_create(
+            investment=investment,
+            date=timezone.localdate(),
+            defaults={'price': investment.current_price},
+        )
+        invalidate_valuations(request.user, timezone.localdate())
         
         return Response(InvestmentSerializer(investment).data)
 
+    @action(detail=False, methods=['get'])
+    def portfolio_series(self, request):
+        """Daily portfolio market value and cost basis.
+
+        Served from the stored valuation rollup, which is extended to today
+        first. Optional ``start`` and ``end`` query params (YYYY-MM-DD)
+        bound the range.
+        """
+        bounds = {}
+        for param in ('start', 'end'):
+            if request.query_params.get(param):
+                try:
+                    bounds[param] = serializers.DateField().to_internal_value(
+                        request.query_params[param]
+                    )
+                except serializers.ValidationError as exc:
+                    return Response({param: exc.detail}, status=status.HTTP_400_BAD_REQUEST)
+
+        refresh_valuations(request.user)
+        rows = PortfolioValuation.objects.filter(user=request.user)
+        if 'start' in bounds:
+            rows = rows.filter(date__gte=bounds['start'])
+        if 'end' in bounds:
+            rows = rows.filter(date__lte=bounds['end'])
+        series = [
+            {
+                'date': row['date'],
+                'market_value': float(row['market_value']),
+                'cost_basis': float(row['cost_basis']),
+                'gain_loss': float(row['market_value'] - row['cost_basis']),
+                'holdings': row['holdings'],
+            }
+            for row in rows.values('date', 'market_value', 'cost_basis', 'holdings')
+        ]
+        return Response({'count': len(series), 'series': series})
 
-class InvestmentTransactionViewSet(viewsets.ModelViewSet):
+    @action(detail=True, methods=['get'])
+    def performance(self, request, pk=None):
+        """Price history and period returns for one holding"""
+        investment = self.get_object()
+        history = list(
+            investment.prices.order_by('date').values_list('date', 'price')
+        )
+        today = timezone.localdate()
+        periods = {
+            '1m': today - timedelta(days=30),
+            '3m': today - timedelta(days=91),
+            '6m': today - timedelta(days=182),
+            '1y': today - timedelta(days=365),
+            'ytd': date(today.year, 1, 1),
+        }
+        returns = {}
+        for label, since in periods.items():
+            # Price at the start of the period: last quote on or before it.
+            base = None
+            for day, price in history:
+                if day > since:
+                    break
+                base = price
+            returns[label] = _percent_change(base, investment.current_price)
+
+        return Response({
+            'id': investment.id,
+            'name': investment.name,
+            'symbol': investment.symbol,
+            'quantity': float(investment.quantity),
+            'purchase_price': float(investment.purchase_price),
+            'current_price': float(investment.current_price),
+            'total_invested': float(investment.total_invested),
+            'current_value': float(investment.current_value),
+            'gain_loss': float(investment.gain_loss),
+            'gain_loss_percentage': float(investment.gain_loss_percentage),
+            'annualized_return': float(investment.annualized_return),
+            'returns': returns,
+            'prices': [
+                {'date': day, 'price': float(price)} for day, price in history
+            ],
+        })
+
+
+class InvestmentTransactionViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     """ViewSet for managing investment transactions"""
     serializer_class = InvestmentTransactionSerializer
     permission_classes = [IsAuthenticated]
+    conditional_groups = ('investments',)
 
     def get_queryset(self):
         return InvestmentTransaction.objects.filter(
             investment__user=self.request.user
         )
+
+    def perform_create(self, serializer):
+        trade = serializer.save()
+        invalidate_valuations(self.request.user, trade.date)
+
+    def perform_update(self, serializer):
+        since = serializer.instance.date
+        trade = serializer.save()
+        invalidate_valuations(self.request.user, min(since, trade.date))
+
+    def perform_destroy(self, instance):
+        since = instance.date
+        instance.delete()
+        invalidate_valuations(self.request.user, since)
@@ -1,15 +1,15 @@
 import datetime
 from decimal import Decimal
-from django.core.management.base import BaseCommand
 from django.db.models import Sum
 
+from backend.metrics import MeteredCommand
 from finance.models import Transaction, RecurringTransaction
 from budgeting.models import Budget
 from notifications.utils import create_notification
 from notifications.models import Notification as NotificationModel
 
 
-class Command(BaseCommand):
+class Command(MeteredCommand):
     help = (
         "Run cross-cutting notifications checks: budget threshold warnings "
         "and upcoming recurring transaction reminders."
@@ -35,6 +35,7 @@ class Command(BaseCommand):
 
         budget_notifs = self._check_budgets(threshold)
         recurring_notifs = self._check_recurring_due(days)
+        self.rows = budget_notifs + recurring_notifs
 
         self.stdout.write(
             self.style.SUCCESS(
@@ -34,7 +34,7 @@ def create_notification(
                 fail_silently=True,
             )
             notif.email_sent = True
-            notif.save(update_fields=["email_sent"])
+            notif.save(update_fields=["email_sent", "updated_at"])
         except Exception:
             # swallow errors; email_sent remains False
             pass
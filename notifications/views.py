@@ -1,8 +1,11 @@
+from django.utils import timezone
 from rest_framework import viewsets, permissions
 from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
+from backend.conditional import ConditionalListMixin
+
 from .models import Notification
 from .serializers import NotificationSerializer
 
@@ -12,7 +15,7 @@ class SmallLimitPagination(LimitOffsetPagination):
     max_limit = 100
 
 
-class NotificationViewSet(viewsets.ModelViewSet):
+class NotificationViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
     pagination_class = SmallLimitPagination
@@ -53,7 +56,7 @@ class NotificationViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=["post"], url_path="mark-all-read")
     def mark_all_read(self, request):
         Notification.objects.filter(user=request.user, is_read=False).update(
-            is_read=True
+            is_read=True, updated_at=timezone.now()
         )
         return Response({"status": "ok"})
 
@@ -61,7 +64,7 @@ class NotificationViewSet(viewsets.ModelViewSet):
     def mark_read(self, request, pk=None):
         notif = self.get_object()
         notif.is_read = True
-        notif.save(update_fields=["is_read"])
+        notif.save(update_fields=["is_read", "updated_at"])
         return Response({"status": "ok"})
 
     @action(detail=False, methods=["get"], url_path="unread-count")
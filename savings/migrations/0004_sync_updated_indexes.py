@@ -0,0 +1,32 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("savings", "0003_add_interest_rate"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="goalcontribution",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True, default=django.utils.timezone.now
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name="goalcontribution",
+            index=models.Index(
+                fields=["updated_at"], name="savings_contrib_updated_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="savingsgoal",
+            index=models.Index(
+                fields=["user", "updated_at"], name="savings_goal_user_updated_idx"
+            ),
+        ),
+    ]
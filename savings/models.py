@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction as db_transaction
 from django.conf import settings
 from finance.models import Account, Transaction
 
@@ -40,6 +40,9 @@ class SavingsGoal(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'updated_at'], name='savings_goal_user_updated_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} - {self.user.username}"
@@ -78,6 +81,7 @@ class GoalContribution(models.Model):
     date = models.DateField()
     notes = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     # Link to transaction if contribution came from a categorized transaction
     transaction = models.OneToOneField(
         Transaction,
@@ -89,6 +93,9 @@ class GoalContribution(models.Model):
 
     class Meta:
         ordering = ['-date', '-created_at']
+        indexes = [
+            models.Index(fields=['updated_at'], name='savings_contrib_updated_idx'),
+        ]
 
     def __str__(self):
         return (
@@ -98,8 +105,12 @@ class GoalContribution(models.Model):
 
     def save(self, *args, **kwargs):
         # Update goal's current amount when contribution is saved
+        from .utils import adjust_goal_amount
+
         is_new = self.pk is None
-        super().save(*args, **kwargs)
-        if is_new:
-            self.goal.current_amount += self.amount
-            self.goal.save()
+        with db_transaction.atomic():
+            super().save(*args, **kwargs)
+            if is_new:
+                adjust_goal_amount(self.goal_id, self.amount, floor=None)
+        if is_new and GoalContribution.goal.is_cached(self):
+            self.goal.refresh_from_db(fields=['current_amount', 'updated_at'])
@@ -0,0 +1,147 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from finance.models import Account, Transaction
+from .models import GoalContribution, SavingsGoal
+
+User = get_user_model()
+
+
+class SavingsGoalListTestCase(TestCase):
+    """Test that the goals list is batched."""
+
+    url = '/api/savings/goals/'
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser', password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.account = Account.objects.create(
+            user=self.user, name='Bank', opening_balance=Decimal('1000.00')
+        )
+
+    def make_goals(self, count):
+        goals = []
+        for n in range(count):
+            goal = SavingsGoal.objects.create(
+                user=self.user,
+                name=f'Goal {n}',
+                target_amount=Decimal('12000.00'),
+                current_amount=Decimal('0'),
+                target_date=date.today() + timedelta(days=360),
+                interest_rate=Decimal('12.00') if n % 2 else Decimal('0'),
+                linked_account=self.account,
+            )
+            GoalContribution.objects.create(
+                goal=goal, amount=Decimal('1000.00'), date=date.today()
+            )
+            Transaction.objects.create(
+                user=self.user,
+                account=self.account,
+                date=date.today(),
+                amount=Decimal('250.00'),
+                kind='EXPENSE',
+                savings_goal=goal,
+            )
+            goals.append(goal)
+        return goals
+
+    def test_list_uses_constant_queries(self):
+        self.make_goals(3)
+        with self.assertNumQueries(3):
+            self.client.get(self.url)
+        self.make_goals(47)
+        # The conditional GET validator, goals with linked account and
+        # transaction totals, then contributions.
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 50)
+        goal = response.json()[0]
+        self.assertEqual(goal['total_from_transactions'], 250.0)
+        self.assertEqual(len(goal['contributions']), 1)
+
+    def test_projection_matches_annuity_formula(self):
+        plain, compounding = self.make_goals(2)
+        data = {g['id']: g for g in self.client.get(self.url).json()}
+
+        self.assertEqual(data[plain.id]['days_remaining'], 360)
+        self.assertAlmostEqual(data[plain.id]['monthly_target'], 11000 / 12)
+        self.assertEqual(data[plain.id]['projected_value'], 1000.0)
+
+        rate = 0.01
+        growth = (1 + rate) ** 12
+        self.assertEqual(data[compounding.id]['projected_value'], round(1000 * growth, 2))
+        self.assertAlmostEqual(
+            data[compounding.id]['monthly_target'],
+            (12000 - 1000 * growth) * rate / (growth - 1),
+        )
+
+    def test_goal_without_target_date(self):
+        goal = SavingsGoal.objects.create(
+            user=self.user, name='Someday', target_amount=Decimal('500.00'),
+            current_amount=Decimal('100.00'),
+        )
+        data = self.client.get(f'{self.url}{goal.id}/').json()
+        self.assertIsNone(data['days_remaining'])
+        self.assertEqual(data['monthly_target'], 400.0)
+        self.assertEqual(data['total_from_transactions'], 0.0)
+
+
+class SavingsSummaryTestCase(TestCase):
+    """Test the single-query savings summary."""
+
+    url = '/api/savings/goals/summary/'
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='testuser', password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_empty_summary(self):
+        data = self.client.get(self.url).json()
+        self.assertEqual(data['total_goals'], 0)
+        self.assertEqual(data['average_progress'], 0)
+        self.assertEqual(data['goals'], [])
+
+    def test_summary_in_one_query(self):
+        house = SavingsGoal.objects.create(
+            user=self.user, name='House', target_amount=Decimal('1000.00'),
+            current_amount=Decimal('250.00'),
+        )
+        SavingsGoal.objects.create(
+            user=self.user, name='Done', target_amount=Decimal('100.00'),
+            current_amount=Decimal('150.00'),
+        )
+        today = date.today()
+        for days_ago in (10, 40, 70, 200):
+            GoalContribution.objects.create(
+                goal=house, amount=Decimal('50.00'), date=today - timedelta(days=days_ago)
+            )
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        data = response.json()
+        self.assertEqual(data['total_goals'], 2)
+        # Contributions bump current_amount: 250 + 4 * 50.
+        self.assertEqual(data['total_target'], 1100.0)
+        self.assertEqual(data['total_saved'], 600.0)
+        self.assertEqual(data['total_remaining'], 550.0)
+        self.assertEqual(data['average_progress'], 72.5)
+        self.assertEqual(data['goals'][0]['monthly_velocity'], 50.0)
+        self.assertEqual(data['goals'][0]['months_to_target'], 11)
+        self.assertIsNone(data['goals'][1]['months_to_target'])
+
+        data = self.client.get(self.url, {'months': 12}).json()
+        self.assertEqual(data['goals'][0]['monthly_velocity'], 16.67)
+        self.assertEqual(self.client.get(self.url, {'months': 'x'}).status_code, 400)
@@ -0,0 +1,158 @@
+import math
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal
+from typing import Optional
+
+from dateutil.relativedelta import relativedelta
+from django.db.models import (
+    Avg, Case, DecimalField, F, FloatField, OuterRef, Subquery, Sum, Value, When, Window,
+)
+from django.db.models.functions import Cast, Coalesce, Greatest, Least
+from django.utils import timezone
+
+from backend.cache import bump_owner
+
+DEFAULT_VELOCITY_MONTHS = 3
+
+
+def adjust_goal_amount(goal_id, delta, floor=Decimal('0'), **filters):
+    """Add ``delta`` to a goal's ``current_amount`` in one UPDATE.
+
+    The new value is computed by the database from the row it updates, so
+    the change is atomic without a prior read and concurrent adjustments
+    never overwrite each other. The result is clamped at ``floor`` unless
+    ``floor`` is None. Returns the number of goals updated.
+    """
+    from .models import SavingsGoal
+
+    amount = F('current_amount') + delta
+    if floor is not None:
+        amount = Greatest(amount, Value(floor))
+    updated = SavingsGoal.objects.filter(pk=goal_id, **filters).update(
+        current_amount=amount, updated_at=timezone.now()
+    )
+    if updated:
+        bump_owner(SavingsGoal, goal_id, 'savings', user=filters.get('user'))
+    return updated
+
+
+@dataclass
+class GoalProjection:
+    days_remaining: Optional[int]
+    monthly_target: float
+    projected_value: float
+
+
+def project_goal(goal, today=None):
+    """Days left, monthly contribution needed and projected value of a goal.
+
+    All three share the months-to-target and the growth factor
+    ``(1 + r)^n``, so they are computed together once per goal:
+
+    - projected value: ``PV * (1 + r)^n``
+    - monthly target: the annuity payment that closes the gap,
+      ``(FV - PV * (1 + r)^n) * r / ((1 + r)^n - 1)``, or a plain
+      division when there is no interest
+    """
+    current = float(goal.current_amount)
+    remaining = float(goal.remaining_amount)
+    if not goal.target_date:
+        return GoalProjection(None, remaining, current)
+
+    days_remaining = max(0, (goal.target_date - (today or date.today())).days)
+    if not days_remaining:
+        return GoalProjection(days_remaining, remaining, current)
+
+    months = max(1, days_remaining / 30)
+    monthly_rate = float(goal.interest_rate) / 100 / 12
+    if monthly_rate <= 0:
+        return GoalProjection(days_remaining, remaining / months, current)
+
+    growth = (1 + monthly_rate) ** months
+    grown = current * growth
+    needed = float(goal.target_amount) - grown
+    monthly_target = max(0, needed * monthly_rate / (growth - 1)) if needed > 0 else 0
+    return GoalProjection(days_remaining, monthly_target, round(grown, 2))
+
+
+def summary_rows(goals, months=DEFAULT_VELOCITY_MONTHS, today=None):
+    """One row per goal with savings totals over all goals attached.
+
+    Each row carries the goal's ``remaining`` amount, ``progress`` and the
+    amount ``contributed`` in the last ``months`` months; ``total_*`` and
+    ``average_progress`` are window aggregates over every goal, so the
+    whole summary is a single query.
+    """
+    from .models import GoalContribution
+
+    since = (today or date.today()) - relativedelta(months=months)
+    money = DecimalField(max_digits=16, decimal_places=2)
+    remaining = Greatest(
+        F('target_amount') - F('current_amount'), Value(Decimal('0')), output_field=money
+    )
+    progress = Case(
+        When(target_amount__lte=0, then=Value(0.0)),
+        default=Least(
+            Cast('current_amount', FloatField()) * 100 / Cast('target_amount', FloatField()),
+            Value(100.0),
+        ),
+        output_field=FloatField(),
+    )
+    contributed = (
+        GoalContribution.objects.filter(goal=OuterRef('pk'), date__gt=since)
+        .order_by()
+        .values('goal')
+        .annotate(total=Sum('amount'))
+        .values('total')
+    )
+    return (
+        goals.order_by('id')
+        .annotate(
+            remaining=remaining,
+            progress=progress,
+            contributed=Coalesce(Subquery(contributed, output_field=money), Value(Decimal('0'))),
+            total_target=Window(Sum('target_amount')),
+            total_saved=Window(Sum('current_amount')),
+            total_remaining=Window(Sum(remaining)),
+            average_progress=Window(Avg(progress)),
+        )
+        .values(
+            'id', 'name', 'remaining', 'progress', 'contributed',
+            'total_target', 'total_saved', 'total_remaining', 'average_progress',
+        )
+    )
+
+
+def savings_summary(goals, months=DEFAULT_VELOCITY_MONTHS, today=None):
+    """The savings summary payload for a queryset of goals, from one query.
+
+    Each goal's velocity is its average monthly contribution over the last
+    ``months`` months, used to forecast months to target.
+    """
+    rows = list(summary_rows(goals, months, today))
+    first = rows[0] if rows else {}
+
+    per_goal = []
+    for row in rows:
+        velocity = row['contributed'] / months
+        months_to_target = (
+            math.ceil(row['remaining'] / velocity) if velocity > 0 else None
+        )
+        per_goal.append({
+            'id': row['id'],
+            'name': row['name'],
+            'monthly_velocity': float(round(velocity, 2)),
+            'months_to_target': months_to_target,
+        })
+
+    return {
+        'total_goals': len(rows),
+        'total_target': float(first.get('total_target') or 0),
+        'total_saved': float(first.get('total_saved') or 0),
+        'total_remaining': float(first.get('total_remaining') or 0),
+        'average_progress': round(first.get('average_progress') or 0, 2),
+        'velocity_months': months,
+        'monthly_velocity': float(round(sum(g['monthly_velocity'] for g in per_goal), 2)),
+        'goals': per_goal,
+    }
@@ -1,22 +1,52 @@
+from datetime import date
+from functools import partial
+
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from django.db.models import Prefetch, Sum
+
+from backend.cache import get_or_build
+from backend.conditional import ConditionalListMixin
 from .models import SavingsGoal, GoalContribution
 from .serializers import (
     SavingsGoalSerializer,
     GoalContributionSerializer
 )
+from .utils import DEFAULT_VELOCITY_MONTHS, savings_summary
 
 
-class SavingsGoalViewSet(viewsets.ModelViewSet):
+class SavingsGoalViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     serializer_class = SavingsGoalSerializer
     permission_classes = [IsAuthenticated]
+    # Goals show their contributions, linked transactions and account.
+    conditional_groups = ('savings', 'finance')
+
+    def get_conditional_queryset(self):
+        return SavingsGoal.objects.filter(user=self.request.user)
+
+    def get_conditional_extra(self):
+        # Days remaining and monthly targets move with the date.
+        return [date.today().isoformat()]
 
     def get_queryset(self):
-        return SavingsGoal.objects.filter(
+        qs = SavingsGoal.objects.filter(
             user=self.request.user
         ).select_related('linked_account')
+        if self.action in ('list', 'retrieve'):
+            qs = self.with_details(qs)
+        return qs
+
+    @staticmethod
+    def with_details(qs):
+        """Annotate and prefetch what ``SavingsGoalSerializer`` shows."""
+        return qs.annotate(
+            transactions_total=Sum('transactions__amount')
+        ).prefetch_related(Prefetch(
+            'contributions',
+            queryset=GoalContribution.objects.select_related('transaction'),
+        ))
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -29,7 +59,7 @@ class SavingsGoalViewSet(viewsets.ModelViewSet):
         if serializer.is_valid():
             serializer.save(goal=goal)
             # Return updated goal
-            goal.refresh_from_db()
+            goal = self.with_details(self.get_queryset()).get(pk=goal.pk)
             return Response(
                 SavingsGoalSerializer(goal).data,
                 status=status.HTTP_201_CREATED
@@ -41,30 +71,38 @@ class SavingsGoalViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def summary(self, request):
-        """Get savings summary statistics"""
-        goals = self.get_queryset()
-        total_target = sum(g.target_amount for g in goals)
-        total_saved = sum(g.current_amount for g in goals)
-        total_remaining = sum(g.remaining_amount for g in goals)
-        avg_progress = (
-            sum(g.progress_percentage for g in goals) / len(goals)
-            if goals else 0
-        )
+        """Get savings summary statistics
 
-        return Response({
-            'total_goals': goals.count(),
-            'total_target': float(total_target),
-            'total_saved': float(total_saved),
-            'total_remaining': float(total_remaining),
-            'average_progress': round(avg_progress, 2),
-        })
+        Totals and the average progress are window aggregates over the
+        same query that annotates each goal's contribution velocity: its
+        average monthly contribution over the last ``months`` months
+        (default 3), used to forecast months to target.
+        """
+        try:
+            months = int(request.query_params.get('months', DEFAULT_VELOCITY_MONTHS))
+        except ValueError:
+            months = 0
+        if not 1 <= months <= 120:
+            return Response(
+                {'months': 'Must be an integer between 1 and 120.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        data, _ = get_or_build(
+            request.user.id,
+            'savings_summary',
+            ('savings',),
+            partial(savings_summary, self.get_queryset(), months),
+            params={'months': months, 'today': date.today()},
+        )
+        return Response(data)
 
 
-class GoalContributionViewSet(viewsets.ModelViewSet):
+class GoalContributionViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     serializer_class = GoalContributionSerializer
     permission_classes = [IsAuthenticated]
+    conditional_groups = ('savings', 'finance')
 
     def get_queryset(self):
         return GoalContribution.objects.filter(
             goal__user=self.request.user
-        ).select_related('goal')
+        ).select_related('goal', 'transaction')
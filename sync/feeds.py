@@ -0,0 +1,251 @@
+"""What the delta sync endpoint serves, and the deletion log behind it.
+
+Each feed is a model the mobile client mirrors, serialized the way the
+regular endpoints serialize it. Created and updated rows are found through
+the ``(user, updated_at)`` indexes; deleted rows through ``Tombstone`` rows
+written by a ``pre_delete`` receiver on every feed model (connected by
+``connect_tombstones``), one bulk insert per ``delete()`` call. Code that
+deletes with raw SQL must record its own tombstones.
+
+Rows also show fields of the rows they point to (a transaction's
+``category_name``), so a feed lists those relations in ``depends_on`` and a
+row counts as changed when one of them was written. A ``SET_NULL`` on
+delete changes rows with a queryset update that leaves ``updated_at``
+alone, so the same receiver stamps the rows it is about to touch.
+"""
+import threading
+from dataclasses import dataclass
+from typing import Callable
+
+from django.contrib.auth import get_user_model
+from django.db.models import Prefetch, Q, QuerySet, Sum
+from django.db.models.deletion import Collector
+from django.db.models.signals import pre_delete
+from django.utils import timezone
+
+from backend.cache import OWNER_PATHS
+from finance.models import Account, Category, RecurringTransaction, Tag, Transaction
+from finance.serializers import (
+    AccountSerializer,
+    CategorySerializer,
+    RecurringTransactionSerializer,
+    TagSerializer,
+    TransactionSerializer,
+)
+from investments.models import Investment, InvestmentTransaction
+from investments.serializers import InvestmentListSerializer, InvestmentTransactionSerializer
+from savings.models import GoalContribution, SavingsGoal
+from savings.serializers import GoalContributionSerializer, SavingsGoalSerializer
+from wealth.models import Asset, Liability, NetWorthSnapshot
+from wealth.serializers import AssetSerializer, LiabilitySerializer, NetWorthSnapshotSerializer
+from wealth.utils import account_balances
+
+from .models import Tombstone
+
+
+class SyncedContributionSerializer(GoalContributionSerializer):
+    class Meta(GoalContributionSerializer.Meta):
+        fields = GoalContributionSerializer.Meta.fields + ["goal"]
+
+
+class SyncedTradeSerializer(InvestmentTransactionSerializer):
+    class Meta(InvestmentTransactionSerializer.Meta):
+        fields = InvestmentTransactionSerializer.Meta.fields + ["investment"]
+
+
+def _goals(qs):
+    return qs.select_related("linked_account").annotate(
+        transactions_total=Sum("transactions__amount")
+    ).prefetch_related(Prefetch(
+        "contributions",
+        queryset=GoalContribution.objects.select_related("transaction"),
+    ))
+
+
+@dataclass(frozen=True)
+class Feed:
+    model: type
+    serializer: type
+    prepare: Callable[[QuerySet], QuerySet] = lambda qs: qs
+    # Foreign keys whose rows show up in the serialized row
+    depends_on: tuple = ()
+
+    @property
+    def label(self):
+        return self.model._meta.label
+
+    def owned(self, user):
+        owner = OWNER_PATHS.get(self.label, "user_id")
+        return self.model.objects.filter(**{owner: user.pk})
+
+    def rows(self, user):
+        return self.prepare(self.owned(user))
+
+    def changed(self, user, cutoff):
+        """Rows written at or after ``cutoff``, or whose dependencies were."""
+        condition = Q(updated_at__gte=cutoff)
+        for name in self.depends_on:
+            condition |= Q(**{f"{name}__updated_at__gte": cutoff})
+        if not self.depends_on:
+            return self.rows(user).filter(condition)
+        return self.rows(user).filter(pk__in=self.owned(user).filter(condition).values("pk"))
+
+
+FEEDS = {
+    "accounts": Feed(Account, AccountSerializer),
+    "categories": Feed(Category, CategorySerializer),
+    "tags": Feed(Tag, TagSerializer),
+    "recurring": Feed(
+        RecurringTransaction, RecurringTransactionSerializer,
+        lambda qs: qs.select_related("account", "category"),
+        depends_on=("account", "category"),
+    ),
+    "transactions": Feed(
+        Transaction, TransactionSerializer,
+        lambda qs: qs.select_related(
+            "account", "transfer_account", "category", "savings_goal",
+            "liability", "investment",
+        ),
+        depends_on=(
+            "account", "transfer_account", "category", "savings_goal",
+            "liability", "investment",
+        ),
+    ),
+    "savings_goals": Feed(
+        SavingsGoal, SavingsGoalSerializer, _goals, depends_on=("linked_account",)
+    ),
+    "goal_contributions": Feed(
+        GoalContribution, SyncedContributionSerializer,
+        lambda qs: qs.select_related("transaction"),
+        depends_on=("transaction",),
+    ),
+    "investments": Feed(Investment, InvestmentListSerializer),
+    "investment_transactions": Feed(InvestmentTransaction, SyncedTradeSerializer),
+    "assets": Feed(Asset, AssetSerializer),
+    "liabilities": Feed(Liability, LiabilitySerializer),
+    "net_worth_snapshots": Feed(NetWorthSnapshot, NetWorthSnapshotSerializer),
+}
+
+FEED_KEYS = {feed.label: key for key, feed in FEEDS.items()}
+
+
+def changes_since(user, keys, cutoff, context):
+    """Rows of the ``keys`` feeds changed or deleted at or after ``cutoff``.
+
+    Pass ``cutoff=None`` for every row. Returns ``(changes, deleted)``:
+    serialized rows and deleted ids, per feed key. Rows whose
+    ``depends_on`` relations changed are included. Account balances move
+    with transactions, so every account is sent again after any
+    transaction changed.
+    """
+    deleted = {key: [] for key in keys}
+    if cutoff is not None:
+        tombstones = Tombstone.objects.filter(
+            user=user, deleted_at__gte=cutoff,
+            model__in=[FEEDS[key].label for key in keys],
+        ).values_list("model", "object_id")
+        for label, object_id in tombstones:
+            deleted[FEED_KEYS[label]].append(object_id)
+
+    changes = {}
+    for key in keys:
+        feed = FEEDS[key]
+        rows = feed.rows(user) if cutoff is None else feed.changed(user, cutoff)
+        changes[key] = rows.order_by("pk")
+
+    if "accounts" in keys and cutoff is not None:
+        transactions_changed = (
+            Tombstone.objects.filter(
+                user=user, deleted_at__gte=cutoff, model=Transaction._meta.label
+            ).exists()
+            or Transaction.objects.filter(user=user, updated_at__gte=cutoff).exists()
+        )
+        if transactions_changed:
+            changes["accounts"] = FEEDS["accounts"].rows(user).order_by("pk")
+
+    serialized = {}
+    for key, rows in changes.items():
+        rows = list(rows)
+        feed_context = dict(context)
+        if key == "accounts":
+            feed_context["balances"] = account_balances(rows) if rows else {}
+        serialized[key] = FEEDS[key].serializer(rows, many=True, context=feed_context).data
+    return serialized, deleted
+
+
+_state = threading.local()
+
+
+def _deleting_user(origin):
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return model is get_user_model()
+
+
+def _owners(model, instances):
+    """Map each instance's pk to its user's id, with at most one query."""
+    path = OWNER_PATHS.get(model._meta.label)
+    if path is None:
+        return {obj.pk: obj.user_id for obj in instances}
+    relation, _, field = path.partition("__")
+    parents = {getattr(obj, f"{relation}_id") for obj in instances}
+    owners = dict(
+        model._meta.get_field(relation).related_model._base_manager
+        .filter(pk__in=parents).values_list("pk", field)
+    )
+    return {obj.pk: owners.get(getattr(obj, f"{relation}_id")) for obj in instances}
+
+
+def _before_delete(sender, instance, origin=None, using=None, **kwargs):
+    # pre_delete fires once per row, but a delete() call is handled as a
+    # whole: its origin is collected the way Django is about to collect it,
+    # then the call's tombstones are inserted with one bulk_create and the
+    # rows it sets to NULL are stamped a batch at a time. Both are written
+    # in the delete's own transaction.
+    origin = instance if origin is None else origin
+    if getattr(_state, "origin", None) is origin and (
+        (sender._meta.label, instance.pk) in _state.deleting
+    ):
+        return
+    # Rows deleted along with their user leave no client to tell.
+    if _deleting_user(origin):
+        return
+    collector = Collector(using=using, origin=origin)
+    collector.collect(origin.all() if isinstance(origin, QuerySet) else [origin])
+    _state.origin = origin
+    _state.deleting = {(sender._meta.label, instance.pk)} | {
+        (model._meta.label, obj.pk) for model, objs in collector.data.items() for obj in objs
+    }
+
+    tombstones = []
+    for model, objs in collector.data.items():
+        label = model._meta.label
+        if label not in FEED_KEYS:
+            continue
+        owners = _owners(model, objs)
+        tombstones.extend(
+            Tombstone(user_id=owners[obj.pk], model=label, object_id=obj.pk)
+            for obj in objs
+            if owners[obj.pk] is not None
+        )
+    Tombstone.objects.using(using).bulk_create(tombstones, batch_size=1000)
+
+    now = timezone.now()
+    for (field, _), batches in collector.field_updates.items():
+        if field.model._meta.label not in FEED_KEYS:
+            continue
+        for objs in batches:
+            if not isinstance(objs, QuerySet):
+                objs = field.model._base_manager.filter(pk__in=[obj.pk for obj in objs])
+            objs.using(using).update(updated_at=now)
+
+
+def connect_tombstones():
+    """Log tombstones for deleted rows of synced models.
+
+    Also stamps the feed rows a delete sets to NULL, so they are sent again.
+    """
+    for feed in FEEDS.values():
+        pre_delete.connect(
+            _before_delete, sender=feed.model,
+            dispatch_uid=f"sync:{feed.label}:delete",
+        )
@@ -0,0 +1 @@
+"""Sync management commands."""
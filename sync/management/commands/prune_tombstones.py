@@ -0,0 +1,25 @@
+"""Delete sync tombstones older than the retention window."""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from sync.models import Tombstone
+from sync.views import RETENTION_DAYS
+
+
+class Command(BaseCommand):
+    help = "Delete sync tombstones older than the retention window."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=RETENTION_DAYS,
+            help=f"Retention window in days (default: {RETENTION_DAYS}).",
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options["days"])
+        deleted, _ = Tombstone.objects.filter(deleted_at__lt=cutoff).delete()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} tombstones."))
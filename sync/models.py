@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.db import models
+
+
+class Tombstone(models.Model):
+    """A deleted row, kept so clients drop it on their next delta sync."""
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="tombstones",
+    )
+    model = models.CharField(max_length=50)  # model label, e.g. "finance.Transaction"
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["deleted_at"]
+        indexes = [
+            models.Index(fields=["user", "deleted_at"], name="sync_tomb_user_deleted_idx"),
+            models.Index(fields=["deleted_at"], name="sync_tomb_deleted_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user} - {self.model} #{self.object_id}"
@@ -0,0 +1,223 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from finance.models import Account, Category, Tag, Transaction
+from investments.models import Investment, InvestmentTransaction
+from savings.models import GoalContribution, SavingsGoal
+
+from .models import Tombstone
+from .views import RETENTION_DAYS, make_token
+
+User = get_user_model()
+
+
+class SyncTestCase(TestCase):
+    """Test the delta sync endpoint."""
+
+    url = '/api/sync/'
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser', password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.bank = Account.objects.create(
+            user=self.user, name='Bank', opening_balance=Decimal('1000.00')
+        )
+        self.food = Category.objects.create(
+            user=self.user, name='Food', kind='EXPENSE'
+        )
+        self.tag = Tag.objects.create(user=self.user, name='Weekly')
+        self.transaction = Transaction.objects.create(
+            user=self.user, account=self.bank, date=date(2024, 1, 5),
+            amount=Decimal('40.00'), kind='EXPENSE', category=self.food,
+        )
+        self.goal = SavingsGoal.objects.create(
+            user=self.user, name='House', target_amount=Decimal('1000.00'),
+        )
+        self.holding = Investment.objects.create(
+            user=self.user, name='Fund', investment_type='STOCK',
+            purchase_date=date(2024, 1, 1), purchase_price=Decimal('10.00'),
+            quantity=Decimal('10'), current_price=Decimal('10.00'),
+        )
+        other = User.objects.create_user(username='other', password='testpass123')
+        Account.objects.create(user=other, name='Theirs')
+        # Everything above was written long before the first sync.
+        earlier = timezone.now() - timedelta(hours=1)
+        for model in (Account, Category, Tag, Transaction, SavingsGoal, Investment):
+            model.objects.update(updated_at=earlier)
+
+    def sync(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_full_sync_returns_every_row_of_the_user(self):
+        data = self.sync()
+        self.assertTrue(data['reset'])
+        self.assertEqual([a['name'] for a in data['changes']['accounts']], ['Bank'])
+        self.assertEqual(data['changes']['accounts'][0]['current_balance'], 960.0)
+        self.assertEqual(len(data['changes']['transactions']), 1)
+        self.assertEqual(len(data['changes']['savings_goals']), 1)
+        self.assertEqual(data['changes']['goal_contributions'], [])
+        self.assertEqual(data['deleted']['tags'], [])
+
+    def test_changes_since_a_token(self):
+        token = self.sync()['token']
+        data = self.sync(since=token)
+        self.assertFalse(data['reset'])
+        self.assertTrue(all(rows == [] for rows in data['changes'].values()))
+
+        self.food.name = 'Groceries'
+        self.food.save()
+        rent = Category.objects.create(user=self.user, name='Rent', kind='EXPENSE')
+        tag_id = self.tag.id
+        self.tag.delete()
+        data = self.sync(since=token)
+        self.assertEqual(
+            [c['name'] for c in data['changes']['categories']], ['Groceries', 'Rent']
+        )
+        self.assertEqual(data['deleted']['tags'], [tag_id])
+        self.assertEqual(data['changes']['accounts'], [])
+        # The transaction shows its category's name, so it is sent again.
+        self.assertEqual(
+            [t['category_name'] for t in data['changes']['transactions']], ['Groceries']
+        )
+
+        # Unchanged accounts are sent again when their balance moved.
+        token = data['token']
+        Transaction.objects.create(
+            user=self.user, account=self.bank, date=date(2024, 1, 6),
+            amount=Decimal('10.00'), kind='EXPENSE', category=rent,
+        )
+        data = self.sync(since=token)
+        self.assertEqual(data['changes']['accounts'][0]['current_balance'], 950.0)
+        # Rows written just before the token are sent again, to cover writes
+        # that committed after the previous sync read, and so are the rows
+        # showing them.
+        self.assertEqual(len(data['changes']['categories']), 2)
+        self.assertEqual(len(data['changes']['transactions']), 2)
+        self.assertEqual(data['changes']['tags'], [])
+
+    def test_renamed_relations_resend_their_rows(self):
+        contribution = GoalContribution.objects.create(
+            goal=self.goal, amount=Decimal('40.00'), date=date(2024, 1, 5),
+            transaction=self.transaction,
+        )
+        GoalContribution.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+        token = self.sync()['token']
+
+        self.bank.name = 'Current'
+        self.bank.save()
+        self.transaction.description = 'Market'
+        self.transaction.save()
+        data = self.sync(since=token, models='transactions,goal_contributions,tags')
+        self.assertEqual(data['changes']['transactions'][0]['account_name'], 'Current')
+        self.assertEqual(data['changes']['goal_contributions'][0]['id'], contribution.id)
+        self.assertEqual(
+            data['changes']['goal_contributions'][0]['transaction_description'], 'Market'
+        )
+        self.assertEqual(data['changes']['tags'], [])
+
+    def test_rows_set_to_null_by_a_delete_are_sent(self):
+        saving, untouched = (
+            Transaction.objects.create(
+                user=self.user, account=self.bank, date=date(2024, 1, 6),
+                amount=Decimal('5.00'), kind='EXPENSE', savings_goal=goal,
+            )
+            for goal in (self.goal, None)
+        )
+        Transaction.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+        token = self.sync()['token']
+
+        self.food.delete()
+        SavingsGoal.objects.filter(pk=self.goal.pk).delete()
+        data = self.sync(since=token, models='transactions')
+        rows = {row['id']: row for row in data['changes']['transactions']}
+        self.assertEqual(set(rows), {self.transaction.id, saving.id})
+        self.assertIsNone(rows[self.transaction.id]['category'])
+        self.assertNotIn('category_name', rows[self.transaction.id])
+        self.assertIsNone(rows[saving.id]['savings_goal'])
+
+    def test_cascaded_deletes_leave_tombstones(self):
+        contribution = GoalContribution.objects.create(
+            goal=self.goal, amount=Decimal('50.00'), date=date(2024, 1, 5),
+        )
+        trade = InvestmentTransaction.objects.create(
+            investment=self.holding, transaction_type='BUY', date=date(2024, 1, 2),
+            quantity=Decimal('1'), price_per_unit=Decimal('10.00'),
+            total_amount=Decimal('10.00'),
+        )
+        token = self.sync()['token']
+        data = self.sync(since=token, models='goal_contributions,investment_transactions')
+        self.assertEqual(data['changes']['goal_contributions'][0]['goal'], self.goal.id)
+        self.assertEqual(
+            data['changes']['investment_transactions'][0]['investment'], self.holding.id
+        )
+
+        self.goal.delete()
+        self.holding.delete()
+        data = self.sync(since=token, models='savings_goals,goal_contributions,investment_transactions')
+        self.assertEqual(list(data['changes']), [
+            'savings_goals', 'goal_contributions', 'investment_transactions',
+        ])
+        self.assertEqual(data['deleted']['goal_contributions'], [contribution.id])
+        self.assertEqual(data['deleted']['investment_transactions'], [trade.id])
+
+        # A deleted user leaves no tombstones behind.
+        self.user.delete()
+        self.assertFalse(Tombstone.objects.exists())
+
+    def test_tombstones_are_inserted_in_bulk(self):
+        Transaction.objects.bulk_create([
+            Transaction(
+                user=self.user, account=self.bank, date=date(2024, 2, 1),
+                amount=Decimal('1.00'), kind='EXPENSE',
+            )
+            for _ in range(30)
+        ])
+        bank_id = self.bank.id
+        with CaptureQueriesContext(connection) as queries:
+            self.bank.delete()
+        inserts = [
+            q for q in queries
+            if q['sql'].startswith('INSERT') and Tombstone._meta.db_table in q['sql']
+        ]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(
+            Tombstone.objects.filter(user=self.user, model='finance.Transaction').count(), 31
+        )
+        self.assertEqual(
+            Tombstone.objects.get(model='finance.Account').object_id, bank_id
+        )
+
+    def test_tokens(self):
+        for since in ('soon', '-5', make_token(timezone.now() + timedelta(days=1))):
+            response = self.client.get(self.url, {'since': since})
+            self.assertEqual(response.status_code, 400, since)
+        self.assertEqual(self.client.get(self.url, {'models': 'x'}).status_code, 400)
+
+        # Past the deletion log's retention, the client starts over.
+        old = make_token(timezone.now() - timedelta(days=RETENTION_DAYS + 1))
+        data = self.sync(since=old)
+        self.assertTrue(data['reset'])
+        self.assertEqual(len(data['changes']['accounts']), 1)
+
+    def test_prune_tombstones(self):
+        self.tag.delete()
+        Tombstone.objects.update(deleted_at=timezone.now() - timedelta(days=RETENTION_DAYS + 1))
+        Category.objects.create(user=self.user, name='Rent', kind='EXPENSE').delete()
+        out = StringIO()
+        call_command('prune_tombstones', stdout=out)
+        self.assertIn('Deleted 1 tombstones', out.getvalue())
+        self.assertEqual(Tombstone.objects.get().model, 'finance.Category')
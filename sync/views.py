@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.utils import timezone
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .feeds import FEEDS, changes_since
+
+# Tombstones older than this are pruned (see prune_tombstones); a client
+# that has not synced for longer gets a full reset.
+RETENTION_DAYS = 90
+# Rows are matched from a little before the token's time, so a write whose
+# transaction committed after the previous sync read, but stamped its
+# updated_at before it, is still picked up. Clients upsert by id, so rows
+# sent twice are harmless.
+OVERLAP = timedelta(minutes=2)
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+
+def make_token(moment):
+    return str((moment - EPOCH) // MICROSECOND)
+
+
+def read_token(token):
+    """The moment a token was issued, or None if it is not a valid token."""
+    try:
+        moment = EPOCH + int(token) * MICROSECOND
+    except (ValueError, OverflowError):
+        return None
+    return moment if EPOCH < moment <= timezone.now() else None
+
+
+class SyncView(APIView):
+    """Rows created, updated or deleted since the client's last sync.
+
+    Params: since, the ``token`` of the previous response (omit it for a
+    full sync); models, a comma-separated subset of the feeds to return.
+    The response has ``changes`` (serialized rows per feed), ``deleted``
+    (ids per feed), a new ``token`` and ``reset``. When ``reset`` is true
+    the changes hold every row and the client should drop anything else it
+    has; that happens for a full sync and for a token older than the
+    deletion log.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        # Issued before reading anything, so writes made during this request
+        # are picked up by the next one.
+        now = timezone.now()
+        params = request.query_params
+        errors = {}
+
+        cutoff = None
+        if params.get("since"):
+            since = read_token(params["since"])
+            if since is None:
+                errors["since"] = "Invalid sync token."
+            elif since > now - timedelta(days=RETENTION_DAYS):
+                cutoff = since - OVERLAP
+
+        keys = list(FEEDS)
+        if params.get("models"):
+            keys = [k.strip() for k in params["models"].split(",") if k.strip()]
+            unknown = [k for k in keys if k not in FEEDS]
+            if unknown:
+                errors["models"] = f"Unknown models: {', '.join(unknown)}."
+
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        changes, deleted = changes_since(
+            request.user, keys, cutoff, {"request": request}
+        )
+        return Response({
+            "token": make_token(now),
+            "reset": cutoff is None,
+            "changes": changes,
+            "deleted": deleted,
+        })
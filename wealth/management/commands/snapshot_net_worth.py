@@ -0,0 +1,120 @@
+"""Nightly net worth snapshots for every user."""
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def _init_worker():
+    import django
+
+    django.setup()
+
+
+def _snapshot_range(task):
+    """Snapshot every user whose id falls in ``[low, high]``."""
+    from wealth.utils import snapshot_users
+
+    low, high, day = task
+    ids = list(
+        get_user_model()
+        .objects.filter(id__gte=low, id__lte=high)
+        .values_list("id", flat=True)
+    )
+    try:
+        return snapshot_users(ids, day)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        "Record a net worth snapshot for every user, computed in batches "
+        "with grouped queries and written with a bulk upsert."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--date",
+            help="Snapshot date as YYYY-MM-DD (default: today).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help="Users per batch (default: 500).",
+        )
+        parser.add_argument(
+            "--min-user-id",
+            type=int,
+            help="Only snapshot users with at least this id (for sharding).",
+        )
+        parser.add_argument(
+            "--max-user-id",
+            type=int,
+            help="Only snapshot users with at most this id (for sharding).",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Run batches across this many processes (default: 1, in-process).",
+        )
+
+    def handle(self, *args, **options):
+        # Imported here so spawned workers can load this module before
+        # Django is set up.
+        from wealth.utils import snapshot_users
+
+        day = timezone.localdate()
+        if options.get("date"):
+            day = parse_date(options["date"])
+            if day is None:
+                raise CommandError("--date must be YYYY-MM-DD.")
+        batch_size = options["batch_size"]
+        workers = options["workers"]
+        if batch_size < 1 or workers < 1:
+            raise CommandError("--batch-size and --workers must be positive.")
+
+        users = get_user_model().objects.order_by("id")
+        if options.get("min_user_id") is not None:
+            users = users.filter(id__gte=options["min_user_id"])
+        if options.get("max_user_id") is not None:
+            users = users.filter(id__lte=options["max_user_id"])
+        ids = list(users.values_list("id", flat=True))
+        batches = [ids[k:k + batch_size] for k in range(0, len(ids), batch_size)]
+
+        started = time.perf_counter()
+        written = 0
+        if workers > 1 and len(batches) > 1:
+            # Workers receive contiguous id ranges rather than id lists.
+            tasks = [(batch[0], batch[-1], day) for batch in batches]
+            connections.close_all()
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            ) as pool:
+                for count in pool.map(_snapshot_range, tasks):
+                    written += count
+                    self.stdout.write(f"Snapshotted {written}/{len(ids)} users")
+        else:
+            for batch in batches:
+                written += snapshot_users(batch, day)
+                self.stdout.write(f"Snapshotted {written}/{len(ids)} users")
+
+        elapsed = time.perf_counter() - started
+        rate = written / elapsed if elapsed else 0.0
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Snapshotted {written} users for {day} in {elapsed:.2f}s "
+                f"({rate:.1f} users/sec)."
+            )
+        )
@@ -0,0 +1,29 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("wealth", "0005_allow_nullable_debt_fields"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="asset",
+            index=models.Index(
+                fields=["user", "updated_at"], name="wealth_asset_user_updated_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="liability",
+            index=models.Index(
+                fields=["user", "updated_at"], name="wealth_liab_user_updated_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="networthsnapshot",
+            index=models.Index(
+                fields=["user", "updated_at"], name="wealth_snap_user_updated_idx"
+            ),
+        ),
+    ]
@@ -61,6 +61,9 @@ class Asset(TimeStampedModel):
                 condition=models.Q(source_id__isnull=False)
             )
         ]
+        indexes = [
+            models.Index(fields=['user', 'updated_at'], name='wealth_asset_user_updated_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -113,6 +116,11 @@ class Liability(TimeStampedModel):
         remaining = self.tenure_months - months_elapsed
         return max(0, remaining)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'updated_at'], name='wealth_liab_user_updated_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -131,6 +139,9 @@ class NetWorthSnapshot(TimeStampedModel):
     class Meta:
         unique_together = ("user", "date")
         ordering = ["-date"]
+        indexes = [
+            models.Index(fields=["user", "updated_at"], name="wealth_snap_user_updated_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user} - {self.date} - {self.net_worth}"
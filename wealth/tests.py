@@ -1,3 +1,274 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from finance.models import Account, Transaction
+from savings.models import GoalContribution, SavingsGoal
+from .models import Asset, Liability, NetWorthSnapshot
+from .timeseries import net_worth_series
+from .utils import backfill_net_worth_snapshots, compute_current_net_worth
+
+User = get_user_model()
+
+
+class NetWorthSeriesTestCase(TestCase):
+    """Test daily net worth reconstruction and incremental snapshotting."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser', password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.today = timezone.localdate()
+        self.start = self.today - timedelta(days=10)
+
+        account = Account.objects.create(
+            user=self.user, name='Bank', opening_balance=Decimal('1000.00')
+        )
+        liability = Liability.objects.create(
+            user=self.user,
+            name='Loan',
+            principal_balance=Decimal('400.00'),
+            minimum_payment=Decimal('50.00'),
+        )
+        goal = SavingsGoal.objects.create(
+            user=self.user, name='Trip', target_amount=Decimal('1000.00')
+        )
+        Asset.objects.create(
+            user=self.user,
+            name='Land',
+            current_value=Decimal('5000.00'),
+            acquisition_date=self.today - timedelta(days=5),
+        )
+
+        def tx(days_ago, kind, amount, **extra):
+            return Transaction.objects.create(
+                user=self.user,
+                account=account,
+                date=self.today - timedelta(days=days_ago),
+                kind=kind,
+                amount=Decimal(amount),
+                **extra,
+            )
+
+        tx(10, Transaction.Kind.INCOME, '500.00')
+        tx(7, Transaction.Kind.EXPENSE, '100.00', liability=liability, fee=Decimal('1.00'))
+        tx(2, Transaction.Kind.EXPENSE, '2000.00')
+        GoalContribution.objects.create(
+            goal=goal, amount=Decimal('300.00'), date=self.today - timedelta(days=8)
+        )
+        GoalContribution.objects.create(
+            goal=goal, amount=Decimal('200.00'), date=self.today - timedelta(days=1)
+        )
+
+    def test_series_matches_current_net_worth(self):
+        series = net_worth_series(self.user)
+        self.assertEqual(series[0].date, self.start)
+        self.assertEqual(series[-1].date, self.today)
+        self.assertEqual(len(series), 11)
+
+        current = compute_current_net_worth(self.user)
+        self.assertEqual(series[-1].net_worth, current['net_worth'])
+        self.assertEqual(series[-1].total_assets, current['total_assets'])
+        self.assertEqual(series[-1].total_liabilities, current['total_liabilities'])
+
+    def test_series_replays_flows(self):
+        points = {p.date: p for p in net_worth_series(self.user)}
+
+        def net(days_ago):
+            return points[self.today - timedelta(days=days_ago)].net_worth
+
+        # Only the account exists: the loan first shows up with its payment.
+        self.assertEqual(net(10), Decimal('1500.00'))
+        # Goal contribution of 300 on day -8.
+        self.assertEqual(net(8), Decimal('1800.00'))
+        # Payment: account -101, loan enters at 400 after the payment.
+        self.assertEqual(net(7), Decimal('1299.00'))
+        # Land appears on day -5.
+        self.assertEqual(net(5), Decimal('6299.00'))
+        # The account goes negative (-601): counted twice as in the live figure.
+        self.assertEqual(net(2), Decimal('5300.00') - Decimal('400.00') - Decimal('1202.00'))
+
+    def test_backfill_then_extend(self):
+        yesterday = self.today - timedelta(days=1)
+        self.assertEqual(backfill_net_worth_snapshots(self.user, end=yesterday), 10)
+        self.assertEqual(backfill_net_worth_snapshots(self.user, end=yesterday), 0)
+
+        with self.assertNumQueries(11):
+            # Latest snapshot, eight loaders, existing dates and the insert.
+            self.assertEqual(backfill_net_worth_snapshots(self.user), 1)
+        self.assertEqual(
+            NetWorthSnapshot.objects.get(user=self.user, date=self.today).net_worth,
+            compute_current_net_worth(self.user)['net_worth'],
+        )
+
+    def test_snapshot_endpoint_fills_gaps(self):
+        NetWorthSnapshot.objects.create(
+            user=self.user,
+            date=self.today - timedelta(days=4),
+            total_assets=0,
+            total_liabilities=0,
+            net_worth=0,
+        )
+        response = self.client.post('/api/wealth/net-worth-snapshots/snapshot/')
+        self.assertEqual(response.status_code, 200)
+        dates = set(
+            NetWorthSnapshot.objects.filter(user=self.user).values_list('date', flat=True)
+        )
+        self.assertEqual(
+            dates, {self.today - timedelta(days=d) for d in range(5)}
+        )
+        # Existing snapshots are not rewritten.
+        self.assertEqual(
+            NetWorthSnapshot.objects.get(
+                user=self.user, date=self.today - timedelta(days=4)
+            ).net_worth,
+            0,
+        )
+
+    def test_investment_assets_follow_trades(self):
+        from investments.models import Investment, InvestmentTransaction
+
+        with self.captureOnCommitCallbacks(execute=True):
+            investment = Investment.objects.create(
+                user=self.user,
+                name='Fund',
+                purchase_date=self.today - timedelta(days=3),
+                purchase_price=Decimal('10.00'),
+                quantity=Decimal('10'),
+                current_price=Decimal('10.00'),
+            )
+        InvestmentTransaction.objects.create(
+            investment=investment,
+            transaction_type='BUY',
+            date=self.today - timedelta(days=1),
+            quantity=Decimal('5'),
+            price_per_unit=Decimal('9.00'),
+            total_amount=Decimal('45.00'),
+        )
+        series = net_worth_series(self.user)
+        self.assertEqual(
+            compute_current_net_worth(self.user)['net_worth'], series[-1].net_worth
+        )
+        series = {p.date: p.total_assets for p in series}
+
+        def day(days_ago):
+            return self.today - timedelta(days=days_ago)
+
+        # Five of the ten units were bought yesterday, valued at today's price.
+        self.assertEqual(series[day(4)] + Decimal('50.00'), series[day(3)])
+        self.assertEqual(series[day(2)] + Decimal('50.00') + Decimal('200.00'), series[day(1)])
+
+
+class NetWorthBatchSnapshotTestCase(TestCase):
+    """Test the batched snapshot command against the per-user computation."""
+
+    def test_batch_matches_per_user(self):
+        from django.core.management import call_command
+        from io import StringIO
+
+        users = []
+        for n in range(5):
+            user = User.objects.create_user(username=f'user{n}', password='x')
+            users.append(user)
+            account = Account.objects.create(
+                user=user, name='Bank', opening_balance=Decimal(100 * n)
+            )
+            Transaction.objects.create(
+                user=user,
+                account=account,
+                date=timezone.localdate(),
+                kind=Transaction.Kind.EXPENSE,
+                amount=Decimal('250.00'),
+                fee=Decimal('2.00'),
+            )
+            if n % 2:
+                Asset.objects.create(
+                    user=user,
+                    name='Bank asset',
+                    current_value=Decimal('10.00'),
+                    linked_account=account,
+                )
+                Liability.objects.create(
+                    user=user, name='Loan', principal_balance=Decimal('75.00')
+                )
+
+        out = StringIO()
+        call_command('snapshot_net_worth', '--batch-size', '2', stdout=out)
+        call_command('snapshot_net_worth', '--batch-size', '2', stdout=out)
+        self.assertIn('users/sec', out.getvalue())
+        self.assertEqual(NetWorthSnapshot.objects.count(), len(users))
+        for user in users:
+            snapshot = NetWorthSnapshot.objects.get(user=user)
+            expected = compute_current_net_worth(user)
+            self.assertEqual(snapshot.net_worth, expected['net_worth'])
+            self.assertEqual(snapshot.total_liabilities, expected['total_liabilities'])
+
+
+class SyncFromAccountsTestCase(TestCase):
+    """Test the bulk account to asset sync."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser', password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.accounts = [
+            Account.objects.create(
+                user=self.user,
+                name=f'Bank {n}',
+                opening_balance=Decimal('100.00') * n,
+                institution='KCB' if n % 2 else '',
+            )
+            for n in range(4)
+        ]
+        for account in self.accounts:
+            Transaction.objects.create(
+                user=self.user,
+                account=account,
+                date=timezone.localdate(),
+                kind=Transaction.Kind.INCOME,
+                amount=Decimal('50.00'),
+                fee=Decimal('1.00'),
+            )
+
+    def sync(self):
+        response = self.client.post('/api/wealth/assets/sync_from_accounts/')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_sync_creates_then_skips_unchanged(self):
+        with self.assertNumQueries(4):
+            # accounts, balances, linked assets, bulk insert
+            data = self.sync()
+        self.assertEqual((data['created'], data['updated']), (4, 0))
+        for account in self.accounts:
+            asset = Asset.objects.get(linked_account=account)
+            self.assertEqual(asset.current_value, account.calculate_current_balance())
+
+        with self.assertNumQueries(3):
+            data = self.sync()
+        self.assertEqual((data['created'], data['updated'], data['unchanged']), (0, 0, 4))
+        self.assertEqual(len(data['asset_ids']), 4)
 
-# Create your tests here.
+    def test_sync_updates_changed_balances(self):
+        self.sync()
+        Transaction.objects.create(
+            user=self.user,
+            account=self.accounts[2],
+            date=timezone.localdate(),
+            kind=Transaction.Kind.EXPENSE,
+            amount=Decimal('20.00'),
+        )
+        data = self.sync()
+        self.assertEqual((data['created'], data['updated'], data['unchanged']), (0, 1, 3))
+        self.assertEqual(
+            Asset.objects.get(linked_account=self.accounts[2]).current_value,
+            Decimal('229.00'),
+        )
@@ -0,0 +1,310 @@
+"""Daily net-worth history reconstructed from recorded flows.
+
+Every component of ``compute_current_net_worth`` is anchored at its current
+value and walked back through the flows that changed it:
+
+- accounts: transactions (income, expenses, transfers and fees)
+- savings goals: goal contributions
+- liabilities: expense transactions linked to the liability
+- investment-backed assets: investment transactions and investment-linked
+  finance transactions, valued at the investment's current price
+- other assets: their current value from acquisition (or creation) onward
+
+So a component's value on day ``d`` is its current value minus every flow
+dated after ``d``, and zero before the component existed. The series is
+produced in one forward pass over the days, touching only the components
+that change on each day, from a fixed number of queries.
+"""
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+
+from django.db.models import Case, DecimalField, F, Min, Q, Sum, When
+from django.utils import timezone
+
+from .models import Asset, Liability
+
+ZERO = Decimal("0")
+
+ASSET = "asset"
+SAVINGS = "savings"
+ACCOUNT = "account"
+SYNCED_ACCOUNT = "synced_account"
+LIABILITY = "liability"
+
+
+@dataclass
+class NetWorthPoint:
+    date: date
+    total_assets: Decimal
+    total_liabilities: Decimal
+    net_worth: Decimal
+
+
+@dataclass
+class _Component:
+    kind: str
+    current: Decimal
+    opened: date
+
+
+def transaction_effect():
+    """Signed effect of a finance transaction on its account's balance.
+
+    Mirrors ``Account.calculate_current_balance``: income adds, expenses
+    subtract, transfers subtract unless marked inbound, and fees subtract.
+    """
+    from finance.models import Transaction
+
+    money = DecimalField(max_digits=16, decimal_places=2)
+    return (
+        Case(
+            When(kind=Transaction.Kind.INCOME, then=F("amount")),
+            When(
+                kind=Transaction.Kind.TRANSFER,
+                transfer_direction=Transaction.TransferDirection.IN,
+                then=F("amount"),
+            ),
+            default=-F("amount"),
+            output_field=money,
+        )
+        - F("fee")
+    )
+
+
+def account_parts(balance: Decimal, synced: bool) -> Tuple[Decimal, Decimal]:
+    """Split an account balance into ``(assets, liabilities)``.
+
+    Follows ``compute_current_net_worth``: positive balances of accounts
+    already synced as assets are covered by the asset, and a negative
+    balance is counted once for every account and once more for accounts
+    not synced as assets.
+    """
+    if balance >= 0:
+        return (ZERO if synced else balance), ZERO
+    if synced:
+        return ZERO, -balance
+    return ZERO, -2 * balance
+
+
+def _parts(kind: str, value: Decimal) -> Tuple[Decimal, Decimal]:
+    if kind == LIABILITY:
+        return ZERO, value
+    if kind in (ASSET, SAVINGS):
+        return value, ZERO
+    return account_parts(value, kind == SYNCED_ACCOUNT)
+
+
+def _load(user, after: Optional[date]):
+    """Current components and their flows dated after ``after``."""
+    from finance.models import Account, Transaction
+    from investments.models import Investment, InvestmentTransaction
+    from savings.models import GoalContribution, SavingsGoal
+
+    components: Dict[Tuple[str, int], _Component] = {}
+    flows: List[Tuple[date, Tuple[str, int], Decimal]] = []
+
+    def since(qs):
+        return qs.filter(date__gt=after) if after else qs
+
+    # Assets. Investment-backed ones are tracked through the investment.
+    assets = list(
+        Asset.objects.filter(user=user).values(
+            "id",
+            "current_value",
+            "source_type",
+            "source_id",
+            "acquisition_date",
+            "created_at",
+            "linked_account_id",
+        )
+    )
+    investment_assets = {
+        a["source_id"]: a
+        for a in assets
+        if a["source_type"] == Asset.SourceType.INVESTMENT and a["source_id"]
+    }
+    investments = {
+        row["id"]: row
+        for row in Investment.objects.filter(
+            user=user, id__in=list(investment_assets)
+        ).values("id", "purchase_date", "current_price")
+    }
+    for a in assets:
+        if a["source_type"] == Asset.SourceType.INVESTMENT and a["source_id"] in investments:
+            opened = investments[a["source_id"]]["purchase_date"]
+        else:
+            opened = a["acquisition_date"] or a["created_at"].date()
+        components[(ASSET, a["id"])] = _Component(ASSET, a["current_value"], opened)
+
+    if investments:
+        asset_for = {inv_id: investment_assets[inv_id]["id"] for inv_id in investments}
+        units = {"BUY": 1, "BONUS": 1, "SELL": -1}
+        for row in since(
+            InvestmentTransaction.objects.filter(
+                investment_id__in=list(investments),
+                transaction_type__in=list(units),
+            )
+        ).values("investment_id", "transaction_type", "date", "quantity"):
+            price = investments[row["investment_id"]]["current_price"]
+            flows.append(
+                (
+                    row["date"],
+                    (ASSET, asset_for[row["investment_id"]]),
+                    units[row["transaction_type"]] * row["quantity"] * price,
+                )
+            )
+
+        # Same mapping as TransactionViewSet._investment_effect.
+        action_sign = {"BUY": 1, "SELL": -1, "FEE": -1}
+        for row in since(
+            Transaction.objects.filter(
+                user=user, investment_id__in=list(investments)
+            ).exclude(kind=Transaction.Kind.TRANSFER)
+        ).values("investment_id", "investment_action", "kind", "date", "amount"):
+            action = row["investment_action"] or {
+                Transaction.Kind.EXPENSE: "BUY",
+                Transaction.Kind.INCOME: "SELL",
+            }.get(row["kind"])
+            sign = action_sign.get(action, 0)
+            if sign:
+                flows.append(
+                    (
+                        row["date"],
+                        (ASSET, asset_for[row["investment_id"]]),
+                        sign * row["amount"],
+                    )
+                )
+
+    # Savings goals and their contributions.
+    for g in SavingsGoal.objects.filter(user=user).annotate(
+        first_contribution=Min("contributions__date")
+    ).values("id", "current_amount", "created_at", "first_contribution"):
+        opened = g["created_at"].date()
+        if g["first_contribution"]:
+            opened = min(opened, g["first_contribution"])
+        components[(SAVINGS, g["id"])] = _Component(SAVINGS, g["current_amount"], opened)
+    for row in since(
+        GoalContribution.objects.filter(goal__user=user)
+        .values("goal_id", "date")
+        .annotate(total=Sum("amount"))
+    ):
+        flows.append((row["date"], (SAVINGS, row["goal_id"]), row["total"]))
+
+    # Active accounts: current balance and first activity in one grouped query.
+    synced = {a["linked_account_id"] for a in assets if a["linked_account_id"]}
+    active = Account.objects.filter(user=user, status=Account.AccountStatus.ACTIVE)
+    totals = {
+        row["account_id"]: row
+        for row in Transaction.objects.filter(account__in=active)
+        .values("account_id")
+        .annotate(total=Sum(transaction_effect()), first=Min("date"))
+    }
+    for account in active.values("id", "opening_balance", "created_at"):
+        row = totals.get(account["id"])
+        opened = account["created_at"].date()
+        current = account["opening_balance"]
+        if row:
+            opened = min(opened, row["first"])
+            current += row["total"]
+        kind = SYNCED_ACCOUNT if account["id"] in synced else ACCOUNT
+        components[(ACCOUNT, account["id"])] = _Component(kind, current, opened)
+    for row in since(
+        Transaction.objects.filter(account__in=active)
+        .values("account_id", "date")
+        .annotate(total=Sum(transaction_effect()))
+    ):
+        flows.append((row["date"], (ACCOUNT, row["account_id"]), row["total"]))
+
+    # Liabilities, paid down by linked expense transactions.
+    payments = Q(transactions__kind=Transaction.Kind.EXPENSE)
+    for liability in Liability.objects.filter(user=user).annotate(
+        first_payment=Min("transactions__date", filter=payments)
+    ).values("id", "principal_balance", "created_at", "first_payment"):
+        opened = liability["created_at"].date()
+        if liability["first_payment"]:
+            opened = min(opened, liability["first_payment"])
+        components[(LIABILITY, liability["id"])] = _Component(
+            LIABILITY, liability["principal_balance"], opened
+        )
+    for row in since(
+        Transaction.objects.filter(
+            user=user, liability__isnull=False, kind=Transaction.Kind.EXPENSE
+        )
+        .values("liability_id", "date")
+        .annotate(total=Sum("amount"))
+    ):
+        flows.append((row["date"], (LIABILITY, row["liability_id"]), -row["total"]))
+
+    return components, flows
+
+
+def net_worth_series(
+    user, start: Optional[date] = None, end: Optional[date] = None
+) -> List[NetWorthPoint]:
+    """Reconstruct daily net worth for ``start``..``end`` inclusive.
+
+    ``start`` defaults to the day the earliest component appeared and ``end``
+    to today. Only flows after ``start`` are read, so extending a series by
+    a few days stays cheap however long the history is.
+    """
+    end = end or timezone.localdate()
+    components, flows = _load(user, start)
+    if not components:
+        return []
+    if start is None:
+        start = min(c.opened for c in components.values())
+        flows = [f for f in flows if f[0] > start]
+    if start > end:
+        return []
+
+    # remaining[key] is the sum of the component's flows after the current day.
+    remaining: Dict[Tuple[str, int], Decimal] = defaultdict(Decimal)
+    flows_on: Dict[date, list] = defaultdict(list)
+    for day, key, delta in flows:
+        if key in components:
+            remaining[key] += delta
+            flows_on[day].append((key, delta))
+    opens_on: Dict[date, list] = defaultdict(list)
+    for key, component in components.items():
+        if component.opened > start:
+            opens_on[component.opened].append(key)
+
+    values: Dict[Tuple[str, int], Decimal] = {}
+    assets = ZERO
+    liabilities = ZERO
+
+    def refresh(key):
+        nonlocal assets, liabilities
+        component = components[key]
+        if key in values:
+            a, l = _parts(component.kind, values[key])
+            assets -= a
+            liabilities -= l
+        value = component.current - remaining[key]
+        values[key] = value
+        a, l = _parts(component.kind, value)
+        assets += a
+        liabilities += l
+
+    for key, component in components.items():
+        if component.opened <= start:
+            refresh(key)
+
+    series = []
+    day = start
+    step = timedelta(days=1)
+    while True:
+        series.append(NetWorthPoint(day, assets, liabilities, assets - liabilities))
+        if day >= end:
+            return series
+        day += step
+        changed = set(opens_on.get(day, ()))
+        for key, delta in flows_on.get(day, ()):
+            remaining[key] -= delta
+            if key in values:
+                changed.add(key)
+        for key in changed:
+            refresh(key)
@@ -1,12 +1,34 @@
 # wealth/utils.py
+from datetime import timedelta
 from decimal import Decimal
-from django.db.models import Sum
+from django.db.models import F, Sum, Value
+from django.db.models.functions import Greatest
 from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from backend.cache import bump, bump_owner
 
 from .models import Asset, Liability, NetWorthSnapshot
 
+SNAPSHOT_BATCH_SIZE = 1000
+
+
+def adjust_liability_balance(liability_id, delta, **filters):
+    """Add ``delta`` to a liability's principal in one UPDATE, floored at 0.
+
+    The database computes the new balance from the row it updates, so
+    concurrent payments cannot overwrite each other.
+    """
+    updated = Liability.objects.filter(pk=liability_id, **filters).update(
+        principal_balance=Greatest(F("principal_balance") + delta, Value(Decimal("0"))),
+        updated_at=timezone.now(),
+    )
+    if updated:
+        bump_owner(Liability, liability_id, "wealth", user=filters.get("user"))
+    return updated
+
 
-def compute_current_net_worth(user):
+def compute_current_net_worth(user, balances=None):
     """
     Calculate comprehensive net worth including:
     - Assets (manual + auto-synced from investments)
@@ -15,6 +37,9 @@ def compute_current_net_worth(user):
     - Liabilities (loans, debts)
     
     Formula: Net Worth = Total Assets - Total Liabilities
+
+    ``balances`` maps account id to current balance, as returned by
+    ``account_balances``; pass it when the caller already has it.
     """
     from savings.models import SavingsGoal
     from finance.models import Account
@@ -33,13 +58,15 @@ def compute_current_net_worth(user):
     
     # 3. Account balances
     # Get all active accounts and their current balances
-    accounts = Account.objects.filter(user=user, status='ACTIVE')
+    accounts = list(Account.objects.filter(user=user, status='ACTIVE'))
+    if balances is None:
+        balances = account_balances(accounts)
     
     total_account_assets = Decimal("0")
     total_account_liabilities = Decimal("0")
     
     for account in accounts:
-        balance = account.calculate_current_balance()
+        balance = balances[account.id]
         if balance >= 0:
             total_account_assets += balance
         else:
@@ -57,10 +84,10 @@ def compute_current_net_worth(user):
     # So we only add account balances that aren't already synced
     
     # Check which accounts are already synced as assets
-    synced_account_ids = Asset.objects.filter(
+    synced_account_ids = set(Asset.objects.filter(
         user=user,
         linked_account__isnull=False
-    ).values_list('linked_account_id', flat=True)
+    ).values_list('linked_account_id', flat=True))
     
     # Calculate unsynced account balances
     unsynced_account_assets = Decimal("0")
@@ -68,7 +95,7 @@ def compute_current_net_worth(user):
     
     for account in accounts:
         if account.id not in synced_account_ids:
-            balance = account.calculate_current_balance()
+            balance = balances[account.id]
             if balance >= 0:
                 unsynced_account_assets += balance
             else:
@@ -107,3 +134,155 @@ def create_net_worth_snapshot(user, date):
         },
     )
     return snapshot
+
+
+def backfill_net_worth_snapshots(user, start=None, end=None):
+    """
+    Persist reconstructed daily snapshots that are missing for the user.
+
+    Without ``start`` the series continues from the day after the latest
+    snapshot, or starts at the beginning of the user's history if there is
+    none, so calling this daily only reads and writes the new days. Existing
+    snapshots are left untouched. Returns the number of snapshots created.
+    """
+    from .timeseries import net_worth_series
+
+    if start is None:
+        last = (
+            NetWorthSnapshot.objects.filter(user=user)
+            .order_by("-date")
+            .values_list("date", flat=True)
+            .first()
+        )
+        if last is not None:
+            start = last + timedelta(days=1)
+    series = net_worth_series(user, start, end)
+    if not series:
+        return 0
+
+    existing = set(
+        NetWorthSnapshot.objects.filter(
+            user=user, date__gte=series[0].date, date__lte=series[-1].date
+        ).values_list("date", flat=True)
+    )
+    missing = [
+        NetWorthSnapshot(
+            user=user,
+            date=point.date,
+            total_assets=point.total_assets,
+            total_liabilities=point.total_liabilities,
+            net_worth=point.net_worth,
+        )
+        for point in series
+        if point.date not in existing
+    ]
+    NetWorthSnapshot.objects.bulk_create(
+        missing, batch_size=SNAPSHOT_BATCH_SIZE, ignore_conflicts=True
+    )
+    if missing:
+        bump(user.pk, "wealth")
+    return len(missing)
+
+
+def account_balances(accounts):
+    """
+    Current balance of each account, keyed by id.
+
+    Equivalent to ``Account.calculate_current_balance`` for every account in
+    ``accounts`` (a list of Account instances), from one grouped query.
+    """
+    from finance.models import Transaction
+    from .timeseries import transaction_effect
+
+    movements = dict(
+        Transaction.objects.filter(account_id__in=[a.id for a in accounts])
+        .values("account_id")
+        .annotate(total=Sum(transaction_effect()))
+        .values_list("account_id", "total")
+    )
+    return {
+        a.id: a.opening_balance + (movements.get(a.id) or Decimal("0"))
+        for a in accounts
+    }
+
+
+def compute_net_worth_for_users(user_ids):
+    """
+    Batch version of ``compute_current_net_worth`` for many users.
+
+    Every component is summed with one grouped query for the whole batch,
+    so the cost does not grow with the number of users, accounts or
+    transactions per user. Returns ``{user_id: {"total_assets",
+    "total_liabilities", "net_worth"}}`` for every id passed in.
+    """
+    from savings.models import SavingsGoal
+    from finance.models import Account
+    from .timeseries import account_parts
+
+    user_ids = list(user_ids)
+    zero = Decimal("0")
+    assets = {uid: zero for uid in user_ids}
+    liabilities = {uid: zero for uid in user_ids}
+
+    def add_totals(target, qs, field):
+        for row in qs.values("user_id").annotate(total=Sum(field)):
+            target[row["user_id"]] += row["total"] or zero
+
+    add_totals(assets, Asset.objects.filter(user_id__in=user_ids), "current_value")
+    add_totals(
+        assets, SavingsGoal.objects.filter(user_id__in=user_ids), "current_amount"
+    )
+    add_totals(
+        liabilities,
+        Liability.objects.filter(user_id__in=user_ids),
+        "principal_balance",
+    )
+
+    synced = set(
+        Asset.objects.filter(
+            user_id__in=user_ids, linked_account__isnull=False
+        ).values_list("linked_account_id", flat=True)
+    )
+    accounts = list(
+        Account.objects.filter(user_id__in=user_ids, status="ACTIVE").only(
+            "id", "user_id", "opening_balance"
+        )
+    )
+    balances = account_balances(accounts)
+    for account in accounts:
+        account_assets, account_liabilities = account_parts(
+            balances[account.id], account.id in synced
+        )
+        assets[account.user_id] += account_assets
+        liabilities[account.user_id] += account_liabilities
+
+    return {
+        uid: {
+            "total_assets": assets[uid],
+            "total_liabilities": liabilities[uid],
+            "net_worth": assets[uid] - liabilities[uid],
+        }
+        for uid in user_ids
+    }
+
+
+def snapshot_users(user_ids, date):
+    """Upsert the ``date`` snapshot for every user in the batch.
+
+    Returns the number of snapshots written.
+    """
+    totals = compute_net_worth_for_users(user_ids)
+    snapshots = [
+        NetWorthSnapshot(user_id=uid, date=date, **data)
+        for uid, data in totals.items()
+    ]
+    NetWorthSnapshot.objects.bulk_create(
+        snapshots,
+        batch_size=SNAPSHOT_BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=["user", "date"],
+        update_fields=["total_assets", "total_liabilities", "net_worth", "updated_at"],
+    )
+    for uid in totals:
+        bump(uid, "wealth")
+    return len(snapshots)
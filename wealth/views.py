@@ -1,7 +1,14 @@
-from rest_framework import viewsets, permissions
+from datetime import timedelta
+from functools import partial
+
+from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from backend.cache import bump, get_or_build
+from backend.conditional import ConditionalListMixin
 
 from .models import Asset, Liability, NetWorthSnapshot
 from .serializers import (
@@ -9,7 +16,12 @@ from .serializers import (
     LiabilitySerializer,
     NetWorthSnapshotSerializer,
 )
-from .utils import compute_current_net_worth, create_net_worth_snapshot
+from .utils import (
+    account_balances,
+    backfill_net_worth_snapshots,
+    compute_current_net_worth,
+    create_net_worth_snapshot,
+)
 
 
 class IsOwner(permissions.BasePermission):
@@ -17,7 +29,7 @@ class IsOwner(permissions.BasePermission):
         return getattr(obj, "user", None) == request.user
 
 
-class AssetViewSet(viewsets.ModelViewSet):
+class AssetViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     serializer_class = AssetSerializer
     permission_classes = [permissions.IsAuthenticated, IsOwner]
 
@@ -31,62 +43,68 @@ class AssetViewSet(viewsets.ModelViewSet):
     def sync_from_accounts(self, request):
         """Sync bank accounts as assets - creates or updates assets based on account current balances"""
         from finance.models import Account
-        
-        accounts = Account.objects.filter(
+
+        accounts = list(Account.objects.filter(
             user=request.user,
             status='ACTIVE',
             account_type__in=['BANK', 'MOBILE_MONEY', 'SACCO', 'INVESTMENT']
-        )
-        
-        created = []
-        updated = []
-        
+        ))
+        balances = account_balances(accounts)
+
+        # First linked asset per account, as the per-account lookup used to pick.
+        existing = {}
+        for asset in Asset.objects.filter(
+            user=request.user, linked_account__in=accounts
+        ).order_by('id'):
+            existing.setdefault(asset.linked_account_id, asset)
+
+        to_create = []
+        to_update = []
+        unchanged = []
+        now = timezone.now()
+
         for account in accounts:
-            current_balance = account.calculate_current_balance()
-            
-            # Map account types to asset types
-            asset_type_map = {
-                'BANK': 'OTHER',
-                'MOBILE_MONEY': 'OTHER',
-                'SACCO': 'OTHER',
-                'INVESTMENT': 'OTHER',
-            }
-            
-            asset_type = asset_type_map.get(account.account_type, 'OTHER')
-            
-            # Try to find existing asset linked to this account
-            asset = Asset.objects.filter(
-                user=request.user,
-                linked_account=account
-            ).first()
-            
-            if asset:
-                # Update existing asset
-                asset.current_value = current_balance
-                asset.name = f"{account.name} ({account.institution or account.account_type})"
-                asset.save()
-                updated.append(asset.id)
-            else:
-                # Create new asset
-                asset = Asset.objects.create(
+            current_balance = balances[account.id]
+            name = f"{account.name} ({account.institution or account.account_type})"
+            asset = existing.get(account.id)
+
+            if asset is None:
+                # All synced account types map to the OTHER asset type.
+                to_create.append(Asset(
                     user=request.user,
-                    name=f"{account.name} ({account.institution or account.account_type})",
-                    asset_type=asset_type,
+                    name=name,
+                    asset_type='OTHER',
                     current_value=current_balance,
                     currency=account.currency,
                     linked_account=account
-                )
-                created.append(asset.id)
-        
+                ))
+            elif asset.current_value != current_balance or asset.name != name:
+                asset.current_value = current_balance
+                asset.name = name
+                asset.updated_at = now
+                to_update.append(asset)
+            else:
+                unchanged.append(asset)
+
+        if to_create:
+            Asset.objects.bulk_create(to_create)
+        if to_update:
+            Asset.objects.bulk_update(
+                to_update, ['current_value', 'name', 'updated_at']
+            )
+        if to_create or to_update:
+            bump(request.user.id, 'wealth')
+
         return Response({
             'message': f'Synced {len(accounts)} accounts',
-            'created': len(created),
-            'updated': len(updated),
-            'asset_ids': created + updated
+            'created': len(to_create),
+            'updated': len(to_update),
+            'unchanged': len(unchanged),
+            'asset_ids': [a.id for a in to_create + to_update + unchanged]
         })
 
 
-class LiabilityViewSet(viewsets.ModelViewSet):
+class LiabilityViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     serializer_class = LiabilitySerializer
     permission_classes = [permissions.IsAuthenticated, IsOwner]
 
@@ -97,7 +115,7 @@ class LiabilityViewSet(viewsets.ModelViewSet):
         serializer.save(user=self.request.user)
 
 
-class NetWorthSnapshotViewSet(viewsets.ModelViewSet):
+class NetWorthSnapshotViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     serializer_class = NetWorthSnapshotSerializer
     permission_classes = [permissions.IsAuthenticated, IsOwner]
 
@@ -109,12 +127,45 @@ class NetWorthSnapshotViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=["get"])
     def current(self, request):
-        data = compute_current_net_worth(request.user)
+        data, _ = get_or_build(
+            request.user.id,
+            "net_worth",
+            ("finance", "savings", "wealth"),
+            partial(compute_current_net_worth, request.user),
+        )
         return Response(data)
 
     @action(detail=False, methods=["post"])
     def snapshot(self, request):
         today = timezone.localdate()
+        # Fill any days missed since the last snapshot before recording today.
+        backfill_net_worth_snapshots(
+            request.user, end=today - timedelta(days=1)
+        )
         snapshot = create_net_worth_snapshot(request.user, today)
         serializer = self.get_serializer(snapshot)
         return Response(serializer.data)
+
+    @action(detail=False, methods=["post"])
+    def backfill(self, request):
+        """Reconstruct and store missing daily snapshots.
+
+        Accepts optional ``start`` and ``end`` dates (YYYY-MM-DD); by default
+        the series continues from the latest snapshot up to today.
+        """
+        dates = {}
+        for field in ("start", "end"):
+            value = request.data.get(field)
+            if not value:
+                dates[field] = None
+                continue
+            try:
+                dates[field] = parse_date(str(value))
+            except ValueError:
+                dates[field] = None
+            if dates[field] is None:
+                return Response(
+                    {field: "Use YYYY-MM-DD."}, status=status.HTTP_400_BAD_REQUEST
+                )
+        created = backfill_net_worth_snapshots(request.user, **dates)
+        return Response({"created": created})